@@ -0,0 +1,283 @@
+"""
+Benchmarks of the game's hot paths: scoring, physics stepping, rendering a frame and starting the game.
+
+Each benchmark runs a fixed, seeded workload several times and reports the median and best time per operation, so
+that results are comparable between runs and machines. Results are saved as JSON, and are compared against the
+baseline stored in benchmarks/baseline.json (or another saved run), with any benchmark that has slowed down by more
+than a threshold reported as a regression. Save a new baseline with --output benchmarks/baseline.json when a change
+is meant to alter the timings, or when benchmarking on a different machine.
+
+Rendering uses SDL's dummy video driver, so the suite runs without a display.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import bksports.constants as consts
+from bksports.bowling.ball import Ball
+from bksports.bowling.leaves import FULL_RACK
+from bksports.bowling.physics import create_space
+from bksports.bowling.pin import PinSet
+from bksports.bowling.score_keeper import ScoreKeeper, generate_random_games
+
+DEFAULT_BASELINE = Path("benchmarks/baseline.json")
+
+HEADLESS_ENVIRONMENT = {
+    "SDL_VIDEODRIVER": "dummy",
+    "SDL_AUDIODRIVER": "dummy",
+    "PYGAME_HIDE_SUPPORT_PROMPT": "1",
+}
+
+
+@dataclass(frozen=True)
+class BenchmarkResult:
+    """
+    The timings of one benchmark.
+
+    :ivar name: The name of the benchmark.
+    :ivar operations: The number of operations timed in each repeat.
+    :ivar repeats: The number of times the workload was timed.
+    :ivar median: The median time per operation over the repeats, in seconds.
+    :ivar best: The fastest time per operation over the repeats, in seconds.
+    """
+
+    name: str
+    operations: int
+    repeats: int
+    median: float
+    best: float
+
+
+def time_workload(name: str, workload: Callable[[], int], repeats: int) -> BenchmarkResult:
+    """
+    Times a workload several times, after running it once to warm up.
+
+    :param name: The name of the benchmark.
+    :param workload: Runs the workload and returns the number of operations it performed.
+    :param repeats: The number of times to time the workload.
+    :return: The timings of the workload.
+    """
+    workload()
+    times = []
+    operations = 0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        operations = workload()
+        times.append((time.perf_counter() - start) / operations)
+    return BenchmarkResult(name, operations, repeats, statistics.median(times), min(times))
+
+
+def benchmark_score_keeper(repeats: int, games: int = 200) -> list[BenchmarkResult]:
+    """
+    Times ScoreKeeper.add_throw() and ScoreKeeper.__str__() over random complete games.
+
+    :param repeats: The number of times to time each workload.
+    :param games: The number of games in each workload.
+    :return: The timings of adding a throw and of formatting a finished game.
+    """
+    throws = [[int(score) for score in game if score >= 0] for game in generate_random_games(games, seed=0)]
+
+    def add_throws() -> int:
+        for game in throws:
+            score_keeper = ScoreKeeper()
+            for score in game:
+                score_keeper.add_throw(score)
+        return sum(len(game) for game in throws)
+
+    finished_games = []
+    for game in throws:
+        score_keeper = ScoreKeeper()
+        score_keeper.add_throws(game)
+        finished_games.append(score_keeper)
+
+    def format_games() -> int:
+        for score_keeper in finished_games:
+            str(score_keeper)
+        return len(finished_games)
+
+    return [
+        time_workload("score_keeper.add_throw", add_throws, repeats),
+        time_workload("score_keeper.__str__", format_games, repeats),
+    ]
+
+
+def benchmark_space_step(repeats: int, steps: int = 2000) -> list[BenchmarkResult]:
+    """
+    Times space.step() through a straight throw into a full PinSet, from the ball leaving the foul line until after
+    it has reached the pins.
+
+    :param repeats: The number of times to time the throw.
+    :param steps: The number of steps in each throw.
+    :return: The timing of a single step.
+    """
+    space = create_space()
+    ball = Ball(space)
+    pin_set = PinSet(space)
+    dt = consts.PHYSICS_TIMESTEP / consts.PHYSICS_SUBSTEPS
+
+    def throw() -> int:
+        ball.reset()
+        pin_set.reset(FULL_RACK)
+        ball.throw(0.0, consts.THROW_VELOCITY)
+        for _ in range(steps):
+            space.step(dt)
+        return steps
+
+    return [time_workload("space.step", throw, repeats)]
+
+
+def benchmark_render_frame(repeats: int, frames: int = 50) -> list[BenchmarkResult]:
+    """
+    Times drawing a whole frame on a dummy SDL display: painting the bowling scene and redrawing every sprite.
+
+    :param repeats: The number of times to time the frames.
+    :param frames: The number of frames in each workload.
+    :return: The timing of a single frame.
+    """
+    for variable, value in HEADLESS_ENVIRONMENT.items():
+        os.environ.setdefault(variable, value)
+    import pygame
+
+    from bksports.bowling.camera import Camera
+    from bksports.bowling.renderer import LaneRenderer, setup_bowling_scene
+
+    pygame.init()
+    screen = pygame.display.set_mode((consts.SCREEN_WIDTH, consts.SCREEN_HEIGHT))
+    space = create_space()
+    ball = Ball(space)
+    pin_set = PinSet(space)
+    camera = Camera(*screen.get_size())
+    renderer = LaneRenderer(screen, setup_bowling_scene, ball, pin_set, camera=camera)
+
+    def draw_frames() -> int:
+        for _ in range(frames):
+            setup_bowling_scene(renderer.background, camera)
+            renderer.repaint()
+            renderer.draw()
+        return frames
+
+    result = time_workload("render.frame", draw_frames, repeats)
+    pygame.quit()
+    return [result]
+
+
+def benchmark_startup(repeats: int) -> list[BenchmarkResult]:
+    """
+    Times importing bksports.main in a new interpreter, which initialises pygame and opens the (dummy) display.
+
+    Like every workload, starting is run once before it is timed, so every start is timed with the modules already
+    in the operating system's file cache. This is the start time players see after the first, not a cold start.
+
+    :param repeats: The number of interpreters to start.
+    :return: The timing of a single start.
+    """
+    environment = {**os.environ, **HEADLESS_ENVIRONMENT}
+
+    def start() -> int:
+        subprocess.run([sys.executable, "-c", "import bksports.main"], env=environment, check=True)
+        return 1
+
+    return [time_workload("startup", start, repeats)]
+
+
+BENCHMARKS: dict[str, Callable[[int], list[BenchmarkResult]]] = {
+    "score_keeper": benchmark_score_keeper,
+    "space_step": benchmark_space_step,
+    "render": benchmark_render_frame,
+    "startup": benchmark_startup,
+}
+
+
+def run_benchmarks(names: list[str] | None = None, repeats: int = 5) -> dict:
+    """
+    Runs benchmarks and collects their results with a description of the machine they ran on.
+
+    :param names: The benchmarks to run (keys of BENCHMARKS). Defaults to every benchmark.
+    :param repeats: The number of times each workload is timed.
+    :return: A JSON-serialisable dictionary of the results.
+    """
+    results = []
+    for name in names or BENCHMARKS:
+        results.extend(BENCHMARKS[name](repeats))
+    return {
+        "machine": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": {result.name: asdict(result) for result in results},
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[tuple[str, float, float, bool]]:
+    """
+    Compares results against a baseline, benchmark by benchmark, using median times.
+
+    :param results: The results returned by run_benchmarks().
+    :param baseline: Results from an earlier run, e.g. loaded from a saved file.
+    :param threshold: The fractional slowdown above which a benchmark is a regression (0.1 is 10% slower).
+    :return: A tuple (name, baseline median, median, is_regression) for each benchmark in both sets of results.
+    """
+    comparisons = []
+    for name, result in results["results"].items():
+        if name in baseline["results"]:
+            baseline_median = baseline["results"][name]["median"]
+            comparisons.append(
+                (name, baseline_median, result["median"], result["median"] > baseline_median * (1 + threshold))
+            )
+    return comparisons
+
+
+def main(argv: list[str] | None = None) -> None:
+    """
+    Command line entry point for running the benchmarks. Exits with status 1 if any benchmark regressed against the
+    baseline.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark scoring, physics, rendering and startup.")
+    parser.add_argument("benchmarks", nargs="*", help=f"Benchmarks to run: {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument("--repeats", type=int, default=5, help="Times each workload is timed")
+    parser.add_argument("--output", default=None, help="Save the results as JSON to this file")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE,
+                        help=f"Compare against results saved by an earlier run (default: {DEFAULT_BASELINE})")
+    parser.add_argument("--no-baseline", action="store_true", help="Only print the results, without comparing them")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Slowdown counted as a regression (0.1 = 10%%)")
+    args = parser.parse_args(argv)
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+    if not args.no_baseline and not args.baseline.is_file():
+        parser.error(f"baseline {args.baseline} not found (pass --baseline PATH, or --no-baseline)")
+    # Read the baseline before running, in case the results are about to replace it
+    baseline = None if args.no_baseline else json.loads(args.baseline.read_text())
+    results = run_benchmarks(args.benchmarks, args.repeats)
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=4))
+    if baseline is None:
+        print(f"{'benchmark':<26}{'median':>12}{'best':>12}")
+        for name, result in results["results"].items():
+            print(f"{name:<26}{result['median'] * 1e6:>10.2f}us{result['best'] * 1e6:>10.2f}us")
+        return
+    if baseline["machine"] != results["machine"]:
+        print(f"Baseline recorded on a different machine: {baseline['machine']}")
+    comparisons = compare(results, baseline, args.threshold)
+    print(f"{'benchmark':<26}{'baseline':>12}{'median':>12}{'change':>9}")
+    for name, baseline_median, median, is_regression in comparisons:
+        change = median / baseline_median - 1
+        print(f"{name:<26}{baseline_median * 1e6:>10.2f}us{median * 1e6:>10.2f}us{change:>+9.1%}"
+              f"{'  REGRESSION' if is_regression else ''}")
+    if any(is_regression for *_, is_regression in comparisons):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
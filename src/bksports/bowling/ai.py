@@ -0,0 +1,258 @@
+"""
+An AI bowler that chooses where to aim by simulating throws within a time budget.
+
+The search is a cross-entropy method: candidate (angle, velocity) pairs are drawn from a normal distribution, each
+is simulated once in a pool of worker processes, and the distribution is then refitted to the candidates that knocked
+down the most pins, so that later rounds concentrate on the promising throws. The search runs on a background
+thread, so the game keeps rendering while it runs, and whatever throw is best when the budget expires is used.
+
+The budget only starts once the pool's workers have started and built their simulators, and no more throws are
+simulated at once than there are workers, so a search that stops early leaves at most one throw per worker running
+into the next search.
+"""
+
+import math
+import os
+import threading
+import time
+from collections.abc import Sequence
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    wait,
+)
+from dataclasses import dataclass, replace
+from typing import Self
+
+import numpy as np
+
+import bksports.constants as consts
+from bksports.bowling.leaves import FULL_RACK, STANDING_COUNT
+from bksports.bowling.physics import (
+    get_physics_profile,
+    get_solver_profile,
+    set_profiles,
+)
+from bksports.bowling.sweep import MAX_THROW_ANGLE, MIN_THROW_ANGLE, simulate_cell
+
+MIN_THROW_VELOCITY = 200.0  # inches per second
+MAX_THROW_VELOCITY = 400.0  # inches per second
+
+
+@dataclass(frozen=True)
+class AimResult:
+    """
+    The best throw found by a search so far.
+
+    :ivar angle: The angle to throw at, in degrees.
+    :ivar velocity: The velocity to throw at, in inches per second.
+    :ivar pins_knocked: The number of pins the throw knocked down when simulated.
+    :ivar simulations: The number of throws simulated by the search so far.
+    """
+
+    angle: float
+    velocity: float
+    pins_knocked: int
+    simulations: int
+
+
+class AimSearch:
+    """
+    A search for the best throw at a leave, running on a background thread until its time budget expires.
+
+    :ivar ELITE_FRACTION: The fraction of each round's candidates the distribution is refitted to.
+    :ivar MIN_ANGLE_SPREAD: The narrowest the distribution of angles may become, in degrees.
+    :ivar MIN_VELOCITY_SPREAD: The narrowest the distribution of velocities may become, in inches per second.
+    :ivar leave: The leave bitmask of the pins standing before the throw.
+    :ivar budget: The time the search may take once the workers have started, in seconds.
+    :ivar deadline: The time.perf_counter() time at which the search stops, or infinity until the workers have started.
+    :ivar batch_size: The number of candidates simulated in each round.
+    :ivar max_in_flight: The most candidates being simulated at once.
+    """
+
+    ELITE_FRACTION = 0.25
+    MIN_ANGLE_SPREAD = 0.05  # degrees
+    MIN_VELOCITY_SPREAD = 1.0  # inches per second
+
+    def __init__(
+            self,
+            executor: Executor,
+            leave: int,
+            budget: float,
+            batch_size: int,
+            max_in_flight: int,
+            seed: int | None,
+            warm_up: Sequence[Future] = (),
+    ) -> None:
+        """
+        Initialises the search and starts it on a background thread.
+
+        :param executor: The pool the throws are simulated in.
+        :param leave: The leave bitmask of the pins standing before the throw.
+        :param budget: The time the search may take once the workers have started, in seconds.
+        :param batch_size: The number of candidates simulated in each round.
+        :param max_in_flight: The most candidates to simulate at once, normally the number of workers.
+        :param seed: The seed used to draw candidates. Defaults to a random seed.
+        :param warm_up: The tasks that start the pool's workers, which the budget waits for.
+        """
+        self.leave = leave
+        self.budget = budget
+        self.deadline = math.inf
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight
+        self._executor = executor
+        self._warm_up = warm_up
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+        self._best: AimResult | None = None
+        self._simulations = 0
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def is_finished(self) -> bool:
+        """Indicates whether the budget has expired (or the search has ended early), so the best throw is final."""
+        return not self._thread.is_alive() or time.perf_counter() >= self.deadline
+
+    def best(self) -> AimResult | None:
+        """
+        Returns the best throw found so far.
+
+        :return: The best throw, or None if no throw has been simulated yet.
+        """
+        with self._lock:
+            if self._best is None:
+                return None
+            return replace(self._best, simulations=self._simulations)
+
+    def cancel(self) -> None:
+        """Stops the search, without waiting for throws that are already being simulated."""
+        self._cancelled.set()
+
+    def _run(self) -> None:
+        """
+        Waits for the workers to start, then runs rounds of the search until the budget expires, the search is
+        cancelled, or a throw knocks down every standing pin.
+        """
+        wait(self._warm_up)
+        self.deadline = time.perf_counter() + self.budget
+        mean = np.array((0.0, consts.THROW_VELOCITY))
+        spread = np.array(((MAX_THROW_ANGLE - MIN_THROW_ANGLE) / 4, (MAX_THROW_VELOCITY - MIN_THROW_VELOCITY) / 4))
+        low = np.array((MIN_THROW_ANGLE, MIN_THROW_VELOCITY))
+        high = np.array((MAX_THROW_ANGLE, MAX_THROW_VELOCITY))
+        min_spread = np.array((self.MIN_ANGLE_SPREAD, self.MIN_VELOCITY_SPREAD))
+        # Include the straight throw at the game's velocity in the first round, as the obvious first guess
+        candidates = np.vstack((mean, self._rng.normal(mean, spread, (self.batch_size - 1, 2)))).clip(low, high)
+        while not self._cancelled.is_set():
+            scores = self._evaluate(candidates)
+            if scores is None or scores.max() == STANDING_COUNT[self.leave]:
+                return  # Out of time, or nothing can beat knocking down every standing pin
+            # Refit the distribution to the best candidates of the round
+            num_elites = max(2, math.ceil(len(candidates) * self.ELITE_FRACTION))
+            elites = candidates[np.argsort(-scores, kind="stable")[:num_elites]]
+            mean = elites.mean(axis=0)
+            spread = np.maximum(elites.std(axis=0), min_spread)
+            candidates = self._rng.normal(mean, spread, (self.batch_size, 2)).clip(low, high)
+
+    def _evaluate(self, candidates: np.ndarray) -> np.ndarray | None:
+        """
+        Simulates a round of candidate throws, updating the best throw as each result arrives.
+
+        :param candidates: An array with an (angle, velocity) candidate in each row.
+        :return: The number of pins knocked down by each candidate, or None if the budget expired (or the search was
+            cancelled) before every candidate had been simulated.
+        """
+        scores = np.zeros(len(candidates))
+        futures: dict[Future, int] = {}
+        next_candidate = 0
+        while futures or next_candidate < len(candidates):
+            # Only submit another candidate as one finishes, so that stopping never leaves a queue of them behind
+            while len(futures) < self.max_in_flight and next_candidate < len(candidates):
+                angle, velocity = candidates[next_candidate].tolist()
+                task = (angle, velocity, 1, 0.0, 0.0, (0,), self.leave)
+                futures[self._executor.submit(simulate_cell, task)] = next_candidate
+                next_candidate += 1
+            remaining = self.deadline - time.perf_counter()
+            if remaining <= 0 or self._cancelled.is_set():
+                for future in futures:
+                    future.cancel()
+                return None
+            done, _ = wait(futures, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                i = futures.pop(future)
+                pins_knocked = int(STANDING_COUNT[self.leave]) - int(STANDING_COUNT[future.result()[0]])
+                scores[i] = pins_knocked
+                self._record(candidates[i], pins_knocked)
+        return scores
+
+    def _record(self, candidate: np.ndarray, pins_knocked: int) -> None:
+        """
+        Counts a simulated throw, and keeps it if it is the best so far.
+
+        :param candidate: The (angle, velocity) of the throw.
+        :param pins_knocked: The number of pins the throw knocked down.
+        """
+        with self._lock:
+            self._simulations += 1
+            if self._best is None or pins_knocked > self._best.pins_knocked:
+                angle, velocity = candidate.tolist()
+                self._best = AimResult(angle, velocity, pins_knocked, self._simulations)
+
+
+class MonteCarloBowler:
+    """
+    Chooses throws by running time-budgeted searches in a pool of worker processes.
+
+    The pool is started when the bowler is created, and is kept for every search. Creating the bowler when the game
+    starts, rather than when it is first needed, gives the workers time to start before the first search.
+
+    :ivar budget: The time each search may take, in seconds.
+    :ivar workers: The number of worker processes.
+    :ivar seed: The seed used to draw each search's candidates, if the searches should be repeatable.
+    :ivar executor: The pool the throws are simulated in.
+    """
+
+    def __init__(self, budget_ms: float = 500.0, workers: int | None = None, seed: int | None = None) -> None:
+        """
+        Initialises the bowler and starts its worker pool.
+
+        :param budget_ms: The time each search may take, in milliseconds.
+        :param workers: The number of worker processes. Defaults to the number of CPU cores.
+        :param seed: The seed used to draw each search's candidates. Defaults to a random seed for each search.
+        """
+        self.budget = budget_ms / 1000
+        self.workers = workers or os.cpu_count() or 1
+        self.seed = seed
+        # Simulate with the same physics and solver settings as the game, even in workers that do not inherit its memory
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=set_profiles, initargs=(get_physics_profile(), get_solver_profile())
+        )
+        # Start every worker and build its simulator in the background; searches only start their budget once done
+        self._warm_up = [
+            self.executor.submit(simulate_cell, (0.0, consts.THROW_VELOCITY, 1, 0.0, 0.0, (0,), FULL_RACK))
+            for _ in range(self.workers)
+        ]
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.shutdown()
+
+    def search(self, leave: int) -> AimSearch:
+        """
+        Starts searching for the best throw at a leave, in the background.
+
+        :param leave: The leave bitmask of the pins standing before the throw.
+        :return: The running search.
+        """
+        # Simulate enough candidates in each round to keep every worker busy
+        batch_size = max(8, self.workers * 2)
+        return AimSearch(self.executor, leave, self.budget, batch_size, self.workers, self.seed, self._warm_up)
+
+    def shutdown(self) -> None:
+        """Stops the worker pool, abandoning any throws still waiting to be simulated."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
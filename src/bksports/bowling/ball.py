@@ -1,9 +1,18 @@
 import math
 from enum import Enum, auto
 
+import numpy as np
 import pymunk
 
 import bksports.constants as consts
+from bksports.bowling.event_log import EventSource, EventType
+from bksports.bowling.physics import (
+    BODY_STATE_SIZE,
+    PhysicsProfile,
+    get_body_state,
+    get_physics_profile,
+    set_body_state,
+)
 
 
 class BallState(Enum):
@@ -27,6 +36,7 @@ class Ball:
     :ivar state: The current state of the ball, which is an instance of the BallState enum.
     :ivar body: The pymunk Body of the pin.
     :ivar shape: The pymunk Shape of the pin.
+    :ivar events: Logs the ball's throws and gutter balls, if the ball is in a logged lane.
     """
 
     MASS = 10  # kg
@@ -34,6 +44,8 @@ class Ball:
     RADIUS = DIAMETER / 2  # inches
     CIRCUMFERENCE = 2 * math.pi * RADIUS  # inches
 
+    __slots__ = ("body", "events", "shape", "state")
+
     def __init__(self, space: pymunk.Space) -> None:
         """
         Intialises the ball and adds it to the pymunk Space.
@@ -41,19 +53,28 @@ class Ball:
         :param space: The pymunk Space the game exists in.
         """
         self.state = BallState.STATIONARY
+        self.events: EventSource | None = None
         self.body = pymunk.Body()
         self.body.position = (0, 0)
         self.shape = pymunk.Circle(self.body, self.RADIUS)
         self.shape.mass = (
             self.MASS
         )  # TODO: Change value / add ball choice functionality
-        self.shape.elasticity = 0.9
-        self.shape.friction = 0.4
         self.shape.collision_type = (
             consts.BALL_ID  # Assign collision type ID 0 to the ball
         )
+        self.apply_profile(get_physics_profile())
         space.add(self.body, self.shape)
 
+    def apply_profile(self, profile: PhysicsProfile) -> None:
+        """
+        Sets the friction and elasticity of the ball from a physics profile.
+
+        :param profile: The profile to apply.
+        """
+        self.shape.elasticity = profile.ball_elasticity
+        self.shape.friction = profile.ball_friction
+
     @property
     def x(self) -> float:
         """Returns the x-coordinate of the ball's current position."""
@@ -74,6 +95,34 @@ class Ball:
         """Returns the y-component of the ball's current velocity."""
         return self.body.velocity.y
 
+    def reset(self) -> None:
+        """Returns the ball to its starting position, at rest and ready to be thrown again."""
+        self.state = BallState.STATIONARY
+        self.body.position = (0, 0)
+        self.body.velocity = (0, 0)
+        self.body.angle = 0
+        self.body.angular_velocity = 0
+
+    def capture_state(self) -> np.ndarray:
+        """
+        Captures the ball's full physical state.
+
+        :return: An array holding the ball's position, angle, velocity and angular velocity.
+        """
+        state = np.empty(BODY_STATE_SIZE)
+        get_body_state(self.body, state)
+        return state
+
+    def restore_state(self, state: np.ndarray, ball_state: BallState) -> None:
+        """
+        Restores the ball to a physical state captured by capture_state().
+
+        :param state: The array holding the ball's position, angle, velocity and angular velocity.
+        :param ball_state: The state of the ball within the game.
+        """
+        set_body_state(self.body, state)
+        self.state = ball_state
+
     def throw(self, angle: float, velocity: float) -> None:
         """
         Throw the ball in the given direction with the given velocity.
@@ -90,6 +139,8 @@ class Ball:
         impulse_y = self.body.mass * vy
         self.body.apply_impulse_at_local_point((impulse_x, impulse_y), (0, 0))
         self.state = BallState.MOVING_IN_LANE
+        if self.events is not None:
+            self.events.log(EventType.THROW_STARTED, x=angle, y=velocity)
 
     def update(self) -> None:
         """Update the ball's state based on its position."""
@@ -111,7 +162,8 @@ class Ball:
                 # self.on_finish()
             # If the ball goes into the gutter, ...
             if has_entered_gutter:
-                print(f"GUTTER! x={self.x}")
+                if self.events is not None:
+                    self.events.log(EventType.GUTTER, x=self.x, y=self.y)
                 if has_entered_left_gutter:
                     self.state = BallState.IN_LEFT_GUTTER
                 if has_entered_right_gutter:
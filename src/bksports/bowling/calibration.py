@@ -0,0 +1,242 @@
+"""
+Calibration of the physics profile against real-world bowling statistics.
+
+A population of bowlers is modelled as first-ball throws at a full rack, with normally distributed angles and
+velocities. Candidate profiles are scored by how far the strike rate, mean pins knocked down and frequency of given
+leaves produced by a large batch of simulated throws are from target statistics, and the search is a cross-entropy
+method: candidate profiles are drawn from a normal distribution over the parameters, every candidate is simulated
+in a pool of worker processes, and the distribution is refitted to the candidates closest to the targets. Every
+candidate in a round is thrown with the same throws, so candidates are compared without the noise of the throws.
+
+Targets are read from a JSON file such as:
+    {"strike_rate": 0.3, "mean_pins": 8.8, "leave_rates": {"10": 0.06, "7": 0.05, "7 10": 0.01}}
+where each leave is given by the numbers of its standing pins, and any statistic may be left out.
+"""
+
+import argparse
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import astuple, dataclass, field, fields
+from pathlib import Path
+from typing import Self
+
+import numpy as np
+
+import bksports.constants as consts
+from bksports.bowling.leaves import FULL_RACK, NUM_PINS, STANDING_COUNT, leave_from_pins
+from bksports.bowling.physics import PhysicsProfile
+from bksports.bowling.simulation import ThrowSimulator
+
+# Range each parameter of the physics profile is searched over, in PhysicsProfile field order
+PARAMETER_BOUNDS = (
+    (0.0, 1.5),  # ball_friction
+    (0.0, 1.0),  # ball_elasticity
+    (0.0, 1.5),  # pin_friction
+    (0.0, 1.0),  # pin_elasticity
+    (0.05, 1.0),  # pin_deck_friction
+)
+
+_simulator: ThrowSimulator | None = None
+
+
+@dataclass(frozen=True)
+class CalibrationTargets:
+    """
+    The statistics a physics profile is fitted to. Statistics that are None are not fitted.
+
+    :ivar strike_rate: The fraction of first balls that are strikes.
+    :ivar mean_pins: The mean number of pins knocked down by a first ball.
+    :ivar leave_rates: The fraction of first balls that leave each leave bitmask standing.
+    """
+
+    strike_rate: float | None = None
+    mean_pins: float | None = None
+    leave_rates: dict[int, float] = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, path: str | Path) -> Self:
+        """
+        Loads targets from a JSON file, with each leave given as a string of the numbers of its standing pins.
+
+        :param path: The path of the file to load.
+        :return: The loaded targets.
+        """
+        with open(path) as file:
+            data = json.load(file)
+        leave_rates = {
+            leave_from_pins([int(pin) for pin in pins.split()]): float(rate)
+            for pins, rate in data.get("leave_rates", {}).items()
+        }
+        return cls(data.get("strike_rate"), data.get("mean_pins"), leave_rates)
+
+    def loss(self, leaves: np.ndarray) -> float:
+        """
+        Measures how far the outcomes of a batch of throws are from the targets, as the sum of the squared errors of
+        each statistic, with the mean pins knocked down scaled to a fraction of the rack.
+
+        :param leaves: The leave bitmask left standing by each throw.
+        :return: The loss, which is 0 when every statistic matches its target.
+        """
+        loss = 0.0
+        if self.strike_rate is not None:
+            loss += (np.mean(leaves == 0) - self.strike_rate) ** 2
+        if self.mean_pins is not None:
+            loss += ((NUM_PINS - STANDING_COUNT[leaves].mean() - self.mean_pins) / NUM_PINS) ** 2
+        for leave, rate in self.leave_rates.items():
+            loss += (np.mean(leaves == leave) - rate) ** 2
+        return float(loss)
+
+
+@dataclass(frozen=True)
+class CalibrationResult:
+    """
+    The outcome of calibrating the physics profile.
+
+    :ivar profile: The profile closest to the targets.
+    :ivar loss: The loss of the profile.
+    :ivar strike_rate: The strike rate the profile produced.
+    :ivar mean_pins: The mean pins knocked down the profile produced.
+    :ivar simulations: The number of throws simulated during the calibration.
+    :ivar history: The lowest loss after each round.
+    """
+
+    profile: PhysicsProfile
+    loss: float
+    strike_rate: float
+    mean_pins: float
+    simulations: int
+    history: tuple[float, ...]
+
+
+def simulate_profile(task: tuple[tuple[float, ...], int, float, float, float, float, tuple[int, ...]]) -> np.ndarray:
+    """
+    Simulates a batch of first-ball throws with a physics profile. Runs inside a worker process.
+
+    :param task: A tuple (parameters, throws, angle_mean, angle_spread, velocity_mean, velocity_spread, seed), where
+        the parameters are the profile's fields in order.
+    :return: An array containing the leave bitmask left standing by each throw.
+    """
+    global _simulator
+    if _simulator is None:
+        _simulator = ThrowSimulator()
+    parameters, throws, angle_mean, angle_spread, velocity_mean, velocity_spread, seed = task
+    _simulator.apply_profile(PhysicsProfile(*parameters))
+    rng = np.random.default_rng(list(seed))
+    angles = rng.normal(angle_mean, angle_spread, throws)
+    velocities = rng.normal(velocity_mean, velocity_spread, throws)
+    return np.array(
+        [_simulator.simulate(float(a), float(v), FULL_RACK).leave for a, v in zip(angles, velocities, strict=True)],
+        dtype=np.uint16,
+    )
+
+
+def calibrate(
+        targets: CalibrationTargets,
+        throws: int = 200,
+        rounds: int = 8,
+        population: int = 16,
+        angle_mean: float = 0.0,
+        angle_spread: float = 1.5,
+        velocity_mean: float = consts.THROW_VELOCITY,
+        velocity_spread: float = 15.0,
+        initial: PhysicsProfile | None = None,
+        seed: int = 0,
+        workers: int | None = None,
+) -> CalibrationResult:
+    """
+    Searches for the physics profile whose simulated first balls best match the target statistics.
+
+    :param targets: The statistics to fit.
+    :param throws: The number of throws simulated for each candidate profile.
+    :param rounds: The number of rounds of candidates.
+    :param population: The number of candidate profiles simulated in each round.
+    :param angle_mean: The mean angle of the modelled bowlers' throws, in degrees.
+    :param angle_spread: The standard deviation of the modelled bowlers' angles, in degrees.
+    :param velocity_mean: The mean velocity of the modelled bowlers' throws, in inches per second.
+    :param velocity_spread: The standard deviation of the modelled bowlers' velocities, in inches per second.
+    :param initial: The profile the search starts around. Defaults to the default profile.
+    :param seed: The seed used to draw the candidates and throws. The same seed always produces the same result.
+    :param workers: The number of worker processes. Defaults to the number of CPU cores.
+    :return: The best profile found, with the statistics it produced.
+    """
+    workers = workers or os.cpu_count() or 1
+    rng = np.random.default_rng(seed)
+    low, high = np.array(PARAMETER_BOUNDS).T
+    mean = np.array(astuple(initial or PhysicsProfile()), dtype=np.float64).clip(low, high)
+    spread = (high - low) / 4
+    min_spread = (high - low) / 100
+    best_parameters, best_loss, best_leaves = mean, math.inf, np.zeros(0, dtype=np.uint16)
+    history = []
+    # Include the initial profile in the first round, so that the result is never worse than it
+    candidates = np.vstack((mean, rng.normal(mean, spread, (population - 1, len(mean))))).clip(low, high)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for round_index in range(rounds):
+            tasks = [
+                (
+                    tuple(candidate.tolist()), throws, angle_mean, angle_spread, velocity_mean, velocity_spread,
+                    (seed, round_index),
+                )
+                for candidate in candidates
+            ]
+            results = list(executor.map(simulate_profile, tasks))
+            losses = np.array([targets.loss(leaves) for leaves in results])
+            best = int(np.argmin(losses))
+            if losses[best] < best_loss:
+                best_parameters, best_loss, best_leaves = candidates[best], float(losses[best]), results[best]
+            history.append(best_loss)
+            # Refit the distribution to the candidates closest to the targets
+            elites = candidates[np.argsort(losses, kind="stable")[:max(2, population // 4)]]
+            mean = elites.mean(axis=0)
+            spread = np.maximum(elites.std(axis=0), min_spread)
+            candidates = rng.normal(mean, spread, (population, len(mean))).clip(low, high)
+    return CalibrationResult(
+        profile=PhysicsProfile(*best_parameters.tolist()),
+        loss=best_loss,
+        strike_rate=float(np.mean(best_leaves == 0)),
+        mean_pins=float(NUM_PINS - STANDING_COUNT[best_leaves].mean()),
+        simulations=rounds * population * throws,
+        history=tuple(history),
+    )
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Command line entry point for calibrating the physics profile and saving it."""
+    parser = argparse.ArgumentParser(description="Fit the ball and pin physics to real-world bowling statistics.")
+    parser.add_argument("targets", help="JSON file of target statistics")
+    parser.add_argument("--throws", type=int, default=200, help="Throws simulated per candidate profile")
+    parser.add_argument("--rounds", type=int, default=8)
+    parser.add_argument("--population", type=int, default=16, help="Candidate profiles per round")
+    parser.add_argument("--angle-mean", type=float, default=0.0, help="Mean angle of the bowlers (degrees)")
+    parser.add_argument("--angle-spread", type=float, default=1.5, help="Std. dev. of the bowlers' angles (degrees)")
+    parser.add_argument("--velocity-mean", type=float, default=consts.THROW_VELOCITY, help="Mean velocity (in/s)")
+    parser.add_argument("--velocity-spread", type=float, default=15.0, help="Std. dev. of velocities (in/s)")
+    parser.add_argument("--initial", default=None, help="Profile to start the search around")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (defaults to CPU count)")
+    parser.add_argument("--output", default="physics_profile.json")
+    args = parser.parse_args(argv)
+    result = calibrate(
+        CalibrationTargets.load(args.targets),
+        throws=args.throws,
+        rounds=args.rounds,
+        population=args.population,
+        angle_mean=args.angle_mean,
+        angle_spread=args.angle_spread,
+        velocity_mean=args.velocity_mean,
+        velocity_spread=args.velocity_spread,
+        initial=PhysicsProfile.load(args.initial) if args.initial else None,
+        seed=args.seed,
+        workers=args.workers,
+    )
+    result.profile.save(args.output)
+    for parameter in fields(PhysicsProfile):
+        print(f"{parameter.name}: {getattr(result.profile, parameter.name)}")
+    print(f"Strike rate {result.strike_rate:.3f}, {result.mean_pins:.2f} pins per first ball, loss {result.loss:.5f} "
+          f"after {result.simulations} simulated throws")
+    print(f"Saved profile to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
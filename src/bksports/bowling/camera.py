@@ -0,0 +1,178 @@
+"""
+The view of the bowling lane drawn on the screen.
+
+A Camera holds the scale and offset between game coordinates (origin at the bottom centre of the alley, unit is
+inches) and screen coordinates (origin at the top left of the screen, unit is pixels), worked out once whenever the
+view changes rather than on every conversion. It can show the whole lane at once, or follow the ball down the lane
+zoomed in far enough for the pins to be drawn at a readable size.
+
+When following the ball, the view moves down the lane in fixed steps rather than with every movement of the ball.
+Every change of view means repainting the background and redrawing the whole screen, so moving in steps keeps most
+frames of a throw down to redrawing only the sprites that have moved.
+"""
+
+from enum import Enum, auto
+
+import numpy as np
+
+import bksports.constants as consts
+
+
+class CameraMode(Enum):
+    OVERVIEW = auto()
+    FOLLOW = auto()
+
+
+class Camera:
+    """
+    Converts positions and lengths from game coordinates to screen coordinates, for the current view of the lane.
+
+    Game x-coordinates are always centred on the screen, and the same scale is used in both directions, so that the
+    lane keeps its aspect ratio.
+
+    :ivar FOLLOW_VIEW_LENGTH: The length of lane shown on the screen when following the ball, in inches.
+    :ivar FOLLOW_MARGIN: How far past each end of the lane the view may go when following the ball, in inches.
+    :ivar FOLLOW_STEP: The distance the view moves down the lane at a time when following the ball, in inches.
+    :ivar screen_width: The width of the screen, in pixels.
+    :ivar screen_height: The height of the screen, in pixels.
+    :ivar mode: Whether the camera shows the whole lane or follows the ball.
+    :ivar scale: The number of pixels per inch.
+    :ivar offset_x: The screen x-coordinate of the game x-coordinate 0.
+    :ivar offset_y: The screen y-coordinate of the game y-coordinate 0.
+    :ivar version: Counts how many times the view has changed, so that anything drawn for an earlier view can tell it
+        needs to be redrawn.
+    """
+
+    FOLLOW_VIEW_LENGTH = 10 * 12  # inches
+    FOLLOW_MARGIN = 12  # inches
+    FOLLOW_STEP = FOLLOW_VIEW_LENGTH / 4  # inches
+
+    def __init__(
+            self,
+            screen_width: int = consts.SCREEN_WIDTH,
+            screen_height: int = consts.SCREEN_HEIGHT,
+            mode: CameraMode = CameraMode.OVERVIEW,
+    ) -> None:
+        """
+        Initialises the camera, showing the start of the lane.
+
+        :param screen_width: The width of the screen, in pixels.
+        :param screen_height: The height of the screen, in pixels.
+        :param mode: Whether the camera shows the whole lane or follows the ball. Defaults to showing the whole lane.
+        """
+        self.screen_width = screen_width
+        self.screen_height = screen_height
+        self.mode = mode
+        self.scale = 0.0
+        self.offset_x = screen_width / 2
+        self.offset_y = 0.0
+        self.version = 0
+        self.update(0.0)
+
+    def set_view(self, centre_y: float, view_length: float) -> bool:
+        """
+        Shows a length of the lane centred on a position down the lane.
+
+        The offset is rounded to whole pixels, so that the view only changes when the lane would actually move on the
+        screen.
+
+        :param centre_y: The game y-coordinate shown at the centre of the screen.
+        :param view_length: The length of lane shown from the top to the bottom of the screen, in inches.
+        :return: True if the view has changed, otherwise False.
+        """
+        scale = self.screen_height / view_length
+        offset_y = round(self.screen_height / 2 + centre_y * scale)
+        if scale == self.scale and offset_y == self.offset_y:
+            return False
+        self.scale = scale
+        self.offset_y = offset_y
+        self.version += 1
+        return True
+
+    def set_mode(self, mode: CameraMode) -> None:
+        """
+        Changes whether the camera shows the whole lane or follows the ball. The view changes in the next call to
+        update().
+
+        :param mode: The new mode.
+        """
+        self.mode = mode
+
+    def update(self, ball_y: float) -> bool:
+        """
+        Moves the view for the ball's current position.
+
+        When following the ball, it is kept in the lower part of the screen so that more of the lane ahead of it is
+        visible, until the pin deck reaches the top of the screen. The view moves in steps of FOLLOW_STEP, so the
+        ball drifts up the screen between steps.
+
+        :param ball_y: The game y-coordinate of the ball.
+        :return: True if the view has changed, otherwise False.
+        """
+        if self.mode == CameraMode.OVERVIEW:
+            return self.set_view(consts.LANE_LENGTH / 2, consts.LANE_LENGTH)
+        half_length = self.FOLLOW_VIEW_LENGTH / 2
+        # Round to the nearest step, which keeps the ball between 1/8 and 3/8 of the way up the screen
+        stepped_y = round((ball_y + half_length / 2) / self.FOLLOW_STEP) * self.FOLLOW_STEP
+        centre_y = min(
+            max(stepped_y, half_length - self.FOLLOW_MARGIN),
+            consts.LANE_LENGTH + self.FOLLOW_MARGIN - half_length,
+        )
+        return self.set_view(centre_y, self.FOLLOW_VIEW_LENGTH)
+
+    def to_screen(self, game_x: float, game_y: float) -> tuple[float, float]:
+        """
+        Converts a position from game coordinates to screen coordinates.
+
+        :param game_x: The game x-coordinate (horizontal position on lane).
+        :param game_y: The game y-coordinate (distance down the lane).
+        :return: A tuple (screen_x, screen_y) in screen (pixel) coordinates.
+        """
+        return self.offset_x + game_x * self.scale, self.offset_y - game_y * self.scale
+
+    def to_screen_many(self, game_positions: np.ndarray) -> np.ndarray:
+        """
+        Converts many positions from game coordinates to screen coordinates at once.
+
+        :param game_positions: An array with a game (x, y) position in each row, which may have no rows.
+        :return: An array with the screen (x, y) position of each game position in a row.
+        """
+        positions = np.asarray(game_positions, dtype=float).reshape(-1, 2)
+        return positions * (self.scale, -self.scale) + (self.offset_x, self.offset_y)
+
+    @property
+    def screen_rect(self) -> tuple[int, int, int, int]:
+        """Returns the area of the screen as a (left, top, width, height) tuple."""
+        return 0, 0, self.screen_width, self.screen_height
+
+    def length_to_screen(self, length: float) -> float:
+        """
+        Converts a length from inches to pixels.
+
+        :param length: The length in inches.
+        :return: The length in pixels.
+        """
+        return length * self.scale
+
+    def contains(self, screen_x: float, screen_y: float, radius: float) -> bool:
+        """
+        Checks if a circle overlaps the screen.
+
+        :param screen_x: The screen x-coordinate of the centre of the circle.
+        :param screen_y: The screen y-coordinate of the centre of the circle.
+        :param radius: The radius of the circle, in pixels.
+        :return: True if the circle overlaps the screen, otherwise False.
+        """
+        return -radius < screen_x < self.screen_width + radius and -radius < screen_y < self.screen_height + radius
+
+    def is_visible(self, screen_positions: np.ndarray, radius: float) -> np.ndarray:
+        """
+        Checks which of many circles overlap the screen.
+
+        :param screen_positions: An array with the screen (x, y) position of the centre of each circle in a row.
+        :param radius: The radius of every circle, in pixels.
+        :return: An array with True for each circle that overlaps the screen, otherwise False.
+        """
+        x = screen_positions[:, 0]
+        y = screen_positions[:, 1]
+        return (x > -radius) & (x < self.screen_width + radius) & (y > -radius) & (y < self.screen_height + radius)
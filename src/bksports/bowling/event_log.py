@@ -0,0 +1,256 @@
+"""
+A structured log of game events, written to a compact binary file without blocking the game loop.
+
+Events (throws, pin hits, gutter balls and the ends of frames and games) are written as fixed-size records into a
+preallocated in-memory buffer, which takes around a microsecond and never touches the file. A background
+thread swaps the buffer for a spare one every flush interval (or as soon as it is half full) and writes the full one
+to the file, so even events raised inside pymunk's collision callbacks never wait for I/O. If the buffer ever fills
+before it is flushed, further events are counted as dropped rather than blocking, and the number dropped is written
+as a final EVENTS_DROPPED record (and warned about) when the log is closed.
+
+File layout (little endian):
+    header      MAGIC, FORMAT_VERSION and the size of each record (see HEADER)
+    records     EVENT_DTYPE[...], in the order the events happened
+"""
+
+import argparse
+import struct
+import threading
+import time
+import warnings
+from enum import IntEnum
+from pathlib import Path
+from typing import BinaryIO, Self
+
+import numpy as np
+
+from bksports.bowling.score_keeper import ScoreKeeper
+
+MAGIC = b"BKEV"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sHH")  # magic, version, record size
+
+EVENT_DTYPE = np.dtype([
+    ("time", "<f8"),  # Seconds since the log was opened
+    ("type", "u1"),  # EventType
+    ("source", "u1"),  # The lane or player the event happened to
+    ("value", "<i2"),  # Pin index, pins knocked down or score, depending on the type
+    ("x", "<f4"),  # Game x-coordinate, or throw angle
+    ("y", "<f4"),  # Game y-coordinate, or throw velocity
+])
+
+
+class EventType(IntEnum):
+    THROW_STARTED = 1  # x: angle, y: velocity
+    PIN_HIT = 2  # value: pin index in PinSet order, x, y: position of the pin
+    GUTTER = 3  # x, y: position of the ball
+    THROW_ENDED = 4  # value: pins knocked down by the throw
+    FRAME_ENDED = 5  # value: total score so far
+    GAME_ENDED = 6  # value: final score
+    EVENTS_DROPPED = 7  # value: events dropped because the buffer was full (up to 32767), x: the exact number
+
+
+class EventLog:
+    """
+    Buffers events in memory and writes them to a log file on a background thread.
+
+    :ivar DEFAULT_CAPACITY: The number of events buffered by default between flushes.
+    :ivar path: The path of the log file.
+    :ivar capacity: The number of events the buffer holds.
+    :ivar flush_interval: The longest time events wait in the buffer before being written, in seconds.
+    :ivar dropped: The number of events dropped because the buffer was full.
+    """
+
+    DEFAULT_CAPACITY = 4096
+
+    def __init__(self, path: str | Path, capacity: int = DEFAULT_CAPACITY, flush_interval: float = 0.5) -> None:
+        """
+        Initialises the log, creating (or replacing) the log file and starting the thread that writes to it.
+
+        :param path: The path of the log file.
+        :param capacity: The number of events the buffer holds.
+        :param flush_interval: The longest time events wait in the buffer before being written, in seconds.
+        """
+        self.path = Path(path)
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._records = np.zeros(capacity, dtype=EVENT_DTYPE)
+        self._spare = np.zeros(capacity, dtype=EVENT_DTYPE)
+        self._count = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = threading.Event()
+        self._start = time.perf_counter()
+        # Write the header here, so that a log file that cannot be created fails loudly rather than on the thread
+        with open(self.path, "wb") as file:
+            file.write(HEADER.pack(MAGIC, FORMAT_VERSION, EVENT_DTYPE.itemsize))
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def log(self, event_type: EventType, value: int = 0, x: float = 0.0, y: float = 0.0, source: int = 0) -> None:
+        """
+        Records an event in the buffer, without waiting for any I/O.
+
+        :param event_type: The type of the event.
+        :param value: The event's integer value (see EventType).
+        :param x: The event's x value (see EventType).
+        :param y: The event's y value (see EventType).
+        :param source: The lane or player the event happened to.
+        """
+        with self._lock:
+            i = self._count
+            if i == self.capacity:
+                self.dropped += 1
+                return
+            self._records[i] = (time.perf_counter() - self._start, event_type, source, value, x, y)
+            self._count = i + 1
+        if i == self.capacity // 2:
+            self._wake.set()  # Flush early, before the buffer fills
+
+    def source(self, source: int) -> EventSource:
+        """
+        Returns a handle that logs events for one lane or player.
+
+        :param source: The lane or player the events happen to.
+        :return: The handle.
+        """
+        return EventSource(self, source)
+
+    def _flush(self, file: BinaryIO) -> None:
+        """
+        Swaps the buffer for the spare one, then writes the events that were in it to the file.
+
+        :param file: The log file, open for appending.
+        """
+        with self._lock:
+            records, count = self._records, self._count
+            self._records, self._spare = self._spare, records
+            self._count = 0
+        if count:
+            file.write(records[:count].tobytes())
+            file.flush()
+
+    def _run(self) -> None:
+        """
+        Flushes the buffer every flush interval, or when woken early, until the log is closed, then flushes the events
+        still buffered. Only this thread writes to the file, so a buffer is never reused while it is being written.
+        """
+        with open(self.path, "ab") as file:
+            while not self._closed.is_set():
+                self._wake.wait(self.flush_interval)
+                self._wake.clear()
+                self._flush(file)
+            self._flush(file)
+            if self.dropped:
+                record = (time.perf_counter() - self._start, EventType.EVENTS_DROPPED, 0, min(self.dropped, 32767),
+                          self.dropped, 0.0)
+                file.write(np.array([record], dtype=EVENT_DTYPE).tobytes())
+
+    def close(self) -> None:
+        """
+        Stops the background thread once it has written any events still buffered and closed the file, warning if any
+        events were dropped.
+        """
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._wake.set()
+        self._thread.join()
+        if self.dropped:
+            warnings.warn(
+                f"{self.dropped} events were dropped from {self.path} because the buffer of {self.capacity} was full",
+                RuntimeWarning,
+                stacklevel=2,
+            )
+
+
+class EventSource:
+    """
+    Logs events for one lane or player, so that the objects raising events need not know which lane they are in.
+
+    :ivar event_log: The log the events are written to.
+    :ivar source: The lane or player the events happen to.
+    """
+
+    __slots__ = ("event_log", "source")
+
+    def __init__(self, event_log: EventLog, source: int) -> None:
+        """
+        Initialises the handle.
+
+        :param event_log: The log to write events to.
+        :param source: The lane or player the events happen to.
+        """
+        self.event_log = event_log
+        self.source = source
+
+    def log(self, event_type: EventType, value: int = 0, x: float = 0.0, y: float = 0.0) -> None:
+        """
+        Records an event for the lane or player, without waiting for any I/O.
+
+        :param event_type: The type of the event.
+        :param value: The event's integer value (see EventType).
+        :param x: The event's x value (see EventType).
+        :param y: The event's y value (see EventType).
+        """
+        self.event_log.log(event_type, value, x, y, self.source)
+
+
+def log_event(events: EventSource | None, event_type: EventType, value: int = 0) -> None:
+    """
+    Records an event, if the game is logged.
+
+    :param events: The handle to log the event for, or None if the game is not logged.
+    :param event_type: The type of the event.
+    :param value: The event's integer value (see EventType).
+    """
+    if events is not None:
+        events.log(event_type, value)
+
+
+def log_frame_ended(events: EventSource | None, score_keeper: ScoreKeeper) -> None:
+    """
+    Records the end of a frame with the total score so far, and the end of the game if it was the last frame.
+
+    :param events: The handle to log the events for, or None if the game is not logged.
+    :param score_keeper: The score of the player whose frame ended.
+    """
+    log_event(events, EventType.FRAME_ENDED, score_keeper.total_score)
+    if score_keeper.finished:
+        log_event(events, EventType.GAME_ENDED, score_keeper.total_score)
+
+
+def read_event_log(path: str | Path) -> np.ndarray:
+    """
+    Reads every event from a log file.
+
+    :param path: The path of the log file.
+    :return: A structured array of the events, with the fields of EVENT_DTYPE.
+    """
+    with open(path, "rb") as file:
+        magic, version, record_size = HEADER.unpack(file.read(HEADER.size))
+        if magic != MAGIC or version != FORMAT_VERSION or record_size != EVENT_DTYPE.itemsize:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} event log")
+        return np.fromfile(file, dtype=EVENT_DTYPE)
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Command line entry point for printing an event log as text."""
+    parser = argparse.ArgumentParser(description="Print the events in a game event log.")
+    parser.add_argument("path", help="Event log file")
+    args = parser.parse_args(argv)
+    for event in read_event_log(args.path):
+        event_type = EventType(int(event["type"]))
+        print(f"{event['time']:10.3f}s  source {event['source']}  {event_type.name:<14} value={event['value']:<4} "
+              f"x={event['x']:.2f} y={event['y']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
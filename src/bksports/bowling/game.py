@@ -1,67 +1,31 @@
-import math
 from enum import Enum, auto
 
 import pygame
-import pymunk
 
 import bksports.constants as consts
+from bksports.bowling.ai import AimSearch, MonteCarloBowler
 from bksports.bowling.ball import Ball, BallState
-from bksports.bowling.conversions import convert_game_to_screen_pos
-from bksports.bowling.pin import Pin, PinSet
+from bksports.bowling.camera import Camera, CameraMode
+from bksports.bowling.event_log import (
+    EventLog,
+    EventSource,
+    EventType,
+    log_event,
+    log_frame_ended,
+)
+from bksports.bowling.opponent import CpuOpponent
+from bksports.bowling.physics import create_space
+from bksports.bowling.pin import PinSet
+from bksports.bowling.preview import OutcomePredictor
+from bksports.bowling.profiler import FrameProfiler, ProfilerOverlay
+from bksports.bowling.renderer import LaneRenderer, setup_bowling_scene
 from bksports.bowling.score_keeper import ScoreKeeper
+from bksports.bowling.scoreboard import Player, ScoreLabel, draw_scorecards
+from bksports.bowling.stepper import PhysicsStepper
 
 # background = pygame.image.load('../../assets/background.jpg')
 
 
-def setup_bowling_scene(screen: pygame.Surface) -> None:
-    """
-    Sets up the bowling scene.
-
-    Renders the background, alley, and gutters on the provided screen.
-
-    :param screen: The screen surface where the bowling scene will be drawn.
-    """
-    # Fill the screen with a white background
-    screen.fill(consts.WHITE)
-    # Calculate the alley and gutter dimensions
-    left_boundary_x, _ = convert_game_to_screen_pos(consts.LEFT_BOUNDARY, 0)
-    right_boundary_x, _ = convert_game_to_screen_pos(consts.RIGHT_BOUNDARY, 0)
-    left_gutter_x, _ = convert_game_to_screen_pos(
-        consts.LEFT_BOUNDARY - consts.GUTTER_WIDTH, 0
-    )
-    right_gutter_x, _ = convert_game_to_screen_pos(consts.RIGHT_BOUNDARY, 0)
-    gutter_width = consts.GUTTER_WIDTH * (consts.ALLEY_SCREEN_WIDTH / consts.LANE_WIDTH)
-    # Draw the alley
-    pygame.draw.rect(
-        screen,
-        consts.BUTCHER_BLOCK,
-        pygame.Rect(
-            left_boundary_x, 0, consts.ALLEY_SCREEN_WIDTH, consts.ALLEY_SCREEN_HEIGHT
-        ),
-    )
-    # Draw the left gutter
-    pygame.draw.rect(
-        screen,
-        consts.BLACK,
-        pygame.Rect(left_gutter_x, 0, gutter_width, consts.ALLEY_SCREEN_HEIGHT),
-    )
-    # Draw the right gutter
-    pygame.draw.rect(
-        screen,
-        consts.BLACK,
-        pygame.Rect(right_gutter_x, 0, gutter_width, consts.ALLEY_SCREEN_HEIGHT),
-    )
-
-
-BALL_SCREEN_RADIUS = Ball.RADIUS * (consts.ALLEY_SCREEN_WIDTH / consts.LANE_WIDTH)
-BALL_SCREEN_WIDTH = BALL_SCREEN_RADIUS * 2
-BALL_SCREEN_HEIGHT = BALL_SCREEN_RADIUS * 2
-
-PIN_SCREEN_RADIUS = Pin.RADIUS * (consts.ALLEY_SCREEN_WIDTH / consts.LANE_WIDTH)
-PIN_SCREEN_WIDTH = PIN_SCREEN_RADIUS * 2
-PIN_SCREEN_HEIGHT = PIN_SCREEN_RADIUS * 2
-
-
 class BowlingFrameState(Enum):
     WAITING_FOR_THROW = auto()
     END_OF_FRAME = auto()
@@ -75,6 +39,7 @@ class BowlingGame:
     line, and scorekeeper.
 
     :ivar space: The pymunk Space the game exists in.
+    :ivar stepper: Steps the space in fixed timesteps, independently of the frame rate.
     :ivar screen: The Pygame screen Surface used to render the game elements.
     :ivar clock: The Pygame Clock object used to manage frame rate and timekeeping.
     :ivar running: Indicates whether the game is running.
@@ -82,20 +47,46 @@ class BowlingGame:
     :ivar _throw_angle: The angle at which the ball should be thrown at, and that the trajectory line should be at.
     :ivar ball: The ball object used in the game.
     :ivar pin_set: Contains and manages the set of pins in the game.
-    :ivar trajectory_line: Displays and calculates the trajectory of the ball based on its angle and position.
+    :ivar renderer: Draws the ball, pins and trajectory line over the background, redrawing only what has changed.
+        Its camera follows the ball down the lane, or shows the whole lane (toggled with C).
     :ivar score_keeper: Keeps track of the game score and manages throws.
+    :ivar predictor: Predicts the outcome of the throw being aimed, to show as the trajectory line.
+    :ivar opponent: The computer opponent, which plays each frame after the player has finished it, if any.
+    :ivar players: The name and scorekeeper of the player, and of the opponent if there is one.
+    :ivar score_label: Shows each player's total over the lane.
+    :ivar score_rect: The area of the screen the score label was last drawn over, if any.
+    :ivar ai_bowler: Chooses throws for the player when asked to (with A), if the game has one.
+    :ivar ai_search: The AI bowler's search for the current throw, while it is running.
+    :ivar profiler: Times each phase of every frame, if profiling is enabled.
+    :ivar profiler_overlay: Shows the profiler's timings over the lane (toggled with F3), if profiling is enabled.
+    :ivar profiler_rect: The area of the screen the profiler overlay was last drawn over, if any.
+    :ivar events: Logs the player's throws, pin hits, frames and game, if the game is logged.
+    :ivar opponent_events: Logs the opponent's frames and game, if the game is logged.
     """
 
-    def __init__(self, screen: pygame.Surface, clock: pygame.time.Clock) -> None:
+    def __init__(
+            self,
+            screen: pygame.Surface,
+            clock: pygame.time.Clock,
+            opponent: CpuOpponent | None = None,
+            ai_bowler: MonteCarloBowler | None = None,
+            profiler: FrameProfiler | None = None,
+            event_log: EventLog | None = None,
+    ) -> None:
         """
         Initialises the bowling game with a defined screen and clock.
 
         :param screen: The Pygame screen surface used to render the game elements.
         :param clock: The Pygame Clock object used to manage frame rate and timekeeping.
+        :param opponent: The computer opponent to play against, if any.
+        :param ai_bowler: The AI bowler to choose throws for the player with, if any. It should be created (and its
+            workers started) before the game, and is not shut down by it.
+        :param profiler: The profiler to time each frame with. Defaults to no profiling.
+        :param event_log: The log to record the game's events in. Defaults to no logging.
         """
         # Initialise pymunk variables
-        self.space = pymunk.Space()
-        self.space.gravity = (0, 0)
+        self.space = create_space()
+        self.stepper = PhysicsStepper(self.space)
         # Intialise pygame variables
         self.screen = screen
         self.clock = clock
@@ -106,6 +97,31 @@ class BowlingGame:
         self.ball = Ball(self.space)
         self.pin_set = PinSet(self.space)
         self.score_keeper = ScoreKeeper()
+        self.predictor = OutcomePredictor()
+        self.opponent = opponent
+        self.ai_bowler = ai_bowler
+        self.ai_search: AimSearch | None = None
+        self.players: list[Player] = [("You", self.score_keeper)]
+        if opponent is not None:
+            self.players.append(("CPU", opponent.score_keeper))
+        self.score_label = ScoreLabel(self.players)
+        self.score_rect: pygame.Rect | None = None
+        self.renderer = LaneRenderer(
+            self.screen,
+            setup_bowling_scene,
+            self.ball,
+            self.pin_set,
+            self.stepper,
+            Camera(*self.screen.get_size(), mode=CameraMode.FOLLOW),
+        )
+        # Initialise event logging, with the player as source 0 and the opponent as source 1
+        self.events: EventSource | None = event_log.source(0) if event_log is not None else None
+        self.opponent_events: EventSource | None = event_log.source(1) if event_log is not None else None
+        self.ball.events = self.pin_set.events = self.events
+        # Initialise profiling
+        self.profiler = profiler
+        self.profiler_overlay = ProfilerOverlay(profiler) if profiler is not None else None
+        self.profiler_rect: pygame.Rect | None = None
         # Intialise other game variables
         self._throw_angle = 0.0
         self.tl_start_pos = None
@@ -113,6 +129,14 @@ class BowlingGame:
         # Set trajectory line start and end positions
         self.calculate_trajectory_line_pos()
 
+    @property
+    def throw_has_ended(self) -> bool:
+        """
+        Indicates whether the current throw has ended, which is as soon as the ball has finished and every pin on
+        the pin deck has come to rest.
+        """
+        return self.ball.state == BallState.FINISHED and self.pin_set.is_settled()
+
     @property
     def throw_angle(self) -> float:
         """Returns the value of _throw_angle."""
@@ -135,45 +159,47 @@ class BowlingGame:
         # print(self.throw_angle)
         # print(self.trajectory_line.angle)
 
-    def display_ball(self) -> None:
-        """Displays the ball on the screen, at a position relative to its coordinates in the game space."""
-        # print(f"Ball game pos: ({self.ball.x}, {self.ball.y})")
-        x, y = convert_game_to_screen_pos(self.ball.x, self.ball.y)
-        # print(f"Ball screen pos: ({self.x}, {self.y})")
-        # screen.blit(self.img, (self.x, self.y))
-        pygame.draw.circle(self.screen, consts.LIGHT_BLUE, (x, y), BALL_SCREEN_RADIUS)
-
-    def display_pins(self) -> None:
-        """Displays the pins on the screen, at positions relative to their coordinates in the game space."""
-        for pin in self.pin_set.pins:
-            if pin.removed:
-                continue
-            x, y = convert_game_to_screen_pos(pin.x, pin.y)
-            color = consts.RED if pin.hit else consts.BLACK
-            pygame.draw.circle(self.screen, color, (x, y), PIN_SCREEN_RADIUS)
-
     def calculate_trajectory_line_pos(self) -> None:
-        """Calculates and sets the trajectory line's start and end position based on its length and throw angle."""
-        length = 400
-        start_x = self.ball.x
-        start_y = self.ball.y
-        self.tl_start_pos = convert_game_to_screen_pos(start_x, start_y)
-        end_x = self.ball.x + length * math.sin(math.radians(self.throw_angle))
-        end_y = self.ball.y + length * math.cos(math.radians(self.throw_angle))
-        self.tl_end_pos = convert_game_to_screen_pos(end_x, end_y)
-        # print(f"Angle: {self.__angle}, end_y (game): {end_y}, end_pos (screen): {self.end_pos}")
-        # return start_pos, end_pos
-
-    def display_trajectory_line(self) -> None:
-        """Displays the trajectory line on the screen, at its calcuated start and end positions."""
-        pygame.draw.line(
-            self.screen, (255, 0, 0), self.tl_start_pos, self.tl_end_pos, 5
-        )
+        """
+        Predicts the outcome of throwing the ball at the throw angle into the pins left standing, and shows the
+        predicted path of the ball and the pins it is expected to knock down as the trajectory line.
+        """
+        prediction = self.predictor.predict(self.throw_angle, consts.THROW_VELOCITY, self.pin_set.leave)
+        self.tl_start_pos = prediction.ball_path[0]
+        self.tl_end_pos = prediction.ball_path[-1]
+        self.pin_set.sync()
+        positions = self.pin_set.positions.tolist()
+        knocked_positions = [
+            position for position, knocked in zip(positions, prediction.knocked, strict=True) if knocked
+        ]
+        self.renderer.trajectory_line.set_path(prediction.ball_path, knocked_positions)
+
+    def update_display(self) -> None:
+        """
+        Redraws the sprites that have changed, the score label, and the profiler overlay if it is shown, and updates
+        only the changed areas of the display.
+        """
+        self.renderer.trajectory_line.show(self.ball.state == BallState.STATIONARY)
+        # Restore the lane under the overlays' last positions, then draw the overlays over the sprites
+        previous_rects = [rect for rect in (self.score_rect, self.profiler_rect) if rect is not None]
+        for rect in previous_rects:
+            self.renderer.sprites.repaint_rect(rect)
+        dirty_rects = self.renderer.draw()
+        self.score_rect = self.score_label.draw(self.screen)
+        dirty_rects.extend(previous_rects)
+        dirty_rects.append(self.score_rect)
+        if self.profiler is None:
+            pygame.display.update(dirty_rects)
+            return
+        self.profiler_rect = self.profiler_overlay.draw(self.screen)
+        if self.profiler_rect is not None:
+            dirty_rects.append(self.profiler_rect)
+        self.profiler.mark("draw")
+        pygame.display.update(dirty_rects)
+        self.profiler.mark("flip")
 
     def handle_waiting_for_throw_state(self) -> None:
         """Handles logic and pygame rendering when the game is waiting for the user to make a throw."""
-        # Set up scene
-        setup_bowling_scene(self.screen)
         # Handle events
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
@@ -181,54 +207,102 @@ class BowlingGame:
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
                     self.running = False
-                elif event.key == pygame.K_SPACE:
-                    self.ball.throw(self.throw_angle, 317.0)
+                elif event.key == pygame.K_SPACE and self.ball.state == BallState.STATIONARY:
+                    self.throw_ball(consts.THROW_VELOCITY)
+                elif (
+                    event.key == pygame.K_a
+                    and self.ai_bowler is not None
+                    and self.ball.state == BallState.STATIONARY
+                    and self.ai_search is None
+                ):
+                    self.ai_search = self.ai_bowler.search(self.pin_set.leave)
                 elif event.key == pygame.K_LEFT:
-                    self.throw_angle -= 0.5
+                    self.throw_angle -= consts.THROW_ANGLE_STEP
                 elif event.key == pygame.K_RIGHT:
-                    self.throw_angle += 0.5
+                    self.throw_angle += consts.THROW_ANGLE_STEP
+                elif event.key == pygame.K_c:
+                    camera = self.renderer.camera
+                    is_following = camera.mode == CameraMode.FOLLOW
+                    camera.set_mode(CameraMode.OVERVIEW if is_following else CameraMode.FOLLOW)
+                elif event.key == pygame.K_F3 and self.profiler_overlay is not None:
+                    self.profiler_overlay.toggle()
+                elif event.key == pygame.K_F4 and self.profiler is not None:
+                    self.profiler.export_csv(consts.PROFILE_CSV_PATH)
+                    self.profiler_overlay.notify(f"Saved {consts.PROFILE_CSV_PATH}")
+        # Throw for the player once the AI bowler has run out of time to choose
+        if self.ai_search is not None and self.ai_search.is_finished:
+            best = self.ai_search.best()
+            self.ai_search = None
+            if self.ball.state == BallState.STATIONARY:
+                if best is None:  # Nothing was simulated in time, so throw as aimed
+                    self.throw_ball(consts.THROW_VELOCITY)
+                else:
+                    self.throw_angle = best.angle
+                    self.throw_ball(best.velocity)
+
+    def throw_ball(self, velocity: float) -> None:
+        """
+        Throws the ball at the throw angle, abandoning any search the AI bowler is running.
+
+        :param velocity: The velocity of the ball in inches per second.
+        """
+        if self.ai_search is not None:
+            self.ai_search.cancel()
+            self.ai_search = None
+        self.ball.throw(self.throw_angle, velocity)
+        self.stepper.reset()
 
     def handle_end_of_throw_state(self) -> None:
         """Handles logic and pygame rendering when the current throw has just ended."""
-        print(f"Pins hit: {self.pin_set.pins_hit}")
+        self.pin_set.pins_hit = self.pin_set.count_hit()
+        log_event(self.events, EventType.THROW_ENDED, self.pin_set.pins_hit)
         # If the frame has now finished after this throw
-        if self.score_keeper.add_throw(self.pin_set.pins_hit):
-            self.pin_set = PinSet()  # Reset pins
+        if self.score_keeper.add_leave(self.pin_set.leave):
+            self.pin_set.reset()  # Reset pins
             self.throw_angle = 0  # Reset throw angle
-            print(self.score_keeper)  # Show current game state TODO: Display on screen
+            log_frame_ended(self.events, self.score_keeper)
+            if self.opponent is not None:
+                self.opponent.play_frame()
+                log_frame_ended(self.opponent_events, self.opponent.score_keeper)
             self.frame_state = BowlingFrameState.END_OF_FRAME
+        elif self.score_keeper.needs_new_rack:  # After a strike or spare in the final frame
+            self.pin_set.reset()
         else:
             self.pin_set.clean_up()  # Remove knocked pins
-        self.ball = Ball()  # Reset ball
+        self.ball.reset()  # Reset ball
         self.pin_set.pins_hit = 0
+        self.stepper.reset()
+        self.calculate_trajectory_line_pos()  # Predict the next throw into the pins now standing
 
     def handle_end_of_frame_state(self) -> None:
         """Handles logic and pygame rendering when the current frame has ended."""
-        self.screen.fill(consts.WHITE)
+        draw_scorecards(self.screen, self.players, "Press SPACE to start the next frame")
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 self.running = False
             elif event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
                 self.frame_state = BowlingFrameState.WAITING_FOR_THROW
+                self.renderer.repaint()  # The bowling scene has been drawn over
         pygame.display.update()
-        self.space.step(1 / consts.FRAMES_PER_SECOND)
+        self.stepper.advance(self.clock.tick(consts.FRAMES_PER_SECOND) / 1000)
 
     def handle_finished_game(self) -> None:
-        self.screen.fill(consts.BLACK)
+        draw_scorecards(self.screen, self.players, "Game over - press SPACE to finish")
         for event in pygame.event.get():
             if event.type == pygame.QUIT or (
                 event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE
             ):
                 self.running = False
         pygame.display.update()
-        self.space.step(1 / consts.FRAMES_PER_SECOND)
+        self.stepper.advance(self.clock.tick(consts.FRAMES_PER_SECOND) / 1000)
 
     def run(self) -> None:
         """
         Executes the main game loop.
 
         Loops through listening for keystroke events, displaying elements on screen, and updating game state
-        accordingly while the game is running. Also limits the game to run at 60fps.
+        accordingly while the game is running. Also limits the game to run at 60fps, while the physics is stepped at
+        its own fixed rate.
         """
         while self.running:
             # If the game is finished
@@ -236,18 +310,27 @@ class BowlingGame:
                 self.handle_finished_game()
             # If the game is waiting for the player to throw the ball
             elif self.frame_state == BowlingFrameState.WAITING_FOR_THROW:
+                profiler = self.profiler
+                if profiler is not None:
+                    profiler.begin_frame()
                 self.handle_waiting_for_throw_state()
-                if self.ball.state == BallState.STATIONARY:
-                    self.display_trajectory_line()
-                elif self.ball.state == BallState.FINISHED:
+                if profiler is not None:
+                    profiler.mark("events")
+                if self.throw_has_ended:
                     self.handle_end_of_throw_state()
-                # Display ball and pins
-                self.display_ball()
-                self.display_pins()
-                pygame.display.update()
-                # Limit FPS to 60, and updates per frame to 1/60
-                self.clock.tick(consts.FRAMES_PER_SECOND)
-                self.space.step(1 / consts.FRAMES_PER_SECOND)
+                if profiler is not None:
+                    profiler.mark("state")
+                # Display ball, pins and trajectory line
+                self.update_display()
+                # Limit FPS to 60, and step the physics through the time the frame took
+                frame_time = self.clock.tick(consts.FRAMES_PER_SECOND) / 1000
+                if profiler is not None:
+                    profiler.mark("idle")
+                self.stepper.advance(frame_time)
+                self.ball.update()
+                if profiler is not None:
+                    profiler.mark("physics")
+                    profiler.end_frame()
             # If the current frame has ended
             elif self.frame_state == BowlingFrameState.END_OF_FRAME:
                 self.handle_end_of_frame_state()
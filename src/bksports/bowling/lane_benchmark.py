@@ -0,0 +1,133 @@
+"""
+Benchmarks of stepping several lanes at once, for measuring whether stepping lanes on threads scales across cores.
+
+Every lane throws into a full rack, each at a different angle, and is stepped through 60 Hz frames until every throw
+has ended: once with the lanes stepped one after another, as LaneManager does by default, and once on a pool of
+threads, as it does when given workers. Threads only step lanes in parallel while pymunk runs with the GIL released,
+and each lane's step also holds the GIL for its Python parts (the substep loop, reading the pins' state and the
+collision callbacks), so the speedup is only known by measuring it.
+"""
+
+import argparse
+import json
+import os
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+
+import numpy as np
+
+import bksports.constants as consts
+from bksports.bowling.lanes import Lane
+
+FRAME_TIME = 1 / consts.FRAMES_PER_SECOND  # seconds
+MAX_FRAMES = 20 * consts.FRAMES_PER_SECOND  # Stop stepping a throw that has not ended after 20 seconds
+
+
+@dataclass(frozen=True)
+class LaneBenchmark:
+    """
+    The results of benchmarking a number of lanes.
+
+    :ivar num_lanes: The number of lanes stepped at once.
+    :ivar workers: The number of threads the lanes were stepped on.
+    :ivar frames: The number of frames stepped until every throw had ended.
+    :ivar serial_frame_time: The best time taken to step every lane through a frame one after another, in seconds.
+    :ivar threaded_frame_time: The best time taken to step every lane through a frame on the threads, in seconds.
+    :ivar speedup: How many times faster stepping the lanes on threads was than stepping them one after another.
+    """
+
+    num_lanes: int
+    workers: int
+    frames: int
+    serial_frame_time: float
+    threaded_frame_time: float
+    speedup: float
+
+
+def throw_lanes(num_lanes: int) -> list[Lane]:
+    """
+    Creates lanes and throws the ball on each, at angles spread evenly either side of straight.
+
+    :param num_lanes: The number of lanes.
+    :return: The lanes, with their balls rolling.
+    """
+    lanes = [Lane() for _ in range(num_lanes)]
+    for lane, angle in zip(lanes, np.linspace(-2.0, 2.0, num_lanes).tolist(), strict=True):
+        lane.throw_angle = angle
+        lane.throw(consts.THROW_VELOCITY)
+    return lanes
+
+
+def step_until_ended(lanes: list[Lane], step: Callable[[list[Lane]], list[bool]]) -> tuple[float, int]:
+    """
+    Steps lanes through frames until every lane's throw has ended.
+
+    :param lanes: The lanes, with their balls rolling.
+    :param step: Steps every lane through one frame, returning whether each lane's throw has ended.
+    :return: A tuple (elapsed, frames) of the time taken in seconds and the number of frames stepped.
+    """
+    frames = 0
+    start = time.perf_counter()
+    while frames < MAX_FRAMES:
+        frames += 1
+        if all(step(lanes)):
+            break
+    return time.perf_counter() - start, frames
+
+
+def benchmark_lanes(num_lanes: int, workers: int | None = None, repeats: int = 3) -> LaneBenchmark:
+    """
+    Times stepping lanes through the same throws one after another and on a pool of threads.
+
+    :param num_lanes: The number of lanes.
+    :param workers: The number of threads. Defaults to one for each lane, up to the number of CPU cores.
+    :param repeats: The number of times each way of stepping is timed. The best time of each is kept.
+    :return: The results.
+    """
+    workers = workers or min(num_lanes, os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        def step_serially(lanes: list[Lane]) -> list[bool]:
+            return [lane.advance(FRAME_TIME) for lane in lanes]
+
+        def step_threaded(lanes: list[Lane]) -> list[bool]:
+            return list(executor.map(lambda lane: lane.advance(FRAME_TIME), lanes))
+
+        step_until_ended(throw_lanes(num_lanes), step_threaded)  # Warm up before timing
+        serial = [step_until_ended(throw_lanes(num_lanes), step_serially) for _ in range(repeats)]
+        threaded = [step_until_ended(throw_lanes(num_lanes), step_threaded) for _ in range(repeats)]
+    frames = serial[0][1]
+    serial_frame_time = min(elapsed for elapsed, _ in serial) / frames
+    threaded_frame_time = min(elapsed for elapsed, _ in threaded) / frames
+    return LaneBenchmark(
+        num_lanes=num_lanes,
+        workers=workers,
+        frames=frames,
+        serial_frame_time=serial_frame_time,
+        threaded_frame_time=threaded_frame_time,
+        speedup=serial_frame_time / threaded_frame_time,
+    )
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Command line entry point for benchmarking stepping lanes serially and on threads."""
+    parser = argparse.ArgumentParser(description="Compare stepping several lanes one after another and on threads.")
+    parser.add_argument("--lanes", type=int, nargs="+", default=[1, 2, 4, 8], help="Numbers of lanes to benchmark")
+    parser.add_argument("--workers", type=int, default=None, help="Threads (defaults to lanes, up to CPU count)")
+    parser.add_argument("--repeats", type=int, default=3, help="Times each way of stepping is timed")
+    parser.add_argument("--output", default=None, help="Also save the results as JSON to this file")
+    args = parser.parse_args(argv)
+    results = [benchmark_lanes(num_lanes, args.workers, args.repeats) for num_lanes in args.lanes]
+    print(f"{os.cpu_count()} CPU cores")
+    print(f"{'lanes':>5}{'threads':>9}{'frames':>8}{'serial ms':>11}{'threaded ms':>13}{'speedup':>9}")
+    for result in results:
+        print(f"{result.num_lanes:>5}{result.workers:>9}{result.frames:>8}{result.serial_frame_time * 1000:>11.3f}"
+              f"{result.threaded_frame_time * 1000:>13.3f}{result.speedup:>8.2f}x")
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump([asdict(result) for result in results], file, indent=4)
+
+
+if __name__ == "__main__":
+    main()
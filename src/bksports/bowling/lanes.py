@@ -0,0 +1,285 @@
+"""
+An alley of several bowling lanes played at once in one window.
+
+Every lane has its own pymunk Space, ball, pins and score, so lanes never interact and can be stepped at the same
+time. Each frame, every lane is stepped, then drawn into its own strip of the window, and the changed areas of every
+lane are updated on the display together.
+
+By default the lanes are stepped one after another. pymunk only releases the GIL inside Chipmunk's own step, which is
+a small part of stepping a lane (around 6% when profiled, the rest being the Python substep loop, reading the pins'
+state and the collision callbacks), so stepping lanes on threads cannot scale across cores. lane-benchmark measured
+threads to be slower than stepping serially, while eight lanes stepped serially take around 0.4 ms of each 16.7 ms
+frame. A pool of threads can still be asked for, for machines where lane-benchmark measures it to be faster.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pygame
+
+import bksports.constants as consts
+from bksports.bowling.ball import Ball, BallState
+from bksports.bowling.camera import Camera, CameraMode
+from bksports.bowling.event_log import (
+    EventLog,
+    EventSource,
+    EventType,
+    log_event,
+    log_frame_ended,
+)
+from bksports.bowling.physics import create_space
+from bksports.bowling.pin import PinSet
+from bksports.bowling.preview import OutcomePredictor
+from bksports.bowling.renderer import LaneRenderer, setup_bowling_scene
+from bksports.bowling.score_keeper import ScoreKeeper
+from bksports.bowling.scoreboard import ScoreLabel
+from bksports.bowling.stepper import PhysicsStepper
+
+# Keys that select a lane directly, in lane order
+LANE_KEYS = (pygame.K_1, pygame.K_2, pygame.K_3, pygame.K_4, pygame.K_5, pygame.K_6, pygame.K_7, pygame.K_8, pygame.K_9)
+
+
+class Lane:
+    """
+    A single lane of the alley, simulated independently of every other lane.
+
+    :ivar space: The pymunk Space the lane exists in.
+    :ivar stepper: Steps the lane's space in fixed timesteps.
+    :ivar ball: The lane's ball.
+    :ivar pin_set: The lane's set of pins.
+    :ivar score_keeper: Keeps track of the score of the game on the lane.
+    :ivar throw_angle: The angle the next ball is thrown at, in degrees.
+    :ivar events: Logs the lane's throws, pin hits, frames and game, if the alley is logged.
+    """
+
+    def __init__(self, events: EventSource | None = None) -> None:
+        """
+        Initialises the lane with a full rack, ready for the first throw.
+
+        :param events: The handle to log the lane's events with. Defaults to no logging.
+        """
+        self.space = create_space()
+        self.stepper = PhysicsStepper(self.space)
+        self.ball = Ball(self.space)
+        self.pin_set = PinSet(self.space)
+        self.score_keeper = ScoreKeeper()
+        self.throw_angle = 0.0
+        self.events = events
+        self.ball.events = self.pin_set.events = events
+
+    @property
+    def throw_has_ended(self) -> bool:
+        """
+        Indicates whether the current throw has ended, which is as soon as the ball has finished and every pin on
+        the pin deck has come to rest.
+        """
+        return self.ball.state == BallState.FINISHED and self.pin_set.is_settled()
+
+    def throw(self, velocity: float) -> None:
+        """
+        Throws the ball at the throw angle, if it is ready to be thrown and the game has not finished.
+
+        :param velocity: The velocity of the ball in inches per second.
+        """
+        if self.ball.state == BallState.STATIONARY and not self.score_keeper.finished:
+            self.ball.throw(self.throw_angle, velocity)
+            self.stepper.reset()
+
+    def advance(self, frame_time: float) -> bool:
+        """
+        Steps the lane's space through the time a frame took and updates the ball. Safe to call on a worker thread,
+        as it only touches this lane.
+
+        :param frame_time: The real time the last rendered frame took, in seconds.
+        :return: True if the current throw has ended and needs to be scored with end_throw(), otherwise False.
+        """
+        self.stepper.advance(frame_time)
+        self.ball.update()
+        return self.throw_has_ended
+
+    def end_throw(self) -> bool:
+        """
+        Scores the throw that has just ended and sets the lane up for the next throw.
+
+        :return: True if the throw completed a frame, otherwise False.
+        """
+        log_event(self.events, EventType.THROW_ENDED, self.pin_set.count_hit())
+        frame_finished = self.score_keeper.add_leave(self.pin_set.leave)
+        if frame_finished or self.score_keeper.needs_new_rack:
+            self.pin_set.reset()
+        else:
+            self.pin_set.clean_up()  # Remove knocked pins
+        if frame_finished:
+            self.throw_angle = 0.0
+            log_frame_ended(self.events, self.score_keeper)
+        self.ball.reset()
+        self.stepper.reset()
+        return frame_finished
+
+
+class LaneManager:
+    """
+    Runs several lanes at once in one window, side by side, with one lane selected to be played at a time.
+
+    Number keys select a lane directly and TAB selects the next one. The arrow keys aim, SPACE throws and C changes
+    the camera of the selected lane. Lanes that have been thrown keep rolling while another lane is being aimed.
+
+    :ivar screen: The Pygame screen Surface the lanes are drawn on.
+    :ivar clock: The Pygame Clock object used to manage frame rate and timekeeping.
+    :ivar running: Indicates whether the alley is running.
+    :ivar lanes: The lanes of the alley, from left to right.
+    :ivar renderers: The renderer drawing each lane into its strip of the screen, in lane order.
+    :ivar score_labels: Shows the score of each lane's game over its strip, in lane order.
+    :ivar score_rects: The area of its strip each lane's score label was last drawn over, in lane order.
+    :ivar selected: The index of the lane being played.
+    :ivar predictor: Predicts the outcome of the throw being aimed on the selected lane.
+    :ivar executor: The pool of threads the lanes are stepped on, if they are not stepped one after another.
+    :ivar event_log: The log the lanes' events are recorded in, if any.
+    """
+
+    def __init__(
+            self,
+            screen: pygame.Surface,
+            clock: pygame.time.Clock,
+            num_lanes: int,
+            workers: int | None = None,
+            event_log: EventLog | None = None,
+    ) -> None:
+        """
+        Initialises the alley, dividing the screen into an equal strip for each lane.
+
+        :param screen: The Pygame screen surface the lanes are drawn on.
+        :param clock: The Pygame Clock object used to manage frame rate and timekeeping.
+        :param num_lanes: The number of lanes.
+        :param workers: The number of threads the lanes are stepped on. Defaults to stepping them one after another,
+            which lane-benchmark measured to be faster.
+        :param event_log: The log to record the lanes' events in, with each lane's index as its source. Defaults to
+            no logging.
+        """
+        self.screen = screen
+        self.clock = clock
+        self.running = True
+        self.event_log = event_log
+        self.lanes = [Lane(event_log.source(i) if event_log is not None else None) for i in range(num_lanes)]
+        lane_width = screen.get_width() // num_lanes
+        lane_height = screen.get_height()
+        self.renderers = [
+            LaneRenderer(
+                screen.subsurface(pygame.Rect(i * lane_width, 0, lane_width, lane_height)),
+                setup_bowling_scene,
+                lane.ball,
+                lane.pin_set,
+                lane.stepper,
+                Camera(lane_width, lane_height),
+            )
+            for i, lane in enumerate(self.lanes)
+        ]
+        self.score_labels = [ScoreLabel([(f"{i + 1}:", lane.score_keeper)]) for i, lane in enumerate(self.lanes)]
+        self.score_rects: list[pygame.Rect | None] = [None] * num_lanes
+        self.selected = 0
+        self.predictor = OutcomePredictor()
+        self.executor = ThreadPoolExecutor(max_workers=workers) if workers is not None and workers > 1 else None
+        self.calculate_trajectory_line_pos()
+
+    @property
+    def selected_lane(self) -> Lane:
+        """Returns the lane being played."""
+        return self.lanes[self.selected]
+
+    def select(self, index: int) -> None:
+        """
+        Selects a lane to be played, showing its trajectory line.
+
+        :param index: The index of the lane.
+        """
+        if 0 <= index < len(self.lanes):
+            self.selected = index
+            self.calculate_trajectory_line_pos()
+
+    def calculate_trajectory_line_pos(self) -> None:
+        """
+        Predicts the outcome of throwing the selected lane's ball at its throw angle, and shows the predicted path
+        of the ball and the pins it is expected to knock down as the lane's trajectory line.
+        """
+        lane = self.selected_lane
+        prediction = self.predictor.predict(lane.throw_angle, consts.THROW_VELOCITY, lane.pin_set.leave)
+        lane.pin_set.sync()
+        positions = lane.pin_set.positions.tolist()
+        knocked_positions = [
+            position for position, knocked in zip(positions, prediction.knocked, strict=True) if knocked
+        ]
+        self.renderers[self.selected].trajectory_line.set_path(prediction.ball_path, knocked_positions)
+
+    def handle_events(self) -> None:
+        """Handles the player's input for the selected lane."""
+        lane = self.selected_lane
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                self.running = False
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
+                    self.running = False
+                elif event.key in LANE_KEYS:
+                    self.select(LANE_KEYS.index(event.key))
+                elif event.key == pygame.K_TAB:
+                    self.select((self.selected + 1) % len(self.lanes))
+                elif event.key == pygame.K_SPACE:
+                    lane.throw(consts.THROW_VELOCITY)
+                elif event.key in (pygame.K_LEFT, pygame.K_RIGHT):
+                    step = consts.THROW_ANGLE_STEP if event.key == pygame.K_RIGHT else -consts.THROW_ANGLE_STEP
+                    if -5 <= lane.throw_angle + step <= 5:
+                        lane.throw_angle += step
+                        self.calculate_trajectory_line_pos()
+                elif event.key == pygame.K_c:
+                    camera = self.renderers[self.selected].camera
+                    is_following = camera.mode == CameraMode.FOLLOW
+                    camera.set_mode(CameraMode.OVERVIEW if is_following else CameraMode.FOLLOW)
+
+    def advance(self, frame_time: float) -> None:
+        """
+        Steps every lane through the time a frame took, on the pool of threads if there is one, then scores any
+        throws that have ended.
+
+        :param frame_time: The real time the last rendered frame took, in seconds.
+        """
+        if self.executor is None:
+            throws_ended = [lane.advance(frame_time) for lane in self.lanes]
+        else:
+            throws_ended = list(self.executor.map(lambda lane: lane.advance(frame_time), self.lanes))
+        for i, (lane, throw_ended) in enumerate(zip(self.lanes, throws_ended, strict=True)):
+            if throw_ended:
+                lane.end_throw()
+                if i == self.selected:
+                    self.calculate_trajectory_line_pos()  # Predict the next throw into the pins now standing
+
+    def draw(self) -> None:
+        """
+        Redraws every lane's changed sprites and score label, and updates the changed areas of every lane on the
+        display at once.
+        """
+        dirty_rects = []
+        for i, (lane, renderer) in enumerate(zip(self.lanes, self.renderers, strict=True)):
+            renderer.trajectory_line.show(i == self.selected and lane.ball.state == BallState.STATIONARY)
+            # Restore the lane under the score label's last position, then draw the label over the sprites
+            previous_rect = self.score_rects[i]
+            if previous_rect is not None:
+                renderer.sprites.repaint_rect(previous_rect)
+            lane_rects = renderer.draw()
+            self.score_rects[i] = self.score_labels[i].draw(renderer.screen)
+            lane_rects.extend(rect for rect in (previous_rect, self.score_rects[i]) if rect is not None)
+            # Convert the changed areas from the lane's strip to the whole screen
+            offset = renderer.screen.get_abs_offset()
+            dirty_rects.extend(rect.move(offset) for rect in lane_rects)
+        pygame.display.update(dirty_rects)
+
+    def run(self) -> None:
+        """
+        Executes the main loop of the alley, until the window is closed.
+
+        Limits the alley to run at 60fps, while every lane's physics is stepped at its own fixed rate.
+        """
+        while self.running:
+            self.handle_events()
+            self.draw()
+            self.advance(self.clock.tick(consts.FRAMES_PER_SECOND) / 1000)
+        if self.executor is not None:
+            self.executor.shutdown()
@@ -0,0 +1,195 @@
+"""
+Compact bitmask representation of pin leaves, with precomputed lookup tables.
+
+A leave is the set of pins left standing, as a 10-bit integer with bit (n - 1) set if pin number n is standing, using
+the standard pin numbering: pin 1 is the headpin at the front, pins 2-3 are the second row, 4-6 the third row and 7-10
+the back row, each row numbered from left to right. Every table here is indexed directly by leave, so analysing many
+leaves at once (e.g. a whole throw log stored as a NumPy array) is a single array lookup.
+"""
+
+from pathlib import Path
+from typing import Self
+
+import numpy as np
+
+NUM_PINS = 10
+NUM_LEAVES = 1 << NUM_PINS
+FULL_RACK = NUM_LEAVES - 1
+EMPTY_RACK = 0
+
+# Standard pin number of each pin in PinSet.pins order (back row first, headpin last)
+PIN_NUMBERS = (7, 8, 9, 10, 4, 5, 6, 2, 3, 1)
+
+# (row, column) of each pin number on a triangular grid, with row 0 at the front and columns 2 apart within a row
+PIN_GRID_POSITIONS = {
+    1: (0, 0),
+    2: (1, -1), 3: (1, 1),
+    4: (2, -2), 5: (2, 0), 6: (2, 2),
+    7: (3, -3), 8: (3, -1), 9: (3, 1), 10: (3, 3),
+}
+
+
+def pin_bit(pin_number: int) -> int:
+    """
+    Returns the bit representing a pin in a leave.
+
+    :param pin_number: The standard number of the pin (1 to 10).
+    :return: The pin's bit.
+    """
+    return 1 << (pin_number - 1)
+
+
+def leave_from_pins(pin_numbers: list[int]) -> int:
+    """
+    Creates a leave from the numbers of the pins left standing.
+
+    :param pin_numbers: The standard numbers of the standing pins.
+    :return: The leave.
+    """
+    leave = EMPTY_RACK
+    for pin_number in pin_numbers:
+        leave |= pin_bit(pin_number)
+    return leave
+
+
+def pins_from_leave(leave: int) -> list[int]:
+    """
+    Returns the numbers of the pins standing in a leave.
+
+    :param leave: The leave.
+    :return: The standard numbers of the standing pins, in ascending order.
+    """
+    return [pin_number for pin_number in range(1, NUM_PINS + 1) if leave & pin_bit(pin_number)]
+
+
+def _is_split(leave: int) -> bool:
+    """
+    Classifies a leave as a split, following the USBC definition: the headpin is down, and at least one pin is down
+    between, or immediately ahead of and between, two or more standing pins.
+
+    Standing pins are grouped together when they touch diagonally, or one stands directly behind the other (a
+    "sleeper"). Pins side by side in the same row only touch through the pin ahead of them, so the leave is a split if
+    the standing pins form more than one group.
+
+    :param leave: The leave to classify.
+    :return: True if the leave is a split, otherwise False.
+    """
+    pins = pins_from_leave(leave)
+    if leave & pin_bit(1) or len(pins) < 2:
+        return False
+    # Flood fill the groups of standing pins, starting from the first
+    group = {pins[0]}
+    unvisited = [pins[0]]
+    while unvisited:
+        row, column = PIN_GRID_POSITIONS[unvisited.pop()]
+        for other in pins:
+            if other in group:
+                continue
+            other_row, other_column = PIN_GRID_POSITIONS[other]
+            is_diagonal = abs(row - other_row) == 1 and abs(column - other_column) == 1
+            is_sleeper = abs(row - other_row) == 2 and column == other_column
+            if is_diagonal or is_sleeper:
+                group.add(other)
+                unvisited.append(other)
+    return len(group) < len(pins)
+
+
+# Lookup tables, indexed by leave
+STANDING_COUNT = np.array([leave.bit_count() for leave in range(NUM_LEAVES)], dtype=np.uint8)
+IS_SPLIT = np.array([_is_split(leave) for leave in range(NUM_LEAVES)], dtype=bool)
+
+# Conversion between leaves and bitmasks of PinSet.pins indexes (bit i set for PinSet.pins[i])
+INDEX_MASK_TO_LEAVE = np.array(
+    [
+        leave_from_pins([PIN_NUMBERS[i] for i in range(NUM_PINS) if mask & (1 << i)])
+        for mask in range(NUM_LEAVES)
+    ],
+    dtype=np.uint16,
+)
+LEAVE_TO_INDEX_MASK = np.argsort(INDEX_MASK_TO_LEAVE).astype(np.uint16)
+
+
+class ConversionTable:
+    """
+    Tracks how often each leave has been converted (every standing pin knocked down with the next ball).
+
+    Attempts can come from real throw logs or from simulations, and tables from either can be saved, loaded and
+    combined.
+
+    :ivar attempts: The number of recorded attempts at each leave, indexed by leave.
+    :ivar conversions: The number of recorded conversions of each leave, indexed by leave.
+    """
+
+    def __init__(self) -> None:
+        """Initialises an empty conversion table."""
+        self.attempts = np.zeros(NUM_LEAVES, dtype=np.uint32)
+        self.conversions = np.zeros(NUM_LEAVES, dtype=np.uint32)
+
+    @property
+    def rates(self) -> np.ndarray:
+        """
+        Returns the conversion rate of every leave, indexed by leave. Leaves without any attempts have a rate of NaN.
+        """
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.conversions / self.attempts
+
+    def rate(self, leave: int) -> float:
+        """
+        Returns the conversion rate of a leave.
+
+        :param leave: The leave.
+        :return: The fraction of attempts at the leave that converted it, or NaN if there have been no attempts.
+        """
+        attempts = self.attempts[leave]
+        return float(self.conversions[leave] / attempts) if attempts else float("nan")
+
+    def record(self, leave: int, converted: bool) -> None:
+        """
+        Records an attempt at converting a leave.
+
+        :param leave: The leave the attempt was made at.
+        :param converted: Whether the attempt converted the leave.
+        """
+        self.attempts[leave] += 1
+        self.conversions[leave] += converted
+
+    def record_many(self, leaves: np.ndarray, converted: np.ndarray) -> None:
+        """
+        Records many attempts at converting leaves at once.
+
+        :param leaves: The leave each attempt was made at.
+        :param converted: Whether each attempt converted its leave.
+        """
+        np.add.at(self.attempts, leaves, 1)
+        np.add.at(self.conversions, leaves, np.asarray(converted, dtype=np.uint32))
+
+    def merge(self, other: ConversionTable) -> None:
+        """
+        Adds the attempts recorded in another table to this one.
+
+        :param other: The table to add.
+        """
+        self.attempts += other.attempts
+        self.conversions += other.conversions
+
+    def save(self, path: str | Path) -> None:
+        """
+        Saves the table to a compressed NumPy (.npz) file.
+
+        :param path: The path of the file to save to.
+        """
+        np.savez_compressed(path, attempts=self.attempts, conversions=self.conversions)
+
+    @classmethod
+    def load(cls, path: str | Path) -> Self:
+        """
+        Loads a table saved by save().
+
+        :param path: The path of the file to load from.
+        :return: The loaded table.
+        """
+        table = cls()
+        with np.load(path) as data:
+            table.attempts[:] = data["attempts"]
+            table.conversions[:] = data["conversions"]
+        return table
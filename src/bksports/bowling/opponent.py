@@ -0,0 +1,47 @@
+"""
+A computer opponent that plays its frames by drawing throw outcomes from a precomputed outcome index.
+"""
+
+import numpy as np
+
+from bksports.bowling.outcome_index import OutcomeIndex
+from bksports.bowling.score_keeper import ScoreKeeper
+
+
+class CpuOpponent:
+    """
+    Plays a game of bowling without simulating any physics, by drawing the outcome of each throw from an outcome
+    index.
+
+    The opponent always aims at the (angle, velocity) cell that knocks down the most pins on average at its current
+    leave. How consistent it is depends on the noise the index was built with.
+
+    :ivar index: The outcome index throws are drawn from.
+    :ivar rng: The random number generator used to draw throws.
+    :ivar score_keeper: Keeps track of the opponent's score.
+    """
+
+    def __init__(self, index: OutcomeIndex, seed: int | None = None) -> None:
+        """
+        Initialises the opponent at the start of a game.
+
+        :param index: The outcome index to draw throws from.
+        :param seed: The seed for drawing throws. Defaults to a random seed.
+        """
+        self.index = index
+        self.rng = np.random.default_rng(seed)
+        self.score_keeper = ScoreKeeper()
+
+    def throw(self) -> bool:
+        """
+        Makes a single throw at the opponent's current leave.
+
+        :return: True if the throw completed the opponent's frame, otherwise False.
+        """
+        leave = self.index.sample(self.score_keeper.rack_leave, self.rng)
+        return self.score_keeper.add_leave(leave)
+
+    def play_frame(self) -> None:
+        """Throws until the opponent's current frame has been completed."""
+        while not self.score_keeper.finished and not self.throw():
+            pass
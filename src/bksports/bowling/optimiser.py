@@ -0,0 +1,302 @@
+"""
+Optimisation of throw parameters, for finding the throw that knocks down the most pins at a leave.
+
+A throw is scored by the mean number of pins it knocks down over a number of samples, each perturbed by the same
+normally distributed noise (common random numbers), so that two throws are always compared under identical noise
+and the score changes smoothly enough to search. The search evaluates the whole 0.5 degree aiming grid at a few
+velocities as one parallel batch, then refines the best angle and velocity with golden-section searches within a
+grid step either side of them.
+"""
+
+import argparse
+import math
+import os
+from collections.abc import Callable, Sequence
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Self
+
+import numpy as np
+
+import bksports.constants as consts
+from bksports.bowling.leaves import FULL_RACK, STANDING_COUNT, leave_from_pins
+from bksports.bowling.physics import (
+    get_physics_profile,
+    get_solver_profile,
+    set_profiles,
+)
+from bksports.bowling.sweep import MAX_THROW_ANGLE, MIN_THROW_ANGLE, simulate_cell
+
+INVERSE_GOLDEN_RATIO = (math.sqrt(5) - 1) / 2
+
+
+@dataclass(frozen=True)
+class OptimisationResult:
+    """
+    The outcome of optimising the throw at a leave.
+
+    :ivar leave: The leave bitmask of the pins standing before the throw.
+    :ivar angle: The best angle found, in degrees.
+    :ivar velocity: The best velocity found, in inches per second.
+    :ivar expected_pins: The mean number of pins knocked down by the best throw over its samples.
+    :ivar simulations: The number of throws simulated during the optimisation.
+    :ivar iterations: The number of golden-section iterations taken.
+    :ivar converged: Whether both golden-section searches narrowed their bracket below the tolerance before running
+        out of iterations.
+    :ivar history: The best expected pins after the grid search and after each golden-section iteration.
+    """
+
+    leave: int
+    angle: float
+    velocity: float
+    expected_pins: float
+    simulations: int
+    iterations: int
+    converged: bool
+    history: tuple[float, ...] = field(default=())
+
+
+class ThrowOptimiser:
+    """
+    Finds the angle and velocity that knock down the most pins at a leave, simulating throws in parallel.
+
+    Each throw evaluated is simulated once for each sample, with the samples split across the workers. Throws that
+    have already been evaluated for a leave are remembered, so the searches never simulate the same throw twice.
+
+    :ivar samples: The number of noisy samples each throw is scored over.
+    :ivar angle_spread: The standard deviation of the noise added to each sample's angle, in degrees.
+    :ivar velocity_spread: The standard deviation of the noise added to each sample's velocity, in inches per second.
+    :ivar seed: The seed used to generate the noise.
+    :ivar angle_step: The spacing of the grid of angles evaluated first, in degrees.
+    :ivar angle_tolerance: The bracket width at which the search over angles stops, in degrees.
+    :ivar velocity_tolerance: The bracket width at which the search over velocities stops, in inches per second.
+    :ivar max_iterations: The most iterations each golden-section search may take.
+    :ivar workers: The number of worker processes.
+    :ivar executor: The pool the throws are simulated in.
+    """
+
+    def __init__(
+            self,
+            samples: int = 8,
+            angle_spread: float = 0.25,
+            velocity_spread: float = 5.0,
+            seed: int = 0,
+            angle_step: float = consts.THROW_ANGLE_STEP,
+            angle_tolerance: float = 0.05,
+            velocity_tolerance: float = 1.0,
+            max_iterations: int = 30,
+            workers: int | None = None,
+            executor: Executor | None = None,
+    ) -> None:
+        """
+        Initialises the optimiser.
+
+        :param samples: The number of noisy samples each throw is scored over.
+        :param angle_spread: The standard deviation of the noise added to each sample's angle, in degrees.
+        :param velocity_spread: The standard deviation of the noise added to each sample's velocity, in inches per
+            second.
+        :param seed: The seed used to generate the noise. The same seed always produces the same result.
+        :param angle_step: The spacing of the grid of angles evaluated first, in degrees. Defaults to the game's step.
+        :param angle_tolerance: The bracket width at which the search over angles stops, in degrees.
+        :param velocity_tolerance: The bracket width at which the search over velocities stops, in inches per second.
+        :param max_iterations: The most iterations each golden-section search may take.
+        :param workers: The number of worker processes. Defaults to the number of CPU cores.
+        :param executor: The pool to simulate throws in. Defaults to a new process pool simulating with the current
+            physics and solver profiles, shut down by close().
+        """
+        self.samples = samples
+        self.angle_spread = angle_spread
+        self.velocity_spread = velocity_spread
+        self.seed = seed
+        self.angle_step = angle_step
+        self.angle_tolerance = angle_tolerance
+        self.velocity_tolerance = velocity_tolerance
+        self.max_iterations = max_iterations
+        self.workers = workers or os.cpu_count() or 1
+        self._owns_executor = executor is None
+        self.executor = executor or ProcessPoolExecutor(
+            max_workers=self.workers, initializer=set_profiles, initargs=(get_physics_profile(), get_solver_profile())
+        )
+        self._scores: dict[tuple[int, float, float], float] = {}
+        self._simulations = 0
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Shuts down the worker pool, if the optimiser created it."""
+        if self._owns_executor:
+            self.executor.shutdown()
+
+    def evaluate(self, leave: int, throws: Sequence[tuple[float, float]]) -> np.ndarray:
+        """
+        Scores a batch of throws at a leave, simulating every throw not already evaluated in parallel.
+
+        :param leave: The leave bitmask of the pins standing before the throws.
+        :param throws: The (angle, velocity) of each throw.
+        :return: The mean number of pins knocked down by each throw over its samples.
+        """
+        keys = [(leave, float(angle), float(velocity)) for angle, velocity in throws]
+        new_keys = list(dict.fromkeys(key for key in keys if key not in self._scores))
+        if new_keys:
+            # Split each throw's samples into one chunk per worker, with the same noise for every throw
+            num_chunks = min(self.samples, self.workers)
+            chunk_sizes = [len(chunk) for chunk in np.array_split(np.arange(self.samples), num_chunks)]
+            tasks = [
+                (angle, velocity, size, self.angle_spread, self.velocity_spread, (self.seed, chunk), leave)
+                for _, angle, velocity in new_keys
+                for chunk, size in enumerate(chunk_sizes)
+            ]
+            results = list(self.executor.map(simulate_cell, tasks))
+            standing = int(STANDING_COUNT[leave])
+            for i, key in enumerate(new_keys):
+                leaves = np.concatenate(results[i * num_chunks:(i + 1) * num_chunks])
+                self._scores[key] = float(standing - STANDING_COUNT[leaves].mean())
+            self._simulations += len(new_keys) * self.samples
+        return np.array([self._scores[key] for key in keys])
+
+    def optimise(self, leave: int, velocities: Sequence[float] | None = None) -> OptimisationResult:
+        """
+        Finds the throw that knocks down the most pins on average at a leave.
+
+        :param leave: The leave bitmask of the pins standing before the throw.
+        :param velocities: The velocities the grid of angles is evaluated at, in inches per second. The velocity
+            search refines the best of them. Defaults to the game's throw velocity alone, which is not refined.
+        :return: The best throw found, and how the search converged.
+        """
+        simulations_before = self._simulations
+        velocities = sorted(map(float, velocities)) if velocities is not None else [consts.THROW_VELOCITY]
+        # Evaluate the whole grid as one batch
+        num_angles = round((MAX_THROW_ANGLE - MIN_THROW_ANGLE) / self.angle_step) + 1
+        angles = np.linspace(MIN_THROW_ANGLE, MAX_THROW_ANGLE, num_angles).tolist()
+        grid = [(angle, velocity) for velocity in velocities for angle in angles]
+        scores = self.evaluate(leave, grid)
+        # Prefer the straightest of equally good throws, as it is furthest from the gutters
+        best = max(range(len(grid)), key=lambda i: (scores[i], -abs(grid[i][0])))
+        angle, velocity = grid[best]
+        history = [float(scores[best])]
+        # Refine the angle within a grid step either side, then the velocity likewise, keeping the grid's best throw
+        # unless a strictly better one is found
+        angle, best_score, angle_iterations, angle_converged = self._golden_section(
+            leave,
+            lambda a: (a, velocity),
+            max(MIN_THROW_ANGLE, angle - self.angle_step),
+            min(MAX_THROW_ANGLE, angle + self.angle_step),
+            (angle, float(scores[best])),
+            self.angle_tolerance,
+            history,
+        )
+        velocity_iterations = 0
+        velocity_converged = True
+        if len(velocities) > 1:
+            velocity_step = velocities[1] - velocities[0]
+            velocity, best_score, velocity_iterations, velocity_converged = self._golden_section(
+                leave,
+                lambda v: (angle, v),
+                max(velocities[0], velocity - velocity_step),
+                min(velocities[-1], velocity + velocity_step),
+                (velocity, best_score),
+                self.velocity_tolerance,
+                history,
+            )
+        return OptimisationResult(
+            leave=leave,
+            angle=angle,
+            velocity=velocity,
+            expected_pins=best_score,
+            simulations=self._simulations - simulations_before,
+            iterations=angle_iterations + velocity_iterations,
+            converged=angle_converged and velocity_converged,
+            history=tuple(history),
+        )
+
+    def _golden_section(
+            self,
+            leave: int,
+            to_throw: Callable[[float], tuple[float, float]],
+            low: float,
+            high: float,
+            start: tuple[float, float],
+            tolerance: float,
+            history: list[float],
+    ) -> tuple[float, float, int, bool]:
+        """
+        Maximises the score of a throw along one parameter with a golden-section search, keeping the best throw
+        evaluated (including the starting throw and the bracket's ends) as the answer.
+
+        :param leave: The leave bitmask of the pins standing before the throw.
+        :param to_throw: Returns the (angle, velocity) of the throw for a value of the parameter.
+        :param low: The lower end of the bracket searched.
+        :param high: The upper end of the bracket searched.
+        :param start: The value and score of the best throw already known, which is only replaced by a throw with a
+            strictly higher score.
+        :param tolerance: The bracket width at which the search stops.
+        :param history: The list the best score after each iteration is appended to.
+        :return: A tuple (value, score, iterations, converged) of the best value found, its score, the number of
+            iterations taken, and whether the bracket narrowed below the tolerance (or a throw knocked down every
+            standing pin every time).
+        """
+        standing = STANDING_COUNT[leave]
+        inner_low = high - INVERSE_GOLDEN_RATIO * (high - low)
+        inner_high = low + INVERSE_GOLDEN_RATIO * (high - low)
+        low_score, inner_low_score, inner_high_score, high_score = self.evaluate(
+            leave, [to_throw(low), to_throw(inner_low), to_throw(inner_high), to_throw(high)]
+        )
+        best_value, best_score = start
+        for value, score in ((low, low_score), (high, high_score)):
+            if score > best_score:
+                best_value, best_score = value, score
+        iterations = 0
+        while high - low > tolerance and iterations < self.max_iterations:
+            if max(best_score, inner_low_score, inner_high_score) == standing:
+                break  # Nothing can beat knocking down every standing pin with every sample
+            iterations += 1
+            for value, score in ((inner_low, inner_low_score), (inner_high, inner_high_score)):
+                if score > best_score:
+                    best_value, best_score = value, score
+            if inner_low_score >= inner_high_score:
+                high, inner_high, inner_high_score = inner_high, inner_low, inner_low_score
+                inner_low = high - INVERSE_GOLDEN_RATIO * (high - low)
+                inner_low_score = self.evaluate(leave, [to_throw(inner_low)])[0]
+            else:
+                low, inner_low, inner_low_score = inner_low, inner_high, inner_high_score
+                inner_high = low + INVERSE_GOLDEN_RATIO * (high - low)
+                inner_high_score = self.evaluate(leave, [to_throw(inner_high)])[0]
+            history.append(float(max(best_score, inner_low_score, inner_high_score)))
+        for value, score in ((inner_low, inner_low_score), (inner_high, inner_high_score)):
+            if score > best_score:
+                best_value, best_score = value, score
+        return best_value, float(best_score), iterations, bool(high - low <= tolerance or best_score == standing)
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Command line entry point for finding the best throw at a leave."""
+    parser = argparse.ArgumentParser(description="Find the throw that knocks down the most pins at a leave.")
+    parser.add_argument("--pins", type=int, nargs="+", default=None, help="Standing pins (defaults to a full rack)")
+    parser.add_argument("--velocities", type=float, nargs="+", default=None, help="Velocities to search between")
+    parser.add_argument("--samples", type=int, default=8, help="Noisy throws each candidate is scored over")
+    parser.add_argument("--angle-spread", type=float, default=0.25, help="Std. dev. of angle noise (degrees)")
+    parser.add_argument("--velocity-spread", type=float, default=5.0, help="Std. dev. of velocity noise (in/s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (defaults to CPU count)")
+    args = parser.parse_args(argv)
+    leave = leave_from_pins(args.pins) if args.pins else FULL_RACK
+    with ThrowOptimiser(
+        samples=args.samples,
+        angle_spread=args.angle_spread,
+        velocity_spread=args.velocity_spread,
+        seed=args.seed,
+        workers=args.workers,
+    ) as optimiser:
+        result = optimiser.optimise(leave, args.velocities)
+    print(f"Best throw: {result.angle:.2f} degrees at {result.velocity:.1f} in/s, "
+          f"{result.expected_pins:.2f} pins expected")
+    print(f"{'Converged' if result.converged else 'Did not converge'} after {result.iterations} iterations and "
+          f"{result.simulations} simulated throws")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""
+A precomputed index of simulated throw outcomes, for looking up how a throw is likely to end without simulating it.
+
+The index holds the leave left standing by a number of noisy samples of every (angle, velocity) cell at every leave,
+built offline with the headless throw simulator. It is saved as a small header followed by the raw outcome array, so
+that it can be memory-mapped and read straight from the page cache: opening even a large index costs almost nothing,
+and only the rows that are actually used are ever read from disk.
+
+File layout (little endian):
+    header      MAGIC, FORMAT_VERSION, then the number of angles, velocities, leaves and samples (see HEADER)
+    angles      float32[angles]
+    velocities  float32[velocities]
+    outcomes    uint16[leaves][angles][velocities][samples], the leave left standing by each sample
+"""
+
+import argparse
+import mmap
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+import bksports.constants as consts
+from bksports.bowling.leaves import NUM_LEAVES, STANDING_COUNT
+from bksports.bowling.physics import (
+    PhysicsProfile,
+    get_physics_profile,
+    get_solver_profile,
+    set_physics_profile,
+    set_profiles,
+)
+from bksports.bowling.sweep import MAX_THROW_ANGLE, MIN_THROW_ANGLE, simulate_cell
+
+MAGIC = b"BKOI"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sHHHII")  # magic, version, angles, velocities, leaves, samples
+
+
+def build_outcome_index(
+        angles: np.ndarray,
+        velocities: np.ndarray,
+        samples: int = 8,
+        angle_spread: float = 0.5,
+        velocity_spread: float = 5.0,
+        seed: int = 0,
+        workers: int | None = None,
+) -> np.ndarray:
+    """
+    Simulates noisy samples of every (angle, velocity) cell at every leave across a pool of processes, with the current
+    physics and solver profiles.
+
+    :param angles: The throw angles to index, in degrees.
+    :param velocities: The throw velocities to index, in inches per second.
+    :param samples: The number of throws simulated for each cell at each leave.
+    :param angle_spread: The standard deviation of the noise added to each sample's angle, in degrees.
+    :param velocity_spread: The standard deviation of the noise added to each sample's velocity, in inches per second.
+    :param seed: The seed used to generate the noise. The same seed always produces the same index.
+    :param workers: The number of worker processes. Defaults to the number of CPU cores.
+    :return: An array of shape (NUM_LEAVES, angles, velocities, samples) holding the leave left standing by each
+        sample. Every sample at the empty leave is the empty leave, as there is nothing left to knock down.
+    """
+    workers = workers or os.cpu_count() or 1
+    tasks = [
+        (float(angle), float(velocity), samples, angle_spread, velocity_spread, (seed, leave, i, j), leave)
+        for leave in range(1, NUM_LEAVES)
+        for i, angle in enumerate(angles)
+        for j, velocity in enumerate(velocities)
+    ]
+    # Hand each worker several chunks so that the load stays balanced as cells finish at different speeds
+    chunksize = max(1, len(tasks) // (workers * 4))
+    # Simulate with the current profiles, even in workers that do not inherit its memory
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=set_profiles, initargs=(get_physics_profile(), get_solver_profile())
+    ) as executor:
+        results = list(executor.map(simulate_cell, tasks, chunksize=chunksize))
+    outcomes = np.zeros((NUM_LEAVES, len(angles), len(velocities), samples), dtype=np.uint16)
+    outcomes[1:] = np.stack(results).reshape(NUM_LEAVES - 1, len(angles), len(velocities), samples)
+    return outcomes
+
+
+def write_outcome_index(path: str | Path, angles: np.ndarray, velocities: np.ndarray, outcomes: np.ndarray) -> None:
+    """
+    Writes an outcome index file.
+
+    :param path: The path of the file to write.
+    :param angles: The indexed throw angles, in degrees.
+    :param velocities: The indexed throw velocities, in inches per second.
+    :param outcomes: The array of outcomes returned by build_outcome_index().
+    """
+    num_leaves, num_angles, num_velocities, samples = outcomes.shape
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, FORMAT_VERSION, num_angles, num_velocities, num_leaves, samples))
+        file.write(np.asarray(angles, dtype="<f4").tobytes())
+        file.write(np.asarray(velocities, dtype="<f4").tobytes())
+        file.write(np.ascontiguousarray(outcomes, dtype="<u2").tobytes())
+
+
+class OutcomeIndex:
+    """
+    A memory-mapped outcome index file, opened the first time it is used.
+
+    :ivar path: The path of the index file.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        """
+        Initialises the index without opening the file yet.
+
+        :param path: The path of the index file.
+        """
+        self.path = Path(path)
+        self._mmap: mmap.mmap | None = None
+        self._angles: np.ndarray | None = None
+        self._velocities: np.ndarray | None = None
+        self._outcomes: np.ndarray | None = None
+        self._best_cells: dict[int, tuple[int, int]] = {}
+
+    def _open(self) -> None:
+        """Memory-maps the index file and creates array views of its contents, without reading the outcomes."""
+        with open(self.path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, num_angles, num_velocities, num_leaves, samples = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{self.path} is not a version {FORMAT_VERSION} outcome index")
+        offset = HEADER.size
+        self._angles = np.frombuffer(self._mmap, dtype="<f4", count=num_angles, offset=offset)
+        offset += self._angles.nbytes
+        self._velocities = np.frombuffer(self._mmap, dtype="<f4", count=num_velocities, offset=offset)
+        offset += self._velocities.nbytes
+        self._outcomes = np.frombuffer(
+            self._mmap, dtype="<u2", count=num_leaves * num_angles * num_velocities * samples, offset=offset
+        ).reshape(num_leaves, num_angles, num_velocities, samples)
+
+    @property
+    def angles(self) -> np.ndarray:
+        """Returns the indexed throw angles, in degrees."""
+        if self._angles is None:
+            self._open()
+        return self._angles
+
+    @property
+    def velocities(self) -> np.ndarray:
+        """Returns the indexed throw velocities, in inches per second."""
+        if self._velocities is None:
+            self._open()
+        return self._velocities
+
+    @property
+    def outcomes(self) -> np.ndarray:
+        """
+        Returns the (read-only) array of shape (leaves, angles, velocities, samples) holding the leave left standing by
+        each sample.
+        """
+        if self._outcomes is None:
+            self._open()
+        return self._outcomes
+
+    def best_cell(self, leave: int) -> tuple[int, int]:
+        """
+        Finds the (angle, velocity) cell that knocks down the most pins on average at a leave.
+
+        :param leave: The leave bitmask of the pins standing before the throw.
+        :return: The indexes of the cell's angle and velocity.
+        """
+        cell = self._best_cells.get(leave)
+        if cell is None:
+            mean_standing = STANDING_COUNT[self.outcomes[leave]].mean(axis=-1)
+            angle_index, velocity_index = np.unravel_index(np.argmin(mean_standing), mean_standing.shape)
+            cell = self._best_cells[leave] = (int(angle_index), int(velocity_index))
+        return cell
+
+    def sample(self, leave: int, rng: np.random.Generator, cell: tuple[int, int] | None = None) -> int:
+        """
+        Draws the outcome of a throw from the index.
+
+        :param leave: The leave bitmask of the pins standing before the throw.
+        :param rng: The random number generator to draw with.
+        :param cell: The indexes of the angle and velocity thrown at. Defaults to the best cell for the leave.
+        :return: The leave bitmask left standing after the throw.
+        """
+        angle_index, velocity_index = cell if cell is not None else self.best_cell(leave)
+        samples = self.outcomes[leave, angle_index, velocity_index]
+        return int(samples[rng.integers(len(samples))])
+
+    def close(self) -> None:
+        """
+        Unmaps the index file, unless arrays returned by the index are still in use, in which case it is unmapped once
+        they have been freed. The file is opened again if the index is used afterwards.
+        """
+        self._angles = self._velocities = self._outcomes = None
+        self._best_cells = {}
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                pass  # Still viewed by an array elsewhere
+            self._mmap = None
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Command line entry point for building an outcome index file."""
+    parser = argparse.ArgumentParser(description="Build an index of simulated throw outcomes at every leave.")
+    parser.add_argument("--angle-min", type=float, default=MIN_THROW_ANGLE)
+    parser.add_argument("--angle-max", type=float, default=MAX_THROW_ANGLE)
+    parser.add_argument("--angle-step", type=float, default=consts.THROW_ANGLE_STEP)
+    parser.add_argument("--velocities", type=float, nargs="+", default=[consts.THROW_VELOCITY])
+    parser.add_argument("--samples", type=int, default=8, help="Throws simulated per cell at each leave")
+    parser.add_argument("--angle-spread", type=float, default=0.5, help="Std. dev. of angle noise (degrees)")
+    parser.add_argument("--velocity-spread", type=float, default=5.0, help="Std. dev. of velocity noise (in/s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (defaults to CPU count)")
+    parser.add_argument("--physics", metavar="PROFILE", help="Ball and pin physics profile file")
+    parser.add_argument("--output", default="outcomes.bkoi")
+    args = parser.parse_args(argv)
+    if args.physics:
+        set_physics_profile(PhysicsProfile.load(args.physics))
+    # Include the end of the range, allowing for floating point error
+    angles = np.arange(args.angle_min, args.angle_max + args.angle_step / 2, args.angle_step)
+    velocities = np.array(args.velocities)
+    outcomes = build_outcome_index(
+        angles,
+        velocities,
+        samples=args.samples,
+        angle_spread=args.angle_spread,
+        velocity_spread=args.velocity_spread,
+        seed=args.seed,
+        workers=args.workers,
+    )
+    write_outcome_index(args.output, angles, velocities, outcomes)
+    print(f"Saved {outcomes.size} outcomes ({outcomes.nbytes / 1e6:.1f} MB) to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+Creation and configuration of the pymunk Space bowling lanes are simulated in, and the profiles of physical
+parameters (friction and elasticity) the ball and pins are created with and of solver settings spaces are created
+with. Both profiles can be loaded from JSON files to replace the defaults in constants.py.
+"""
+
+import json
+import sys
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Self
+
+import numpy as np
+import pymunk
+import pymunk.batch
+
+import bksports.constants as consts
+
+BODY_STATE_SIZE = 6  # x, y, angle, vx, vy, angular velocity
+KINEMATICS_SIZE = 4  # x, y, vx, vy
+KINEMATICS_FIELDS = (
+    pymunk.batch.BodyFields.BODY_ID | pymunk.batch.BodyFields.POSITION | pymunk.batch.BodyFields.VELOCITY
+)
+
+
+@dataclass(frozen=True)
+class PhysicsProfile:
+    """
+    The physical parameters of the ball and pins, which are loaded from a JSON file (e.g. one written by the
+    calibration tool) to replace the defaults in constants.py.
+
+    :ivar ball_friction: The coefficient of friction of the ball's surface.
+    :ivar ball_elasticity: The elasticity of the ball's collisions.
+    :ivar pin_friction: The coefficient of friction of a pin's surface.
+    :ivar pin_elasticity: The elasticity of a pin's collisions.
+    :ivar pin_deck_friction: The coefficient of friction between a sliding pin and the pin deck.
+    """
+
+    ball_friction: float = consts.BALL_FRICTION
+    ball_elasticity: float = consts.BALL_ELASTICITY
+    pin_friction: float = consts.PIN_FRICTION
+    pin_elasticity: float = consts.PIN_ELASTICITY
+    pin_deck_friction: float = consts.PIN_DECK_FRICTION
+
+    @classmethod
+    def load(cls, path: str | Path) -> Self:
+        """
+        Loads a profile from a JSON file. Parameters missing from the file keep their defaults.
+
+        :param path: The path of the file to load.
+        :return: The loaded profile.
+        """
+        with open(path) as file:
+            return cls(**{name: float(value) for name, value in json.load(file).items()})
+
+    def save(self, path: str | Path) -> None:
+        """
+        Saves the profile to a JSON file.
+
+        :param path: The path of the file to save to.
+        """
+        with open(path, "w") as file:
+            json.dump(asdict(self), file, indent=4)
+
+
+# The profile new balls and pins are created with
+_physics_profile = PhysicsProfile()
+
+
+def get_physics_profile() -> PhysicsProfile:
+    """Returns the profile new balls and pins are created with."""
+    return _physics_profile
+
+
+def set_physics_profile(profile: PhysicsProfile) -> None:
+    """
+    Sets the profile new balls and pins are created with. Balls and pins that already exist are unchanged, unless
+    the profile is applied to them with their apply_profile() methods.
+
+    :param profile: The profile to use.
+    """
+    global _physics_profile
+    _physics_profile = profile
+
+
+@dataclass(frozen=True)
+class SolverProfile:
+    """
+    The settings of pymunk's solver and spatial index a space is created with. The defaults are the settings in
+    constants.py, and a profile chosen with the solver benchmark (as fast as possible while still giving the same pin
+    outcomes) can be loaded from a JSON file to replace them.
+
+    :ivar SPATIAL_HASH_COUNT: The number of cells in the spatial hash, around 10 times the number of shapes in a lane.
+    :ivar iterations: The number of iterations of the collision solver in each step.
+    :ivar collision_slop: The overlap allowed between shapes, in inches.
+    :ivar use_spatial_hash: Whether to index shapes with a spatial hash, with cells the size of a pin, instead of a
+        bounding box tree.
+    :ivar threaded: Whether to step the space with pymunk's threaded solver. Ignored on Windows, which does not
+        support it.
+    :ivar threads: The number of threads the threaded solver uses (pymunk supports at most 2).
+    """
+
+    SPATIAL_HASH_COUNT = 1000
+
+    iterations: int = consts.SOLVER_ITERATIONS
+    collision_slop: float = consts.COLLISION_SLOP
+    use_spatial_hash: bool = consts.USE_SPATIAL_HASH
+    threaded: bool = consts.THREADED_SPACE
+    threads: int = 2
+
+    @classmethod
+    def load(cls, path: str | Path) -> Self:
+        """
+        Loads a profile from a JSON file. Settings missing from the file keep their defaults.
+
+        :param path: The path of the file to load.
+        :return: The loaded profile.
+        """
+        with open(path) as file:
+            settings = json.load(file)
+        defaults = cls()
+        return cls(**{name: type(getattr(defaults, name))(value) for name, value in settings.items()})
+
+    def save(self, path: str | Path) -> None:
+        """
+        Saves the profile to a JSON file.
+
+        :param path: The path of the file to save to.
+        """
+        with open(path, "w") as file:
+            json.dump(asdict(self), file, indent=4)
+
+
+# The profile new spaces are created with
+_solver_profile = SolverProfile()
+
+
+def get_solver_profile() -> SolverProfile:
+    """Returns the profile new spaces are created with."""
+    return _solver_profile
+
+
+def set_solver_profile(profile: SolverProfile) -> None:
+    """
+    Sets the profile new spaces are created with. Spaces that already exist are unchanged.
+
+    :param profile: The profile to use.
+    """
+    global _solver_profile
+    _solver_profile = profile
+
+
+def set_profiles(physics: PhysicsProfile, solver: SolverProfile) -> None:
+    """
+    Sets both the physics and solver profiles, e.g. as the initialiser of a worker process, so that it simulates with
+    the same settings as the process that started it.
+
+    :param physics: The profile new balls and pins are created with.
+    :param solver: The profile new spaces are created with.
+    """
+    set_physics_profile(physics)
+    set_solver_profile(solver)
+
+
+def create_space(solver: SolverProfile | None = None) -> pymunk.Space:
+    """
+    Creates a pymunk Space configured for a bowling lane.
+
+    The lane is viewed from above, so there is no gravity. Bodies that stay slower than IDLE_SPEED_THRESHOLD for
+    SLEEP_TIME_THRESHOLD seconds are put to sleep, so that pins at rest cost nothing to simulate until something
+    hits them.
+
+    :param solver: The solver settings to create the space with. Defaults to the current solver profile.
+    :return: The configured space.
+    """
+    solver = solver or get_solver_profile()
+    threaded = solver.threaded and sys.platform != "win32"
+    space = pymunk.Space(threaded=threaded)
+    if threaded:
+        space.threads = solver.threads
+    space.gravity = (0, 0)
+    space.iterations = solver.iterations
+    space.collision_slop = solver.collision_slop
+    if solver.use_spatial_hash:
+        space.use_spatial_hash(consts.PIN_DIAMETER, SolverProfile.SPATIAL_HASH_COUNT)
+    space.idle_speed_threshold = consts.IDLE_SPEED_THRESHOLD
+    space.sleep_time_threshold = consts.SLEEP_TIME_THRESHOLD
+    return space
+
+
+def get_body_state(body: pymunk.Body, out: np.ndarray) -> None:
+    """
+    Copies the full physical state of a body into an array.
+
+    :param body: The body to copy the state of.
+    :param out: The array to copy the state into, of length BODY_STATE_SIZE.
+    """
+    position = body.position
+    velocity = body.velocity
+    out[:] = (position.x, position.y, body.angle, velocity.x, velocity.y, body.angular_velocity)
+
+
+def set_body_state(body: pymunk.Body, state: np.ndarray) -> None:
+    """
+    Restores the full physical state of a body from an array created by get_body_state().
+
+    :param body: The body to restore the state of.
+    :param state: The array to restore the state from, of length BODY_STATE_SIZE.
+    """
+    x, y, angle, vx, vy, angular_velocity = state.tolist()
+    body.position = (x, y)
+    body.angle = angle
+    body.velocity = (vx, vy)
+    body.angular_velocity = angular_velocity
+
+
+def read_space_kinematics(space: pymunk.Space, buffer: pymunk.batch.Buffer) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Reads the position and velocity of every body in a space (including sleeping bodies) in a single call, without
+    creating a Vec2d for each body.
+
+    The returned arrays view the buffer's memory, so are only valid until the buffer is next used.
+
+    :param space: The pymunk Space to read the bodies of.
+    :param buffer: The buffer to read the bodies into, reused between calls.
+    :return: A tuple (body_ids, kinematics), where body_ids holds the id of each body in the space's order and
+        kinematics has a row (x, y, vx, vy) for each body.
+    """
+    buffer.clear()
+    pymunk.batch.get_space_bodies(space, KINEMATICS_FIELDS, buffer)
+    body_ids = np.frombuffer(buffer.int_buf(), dtype=np.uintp)
+    kinematics = np.frombuffer(buffer.float_buf(), dtype=np.float64).reshape(-1, KINEMATICS_SIZE)
+    return body_ids, kinematics
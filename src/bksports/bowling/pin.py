@@ -1,10 +1,29 @@
-import math
-from enum import Enum, auto
-from typing import Any
+import weakref
+from typing import Any, Self
 
+import numpy as np
 import pymunk
+import pymunk.batch
 
 import bksports.constants as consts
+from bksports.bowling.event_log import EventSource, EventType
+from bksports.bowling.leaves import (
+    FULL_RACK,
+    INDEX_MASK_TO_LEAVE,
+    LEAVE_TO_INDEX_MASK,
+    NUM_PINS,
+)
+from bksports.bowling.physics import (
+    BODY_STATE_SIZE,
+    PhysicsProfile,
+    get_body_state,
+    get_physics_profile,
+    read_space_kinematics,
+    set_body_state,
+)
+
+# Bit of each pin in a PinSet's hit and removed masks, in PinSet.pins order
+PIN_INDEX_BITS = 1 << np.arange(NUM_PINS)
 
 
 class Pin:
@@ -15,28 +34,83 @@ class Pin:
     :ivar DIAMETER: The diameter of the pin in inches.
     :ivar RADIUS: The radius of the pin in inches, derived from its diameter.
     :ivar MASS: The weight of the pin, in kg.
+    :ivar hit: Indicates whether the pin has been hit by the ball, or by another pin that has been hit.
     :ivar removed: Indicates whether the pin has now been removed after being hit.
     :ivar body: The pymunk Body of the pin.
     :ivar shape: The pymunk Shape of the pin.
+    :ivar deck_friction: The pymunk Constraints slowing the pin down as it slides and spins on the pin deck.
+    :ivar deck_friction_force: The largest force the pin deck's friction can exert on the pin.
+    :ivar start_position: The position the pin stands at in a full rack.
     """
 
     HEIGHT = 15  # inches
-    DIAMETER = 4.75  # inches
+    DIAMETER = consts.PIN_DIAMETER  # inches
     RADIUS = DIAMETER / 2  # inches
     MASS = 1.55  # kg
 
+    __slots__ = ("body", "deck_friction", "deck_friction_force", "hit", "removed", "shape", "start_position")
+
     def __init__(self, x: float, y: float) -> None:
         """Intialises a pin at a specific position."""
+        self.hit = False
         self.removed = False
         self.body = pymunk.Body()
         self.body.position = (x, y)
         self.shape = pymunk.Circle(self.body, self.RADIUS)
         self.shape.mass = self.MASS
-        self.shape.friction = 1  # TODO: Tweak value
-        self.shape.elasticity = 1  # TODO: Tweak value
-        self.shape.collision_type = (
-            12  # Correct collision type has not been assigned yet
-        )
+        self.shape.collision_type = consts.PIN_ID
+        self.deck_friction: list[pymunk.Constraint] = []
+        self.start_position = (x, y)
+        self.apply_profile(get_physics_profile())
+
+    def apply_profile(self, profile: PhysicsProfile) -> None:
+        """
+        Sets the friction and elasticity of the pin, and its friction with the pin deck, from a physics profile.
+
+        :param profile: The profile to apply.
+        """
+        self.shape.friction = profile.pin_friction
+        self.shape.elasticity = profile.pin_elasticity
+        self.deck_friction_force = profile.pin_deck_friction * self.MASS * consts.GRAVITY
+        if self.deck_friction:
+            pivot, gear = self.deck_friction
+            pivot.max_force = self.deck_friction_force
+            gear.max_force = self.deck_friction_force * self.RADIUS
+
+    def add_to_space(self, space: pymunk.Space) -> None:
+        """
+        Adds the pin to a space, along with joints to the space's static body that act as friction with the pin deck,
+        since the lane is seen from above and has no surface for the pin to rub against.
+
+        :param space: The pymunk Space to add the pin to.
+        """
+        if not self.deck_friction:
+            # Resists sliding
+            pivot = pymunk.PivotJoint(space.static_body, self.body, (0, 0), (0, 0))
+            pivot.max_bias = 0  # Only resist the pin's velocity, never pull it back into place
+            pivot.max_force = self.deck_friction_force
+            # Resists spinning
+            gear = pymunk.GearJoint(space.static_body, self.body, 0, 1)
+            gear.max_bias = 0
+            gear.max_force = self.deck_friction_force * self.RADIUS
+            self.deck_friction = [pivot, gear]
+        space.add(self.body, self.shape, *self.deck_friction)
+
+    def remove_from_space(self, space: pymunk.Space) -> None:
+        """
+        Removes the pin and its pin deck friction from a space.
+
+        :param space: The pymunk Space to remove the pin from.
+        """
+        space.remove(self.body, self.shape, *self.deck_friction)
+
+    def reset(self) -> None:
+        """Stands the pin back up at its starting position, at rest and not hit."""
+        self.hit = False
+        self.body.position = self.start_position
+        self.body.velocity = (0, 0)
+        self.body.angle = 0
+        self.body.angular_velocity = 0
 
     @property
     def x(self) -> float:
@@ -58,26 +132,96 @@ class Pin:
         """Returns the y-component of the pin's current velocity."""
         return self.body.velocity.y
 
-    @property
-    def hit(self) -> bool:
-        """
-        Indicates whether the pin has been hit.
+    def on_hit(self) -> None:
+        """Handles the pin being hit by either the ball or another pin that has already been hit."""
+        self.hit = True
+
+
+class PinCollisionDispatcher:
+    """
+    Handles every collision involving pins in a pymunk Space, for every set of pins in it.
+
+    Every pin shares the same collision type, so only two collision handlers are ever registered on a space (ball
+    hitting pin, and pin hitting pin) however many sets of pins it has held. Each collision is passed on to the right
+    pin by looking up its shape in a table.
 
-        A pin is determined as hit if its collision type is equal to the value of the HIT_PIN_ID constant,
-        which indicates that the pin has collided with the ball or another pin, and has therefore been hit.
+    :ivar pins_by_shape: The set of pins each pin shape belongs to, and the index of the pin within that set.
+    """
+
+    _dispatchers: weakref.WeakKeyDictionary[pymunk.Space, PinCollisionDispatcher] = weakref.WeakKeyDictionary()
+
+    def __init__(self, space: pymunk.Space) -> None:
         """
-        return self.shape.collision_type == consts.HIT_PIN_ID
+        Initialises the dispatcher and registers its collision handlers on a space.
 
-    def on_hit(self, arbiter: pymunk.Arbiter, space: pymunk.Space, data: Any) -> bool:  # noqa: ANN401
-        """Handles the collision of the pin with either the ball or another pin."""
-        self.shape.collision_type = (
-            consts.HIT_PIN_ID  # Signifies that the pin has already been hit, collision detection no longer needed
+        :param space: The pymunk Space to handle pin collisions in.
+        """
+        self.pins_by_shape: dict[pymunk.Shape, tuple[PinSet, int]] = {}
+        space.on_collision(  # When the ball hits a pin
+            collision_type_a=consts.BALL_ID,
+            collision_type_b=consts.PIN_ID,
+            separate=self.on_ball_hit_pin,
         )
-        print(f"Pin hit at ({self.x}, {self.y})")
-        return (
-            True  # The collision should be processed normally and should not be ignored
+        space.on_collision(  # When two pins hit each other
+            collision_type_a=consts.PIN_ID,
+            collision_type_b=consts.PIN_ID,
+            separate=self.on_pin_hit_pin,
         )
 
+    @classmethod
+    def for_space(cls, space: pymunk.Space) -> Self:
+        """
+        Returns the dispatcher for a space, creating it if the space does not have one yet.
+
+        :param space: The pymunk Space to get the dispatcher for.
+        :return: The space's dispatcher.
+        """
+        dispatcher = cls._dispatchers.get(space)
+        if dispatcher is None:
+            dispatcher = cls._dispatchers[space] = cls(space)
+        return dispatcher
+
+    def register(self, pin_set: PinSet) -> None:
+        """
+        Starts passing collisions on to a set of pins.
+
+        :param pin_set: The set of pins to handle collisions for.
+        """
+        for i, pin in enumerate(pin_set.pins):
+            self.pins_by_shape[pin.shape] = (pin_set, i)
+
+    def unregister(self, pin_set: PinSet) -> None:
+        """
+        Stops passing collisions on to a set of pins.
+
+        :param pin_set: The set of pins to stop handling collisions for.
+        """
+        for pin in pin_set.pins:
+            self.pins_by_shape.pop(pin.shape, None)
+
+    def on_ball_hit_pin(self, arbiter: pymunk.Arbiter, space: pymunk.Space, data: Any) -> None:
+        """Marks a pin as hit once the ball has collided with it."""
+        for shape in arbiter.shapes:
+            entry = self.pins_by_shape.get(shape)
+            if entry is not None:
+                pin_set, index = entry
+                pin_set.mark_hit(index)
+
+    def on_pin_hit_pin(self, arbiter: pymunk.Arbiter, space: pymunk.Space, data: Any) -> None:
+        """Marks a pin as hit once a pin that has already been hit has collided with it, in a chain reaction."""
+        entry_a = self.pins_by_shape.get(arbiter.shapes[0])
+        entry_b = self.pins_by_shape.get(arbiter.shapes[1])
+        if entry_a is None or entry_b is None:
+            return
+        pin_set_a, index_a = entry_a
+        pin_set_b, index_b = entry_b
+        a_is_hit = pin_set_a.is_hit(index_a)
+        b_is_hit = pin_set_b.is_hit(index_b)
+        if a_is_hit and not b_is_hit:
+            pin_set_b.mark_hit(index_b)
+        elif b_is_hit and not a_is_hit:
+            pin_set_a.mark_hit(index_a)
+
 
 class PinSet:
     """
@@ -85,21 +229,31 @@ class PinSet:
 
     :ivar space: References the pymunk Space the game exists in.
     :ivar pins_hit: Stores the number of pins the ball hit in the current throw.
-    :ivar pins: List of pins in the pin set. Each pin's state and position are managed individually.
+    :ivar hit_mask: Bitmask of the pins that have been hit, with bit i set if self.pins[i] has been hit.
+    :ivar pins: List of pins in the pin set. Each pin's state and position are managed individually. Their standard
+        pin numbers are given by leaves.PIN_NUMBERS.
+    :ivar body_ids: The id of each pin's body, in self.pins order.
+    :ivar positions: The (x, y) position of each pin in a row, in self.pins order, as of the last call to sync().
+    :ivar velocities: The (vx, vy) velocity of each pin in a row, in self.pins order, as of the last call to sync().
+    :ivar hit_flags: Whether each pin has been hit, in self.pins order, as of the last call to sync().
+    :ivar removed_flags: Whether each pin has been removed, in self.pins order, as of the last call to sync().
+    :ivar body_buffer: The buffer the space's bodies are read into by sync().
+    :ivar events: Logs the pins being hit, if the pins are in a logged lane.
     """
 
     def __init__(self, space: pymunk.Space) -> None:
         """
         Initalises the set of pins.
 
-        Intialises and stores the pins at their relevant positions, intialises collision handlers for each pin,
-        and adds each pin to the space.
+        Intialises and stores the pins at their relevant positions, registers the pins with the space's collision
+        dispatcher, and adds each pin to the space.
 
         :param space: The pymunk Space the game exists in.
         """
         # Initialise other variables
         self.space = space
         self.pins_hit = 0
+        self.hit_mask = 0
         # Reference constants
         h = consts.HALF_PIN_SPACING_H
         v = consts.PIN_SPACING_V
@@ -121,26 +275,173 @@ class PinSet:
             # Fourth row
             Pin(0, base_y),
         ]
-        # Add pins' bodies and shapes to the space
-        for i, pin in enumerate(self.pins, start=1):
-            # Assign collision type IDs 1 to 10 to each pin
-            pin.shape.collision_type = i
-            # Intialise collision handlers for each pin
-            self.space.on_collision(  # When the ball hits a pin that has not been hit by the ball
-                collision_type_a=consts.BALL_ID,
-                collision_type_b=i,
-                separate=self.pins[i - 1].on_hit,
-            )
-            self.space.on_collision(  # When a pin that has been hit already hits another pin in a chain reaction
-                collision_type_a=consts.HIT_PIN_ID,
-                collision_type_b=i,
-                separate=self.pins[i - 1].on_hit,
-            )
-            # Add each pin's body and shape to the space
-            self.space.add(pin.body, pin.shape)
+        # Pass collisions involving these pins on to this pin set
+        PinCollisionDispatcher.for_space(self.space).register(self)
+        # Add each pin's body, shape and friction to the space
+        for pin in self.pins:
+            pin.add_to_space(self.space)
+        # Initialise the array-backed view of the pins, and the lookup from body id to pin index used to fill it
+        self.body_ids = np.array([pin.body.id for pin in self.pins], dtype=np.uintp)
+        self._id_order = np.argsort(self.body_ids)
+        self._sorted_ids = self.body_ids[self._id_order]
+        self.positions = np.array([pin.start_position for pin in self.pins], dtype=np.float64)
+        self.velocities = np.zeros((len(self.pins), 2))
+        self.hit_flags = np.zeros(len(self.pins), dtype=bool)
+        self.removed_flags = np.zeros(len(self.pins), dtype=bool)
+        self.body_buffer = pymunk.batch.Buffer()
+        self.events: EventSource | None = None
+        self.sync()
+
+    def is_hit(self, index: int) -> bool:
+        """
+        Checks if a pin has been hit.
+
+        :param index: The index of the pin in self.pins.
+        :return: True if the pin has been hit, otherwise False.
+        """
+        return bool(self.hit_mask & (1 << index))
+
+    def mark_hit(self, index: int) -> None:
+        """
+        Marks a pin as hit, if it has not been hit already.
+
+        :param index: The index of the pin in self.pins.
+        """
+        bit = 1 << index
+        if not self.hit_mask & bit:
+            self.hit_mask |= bit
+            pin = self.pins[index]
+            pin.on_hit()
+            if self.events is not None:
+                self.events.log(EventType.PIN_HIT, index, pin.x, pin.y)
+
+    def count_hit(self) -> int:
+        """
+        Counts the pins that have been hit in the current throw, which are the pins that have been hit but not
+        removed yet.
+
+        :return: The number of pins hit in the current throw.
+        """
+        return (self.hit_mask & ~self.removed_mask).bit_count()
+
+    @property
+    def leave(self) -> int:
+        """
+        Returns the pins still standing (neither hit nor removed) as a leave bitmask, using standard pin numbering
+        (see the leaves module).
+        """
+        standing_mask = FULL_RACK & ~(self.hit_mask | self.removed_mask)
+        return int(INDEX_MASK_TO_LEAVE[standing_mask])
+
+    def sync(self) -> None:
+        """
+        Refreshes the array-backed view of the pins (positions, velocities, hit_flags and removed_flags) from the
+        space, reading every body in a single call. Pins that are not in the space keep their last known position and
+        are given no velocity.
+        """
+        body_ids, kinematics = read_space_kinematics(self.space, self.body_buffer)
+        indexes = np.searchsorted(self._sorted_ids, body_ids).clip(max=len(self._sorted_ids) - 1)
+        is_pin = self._sorted_ids[indexes] == body_ids
+        rows = self._id_order[indexes[is_pin]]
+        self.velocities[:] = 0.0
+        self.positions[rows] = kinematics[is_pin, :2]
+        self.velocities[rows] = kinematics[is_pin, 2:]
+        self.hit_flags[:] = self.hit_mask & PIN_INDEX_BITS
+        self.removed_flags[:] = self.removed_mask & PIN_INDEX_BITS
+
+    def is_settled(self) -> bool:
+        """
+        Checks if every pin on the pin deck has come to rest.
+
+        Pins slower than IDLE_SPEED_THRESHOLD are at rest, which includes every sleeping pin. Pins that have left the
+        pin deck are ignored, as there is nothing left for them to hit that could send them back.
+
+        :return: True if no pin on the pin deck is still moving, otherwise False.
+        """
+        self.sync()
+        x = self.positions[:, 0]
+        y = self.positions[:, 1]
+        is_on_deck = (
+            ~self.removed_flags
+            & (consts.LEFT_BOUNDARY <= x) & (x <= consts.RIGHT_BOUNDARY)
+            & (consts.FOUL_LINE_TO_FRONT_PIN_DISTANCE - consts.PIN_SPACING_V <= y) & (y <= consts.LANE_LENGTH)
+        )
+        speeds_squared = np.einsum("ij,ij->i", self.velocities, self.velocities)
+        return not np.any(is_on_deck & (speeds_squared > consts.IDLE_SPEED_THRESHOLD ** 2))
+
+    def apply_profile(self, profile: PhysicsProfile) -> None:
+        """
+        Sets the friction and elasticity of every pin from a physics profile.
+
+        :param profile: The profile to apply.
+        """
+        for pin in self.pins:
+            pin.apply_profile(profile)
+
+    def reset(self, leave: int = FULL_RACK) -> None:
+        """
+        Sets the pins up again in place, as an alternative to creating a new set of pins.
+
+        Every pin is returned to its starting position at rest, and any pin that should not be standing is removed
+        from the space, so that the space's contents never grow however many racks are set up in it.
+
+        :param leave: The leave bitmask of the pins that should be standing. Defaults to a full rack.
+        """
+        self.pins_hit = 0
+        self.hit_mask = 0
+        standing_mask = int(LEAVE_TO_INDEX_MASK[leave])
+        for i, pin in enumerate(self.pins):
+            pin.reset()
+            is_standing = bool(standing_mask & (1 << i))
+            if is_standing and pin.removed:
+                pin.add_to_space(self.space)
+            elif not is_standing and not pin.removed:
+                pin.remove_from_space(self.space)
+            pin.removed = not is_standing
+
+    @property
+    def removed_mask(self) -> int:
+        """Returns a bitmask of the pins that have been removed, with bit i set if self.pins[i] has been removed."""
+        return sum(1 << i for i, pin in enumerate(self.pins) if pin.removed)
+
+    def capture_state(self) -> np.ndarray:
+        """
+        Captures the full physical state of every pin. The pins' hit and removed flags are given by hit_mask and
+        removed_mask.
+
+        :return: An array with a row for each pin in self.pins, holding its position, angle, velocity and angular
+            velocity.
+        """
+        state = np.empty((len(self.pins), BODY_STATE_SIZE))
+        for pin, row in zip(self.pins, state, strict=True):
+            get_body_state(pin.body, row)
+        return state
+
+    def restore_state(self, state: np.ndarray, hit_mask: int, removed_mask: int, pins_hit: int = 0) -> None:
+        """
+        Restores every pin to a physical state captured by capture_state(), adding pins to or removing pins from the
+        space as needed.
+
+        :param state: The array with a row for each pin, holding its position, angle, velocity and angular velocity.
+        :param hit_mask: Bitmask of the pins that had been hit.
+        :param removed_mask: Bitmask of the pins that had been removed.
+        :param pins_hit: The number of pins the ball had hit in the current throw.
+        """
+        self.hit_mask = hit_mask
+        self.pins_hit = pins_hit
+        for i, (pin, row) in enumerate(zip(self.pins, state, strict=True)):
+            pin.hit = bool(hit_mask & (1 << i))
+            is_removed = bool(removed_mask & (1 << i))
+            if is_removed and not pin.removed:
+                pin.remove_from_space(self.space)
+            elif not is_removed and pin.removed:
+                pin.add_to_space(self.space)
+            pin.removed = is_removed
+            set_body_state(pin.body, row)
 
     def clean_up(self) -> None:
-        """Cleans up pins that have been hit by marking them as removed."""
+        """Cleans up pins that have been hit by marking them as removed and taking them out of the space."""
         for pin in self.pins:
-            if pin.hit:
+            if pin.hit and not pin.removed:
                 pin.removed = True
+                pin.remove_from_space(self.space)
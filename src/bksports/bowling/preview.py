@@ -0,0 +1,82 @@
+"""
+Predicted outcomes of throws, for previewing a throw while aiming it.
+
+Each prediction is a fast headless simulation of the throw into the current rack. Predictions are memoised in a
+bounded LRU cache, so moving the aim back and forth between angles that have already been previewed is instant.
+"""
+
+import functools
+from dataclasses import dataclass
+
+import bksports.constants as consts
+from bksports.bowling.simulation import ThrowResult, ThrowSimulator
+
+
+@dataclass(frozen=True)
+class CacheInfo:
+    """
+    Statistics of an OutcomePredictor's cache of predictions.
+
+    :ivar hits: The number of predictions that were found in the cache.
+    :ivar misses: The number of predictions that had to be simulated.
+    :ivar max_size: The number of predictions the cache can hold.
+    :ivar size: The number of predictions in the cache.
+    """
+
+    hits: int
+    misses: int
+    max_size: int
+    size: int
+
+
+class OutcomePredictor:
+    """
+    Predicts the outcome of throws by simulating them, remembering the most recently predicted outcomes.
+
+    Throws are simulated into a rack with only the pins of the leave standing, each at its starting position, so the
+    prediction for a second ball ignores how far the standing pins were nudged by the first.
+
+    :ivar DEFAULT_CACHE_SIZE: The number of predictions remembered by default.
+    :ivar angle_step: The angle throws are rounded to a multiple of before being predicted, in degrees.
+    :ivar simulator: The simulator used to predict throws.
+    """
+
+    DEFAULT_CACHE_SIZE = 256
+
+    def __init__(
+            self,
+            simulator: ThrowSimulator | None = None,
+            cache_size: int = DEFAULT_CACHE_SIZE,
+            angle_step: float = consts.THROW_ANGLE_STEP,
+    ) -> None:
+        """
+        Initialises the predictor with an empty cache.
+
+        :param simulator: The simulator used to predict throws. Defaults to a new simulator.
+        :param cache_size: The number of predictions to remember.
+        :param angle_step: The angle throws are rounded to a multiple of, in degrees. Defaults to the game's step.
+        """
+        self.simulator = simulator or ThrowSimulator()
+        self.angle_step = angle_step
+        self._simulate = functools.lru_cache(maxsize=cache_size)(self.simulator.simulate)
+
+    def predict(self, angle: float, velocity: float, leave: int) -> ThrowResult:
+        """
+        Predicts the outcome of a throw, simulating it only if the same throw at the same leave is not cached.
+
+        :param angle: The angle in degrees the ball is thrown at, relative to the vertical.
+        :param velocity: The velocity of the ball in inches per second.
+        :param leave: The leave bitmask of the pins standing before the throw.
+        :return: The predicted outcome of the throw, rounded to the nearest multiple of angle_step.
+        """
+        quantised_angle = round(angle / self.angle_step) * self.angle_step
+        return self._simulate(quantised_angle, float(velocity), int(leave))
+
+    def cache_info(self) -> CacheInfo:
+        """Returns the hits, misses, maximum size and current size of the cache of predictions."""
+        hits, misses, max_size, size = self._simulate.cache_info()
+        return CacheInfo(hits, misses, max_size, size)
+
+    def clear(self) -> None:
+        """Forgets every cached prediction, e.g. after changing the simulator's physics."""
+        self._simulate.cache_clear()
@@ -0,0 +1,225 @@
+"""
+Per-frame profiling of the game loop, with an on-screen overlay and CSV export.
+
+The game loop marks the end of each phase of a frame (draining events, handling the game state, drawing, updating
+the display, waiting for the next frame and stepping the physics), and the time each phase took is written into a
+fixed-size ring buffer, so that profiling a long session uses no more memory than profiling a short one. Percentiles
+and a histogram of frame times are worked out from the buffer only when they are shown or exported.
+
+The game only creates a profiler when asked to, and checks for one with a single comparison per phase, so profiling
+costs nothing when it is disabled.
+"""
+
+import time
+from pathlib import Path
+
+import numpy as np
+import pygame
+
+import bksports.constants as consts
+
+# Phases of a frame, in the order the game loop runs them
+PHASES = ("events", "state", "draw", "flip", "idle", "physics")
+FRAME_BUDGET_MS = 1000 / consts.FRAMES_PER_SECOND
+
+
+class FrameProfiler:
+    """
+    Times each phase of every frame, keeping the most recent frames in a ring buffer.
+
+    :ivar DEFAULT_CAPACITY: The number of frames kept by default (a minute at 60 frames per second).
+    :ivar capacity: The number of frames kept.
+    :ivar timings: The time each phase of each kept frame took in milliseconds, with a column for each phase in
+        PHASES followed by one for the whole frame. Rows are in ring buffer order.
+    :ivar frames: The number of frames recorded since the profiler was created or cleared, including any that have
+        been overwritten.
+    """
+
+    DEFAULT_CAPACITY = 3600
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY) -> None:
+        """
+        Initialises the profiler with an empty buffer.
+
+        :param capacity: The number of frames to keep.
+        """
+        self.capacity = capacity
+        self.timings = np.zeros((capacity, len(PHASES) + 1))
+        self.frames = 0
+        self._phase_columns = {phase: i for i, phase in enumerate(PHASES)}
+        self._current = np.zeros(len(PHASES) + 1)  # The frame being timed, copied into the buffer when it ends
+        self._frame_start = 0.0
+        self._phase_start = 0.0
+
+    def begin_frame(self) -> None:
+        """Starts timing a new frame."""
+        self._current[:] = 0.0
+        self._frame_start = self._phase_start = time.perf_counter()
+
+    def mark(self, phase: str) -> None:
+        """
+        Ends a phase of the current frame, adding the time since the previous mark (or the start of the frame) to it.
+
+        :param phase: The name of the phase, from PHASES.
+        """
+        now = time.perf_counter()
+        self._current[self._phase_columns[phase]] += (now - self._phase_start) * 1000
+        self._phase_start = now
+
+    def end_frame(self) -> None:
+        """Ends the current frame, recording its total time and storing it in the next row of the ring buffer."""
+        self._current[-1] = (time.perf_counter() - self._frame_start) * 1000
+        self.timings[self.frames % self.capacity] = self._current
+        self.frames += 1
+
+    def clear(self) -> None:
+        """Forgets every recorded frame."""
+        self.timings[:] = 0.0
+        self.frames = 0
+
+    def recorded(self) -> np.ndarray:
+        """Returns the timings of the kept frames, oldest first."""
+        if self.frames <= self.capacity:
+            return self.timings[:self.frames]
+        return np.roll(self.timings, -(self.frames % self.capacity), axis=0)
+
+    def percentiles(self, quantiles: tuple[float, ...] = (50, 95, 99)) -> dict[str, tuple[float, ...]]:
+        """
+        Works out percentiles of the time each phase, and the whole frame, took over the kept frames.
+
+        :param quantiles: The percentiles to work out.
+        :return: The percentiles in milliseconds for each phase, and for the whole frame under "frame".
+        """
+        timings = self.recorded()
+        if len(timings) == 0:
+            return {}
+        values = np.percentile(timings, quantiles, axis=0)
+        return {name: tuple(values[:, i].tolist()) for i, name in enumerate((*PHASES, "frame"))}
+
+    def histogram(
+            self,
+            bin_width: float = 2.0,
+            max_time: float = 2 * FRAME_BUDGET_MS,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Counts the kept frames by how long they took, with every frame slower than max_time in the last bin.
+
+        :param bin_width: The width of each bin, in milliseconds.
+        :param max_time: The start of the last bin, in milliseconds.
+        :return: A tuple (counts, edges) of the number of frames in each bin and the lower edge of each bin.
+        """
+        edges = np.arange(0.0, max_time + bin_width, bin_width)
+        frame_times = np.minimum(self.recorded()[:, -1], edges[-1])
+        counts = np.bincount((frame_times // bin_width).astype(int), minlength=len(edges))[:len(edges)]
+        return counts, edges
+
+    def export_csv(self, path: str | Path) -> None:
+        """
+        Saves the timings of the kept frames to a CSV file, oldest first, with a row for each frame.
+
+        :param path: The path of the file to save to.
+        """
+        timings = self.recorded()
+        first_frame = self.frames - len(timings)
+        frame_numbers = np.arange(first_frame, self.frames)[:, np.newaxis]
+        np.savetxt(
+            path,
+            np.hstack((frame_numbers, timings)),
+            fmt=["%d"] + ["%.4f"] * timings.shape[1],
+            delimiter=",",
+            header=",".join(("frame", *(f"{name}_ms" for name in (*PHASES, "frame")))),
+            comments="",
+        )
+
+
+class ProfilerOverlay:
+    """
+    Draws the profiler's percentiles and a histogram of frame times in the top left corner of the screen.
+
+    The overlay is redrawn from the profiler every UPDATE_INTERVAL frames and blitted every frame in between. The
+    renderer is asked to repaint the area under it each frame, so that it never leaves a trail when sprites move
+    underneath it or when it is hidden.
+
+    :ivar UPDATE_INTERVAL: The number of frames between redraws of the overlay.
+    :ivar HISTOGRAM_HEIGHT: The height of the histogram's tallest bar, in pixels.
+    :ivar profiler: The profiler shown.
+    :ivar visible: Indicates whether the overlay is shown.
+    :ivar font: The font the figures are written in.
+    :ivar image: The overlay as it was last drawn.
+    :ivar notice: A line written under the histogram, e.g. confirming the timings have been saved, if any.
+    """
+
+    UPDATE_INTERVAL = 15
+    HISTOGRAM_HEIGHT = 40
+
+    def __init__(self, profiler: FrameProfiler) -> None:
+        """
+        Initialises the overlay, hidden.
+
+        :param profiler: The profiler to show.
+        """
+        self.profiler = profiler
+        self.visible = False
+        self.font = pygame.font.SysFont("monospace", 12)
+        self.image: pygame.Surface | None = None
+        self.notice: str | None = None
+
+    def toggle(self) -> None:
+        """Shows the overlay if it is hidden, otherwise hides it."""
+        self.visible = not self.visible
+        self.image = None
+
+    def notify(self, notice: str) -> None:
+        """
+        Shows the overlay with a notice written under the histogram, in place of any earlier notice.
+
+        :param notice: The line to write.
+        """
+        self.visible = True
+        self.notice = notice
+        self.image = None
+
+    def render(self) -> pygame.Surface:
+        """
+        Draws the overlay from the profiler's current percentiles and histogram.
+
+        :return: The overlay image.
+        """
+        lines = [f"{'ms':<8}{'p50':>7}{'p95':>7}{'p99':>7}"]
+        for name, values in self.profiler.percentiles().items():
+            lines.append(f"{name:<8}" + "".join(f"{value:>7.2f}" for value in values))
+        line_height = self.font.get_linesize()
+        counts, edges = self.profiler.histogram()
+        bar_width = 6
+        notice_height = line_height if self.notice is not None else 0
+        text_width = max(self.font.size(line)[0] for line in (*lines, self.notice or ""))
+        width = max(text_width, len(counts) * bar_width) + 8
+        height = len(lines) * line_height + self.HISTOGRAM_HEIGHT + notice_height + 12
+        image = pygame.Surface((width, height))
+        image.fill(consts.BLACK)
+        for i, line in enumerate(lines):
+            image.blit(self.font.render(line, True, consts.WHITE), (4, 4 + i * line_height))
+        if self.notice is not None:
+            image.blit(self.font.render(self.notice, True, consts.WHITE), (4, height - 4 - notice_height))
+        # Draw the histogram, with frames over budget in red
+        base_y = height - 4 - notice_height
+        tallest = max(int(counts.max()), 1)
+        for i, (count, edge) in enumerate(zip(counts.tolist(), edges.tolist(), strict=True)):
+            bar_height = round(count / tallest * self.HISTOGRAM_HEIGHT)
+            colour = consts.RED if edge >= FRAME_BUDGET_MS else consts.GREEN
+            pygame.draw.rect(image, colour, (4 + i * bar_width, base_y - bar_height, bar_width - 1, bar_height))
+        return image
+
+    def draw(self, screen: pygame.Surface) -> pygame.Rect | None:
+        """
+        Draws the overlay onto the screen, if it is shown, redrawing it from the profiler every UPDATE_INTERVAL
+        frames.
+
+        :param screen: The surface to draw onto.
+        :return: The area of the screen drawn over, or None if the overlay is hidden.
+        """
+        if not self.visible:
+            return None
+        if self.image is None or self.profiler.frames % self.UPDATE_INTERVAL == 0:
+            self.image = self.render()
+        return screen.blit(self.image, (0, 0))
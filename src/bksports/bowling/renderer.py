@@ -0,0 +1,423 @@
+"""
+Sprite-based rendering of the ball, pins and trajectory line.
+
+Images are rasterised (or loaded from the package's assets) once for each size they are drawn at, converted to the
+display's pixel format and cached, and the sprites are drawn through a LayeredDirty group so that only sprites which
+have moved or changed are redrawn. Everything is drawn through a Camera, and sprites outside its view are hidden
+rather than drawn. The sprites are drawn over a background painted by setup_bowling_scene(), or another
+BackgroundPainter.
+"""
+
+import functools
+from collections.abc import Callable, Sequence
+from importlib import resources
+
+import numpy as np
+import pygame
+import pymunk
+
+import bksports.constants as consts
+from bksports.bowling.ball import Ball
+from bksports.bowling.camera import Camera
+from bksports.bowling.pin import Pin, PinSet
+from bksports.bowling.stepper import PhysicsStepper
+
+ASSETS = resources.files("bksports") / "assets"
+
+# Layers the sprites are drawn on, from back to front
+TRAJECTORY_LINE_LAYER = 0
+PIN_LAYER = 1
+BALL_LAYER = 2
+
+type PositionSource = Callable[[pymunk.Body], tuple[float, float]]
+type BackgroundPainter = Callable[[pygame.Surface, Camera], None]
+
+
+def setup_bowling_scene(screen: pygame.Surface, camera: Camera | None = None) -> None:
+    """
+    Sets up the bowling scene.
+
+    Renders the background, alley, and gutters on the provided screen.
+
+    :param screen: The screen surface where the bowling scene will be drawn.
+    :param camera: The view of the lane to draw. Defaults to the whole lane.
+    """
+    camera = camera or Camera(*screen.get_size())
+    # Fill the screen with a white background
+    screen.fill(consts.WHITE)
+    # Calculate the alley and gutter dimensions
+    left_boundary_x, lane_top = camera.to_screen(consts.LEFT_BOUNDARY, consts.LANE_LENGTH)
+    left_gutter_x, foul_line = camera.to_screen(consts.LEFT_BOUNDARY - consts.GUTTER_WIDTH, 0)
+    right_gutter_x, _ = camera.to_screen(consts.RIGHT_BOUNDARY, 0)
+    lane_width = camera.length_to_screen(consts.LANE_WIDTH)
+    gutter_width = camera.length_to_screen(consts.GUTTER_WIDTH)
+    lane_height = foul_line - lane_top
+    # Draw the alley
+    pygame.draw.rect(
+        screen,
+        consts.BUTCHER_BLOCK,
+        pygame.Rect(left_boundary_x, lane_top, lane_width, lane_height),
+    )
+    # Draw the left gutter
+    pygame.draw.rect(
+        screen,
+        consts.BLACK,
+        pygame.Rect(left_gutter_x, lane_top, gutter_width, lane_height),
+    )
+    # Draw the right gutter
+    pygame.draw.rect(
+        screen,
+        consts.BLACK,
+        pygame.Rect(right_gutter_x, lane_top, gutter_width, lane_height),
+    )
+
+
+def body_position(body: pymunk.Body) -> tuple[float, float]:
+    """
+    Returns the current position of a body.
+
+    :param body: The body to find the position of.
+    :return: The (x, y) position of the body, in game coordinates.
+    """
+    return body.position.x, body.position.y
+
+
+@functools.cache
+def load_ball_image(diameter: int) -> pygame.Surface:
+    """
+    Loads the ball image, scaled to the given diameter.
+
+    The smallest ball asset that is at least as large as the requested size is used as the source, to keep scaling
+    cheap and the result sharp.
+
+    :param diameter: The diameter of the ball on the screen, in pixels.
+    :return: The scaled ball image, converted to the display's pixel format with per-pixel alpha.
+    """
+    name = "ball_blue_small.png" if diameter <= 32 else "ball_blue_large.png"
+    with (ASSETS / name).open("rb") as file:
+        image = pygame.image.load(file, name).convert_alpha()
+    return pygame.transform.smoothscale(image, (diameter, diameter))
+
+
+@functools.cache
+def create_circle_image(diameter: int, colour: tuple[int, int, int]) -> pygame.Surface:
+    """
+    Rasterises a filled circle of the given size and colour onto a transparent surface.
+
+    :param diameter: The diameter of the circle, in pixels.
+    :param colour: The colour of the circle.
+    :return: The circle image, converted to the display's pixel format with per-pixel alpha.
+    """
+    image = pygame.Surface((diameter, diameter), pygame.SRCALPHA)
+    pygame.draw.circle(image, colour, (diameter / 2, diameter / 2), diameter / 2)
+    return image.convert_alpha()
+
+
+class BallSprite(pygame.sprite.DirtySprite):
+    """
+    Draws the ball. The sprite is positioned by LaneRenderer, and hidden while the ball is outside the camera's view.
+
+    :ivar diameter: The diameter the ball is drawn at, in pixels.
+    """
+
+    def __init__(self) -> None:
+        """Initialises the ball sprite, hidden until it is first given a scale and position."""
+        super().__init__()
+        self.diameter = 0
+        self.image = pygame.Surface((0, 0))
+        self.rect = self.image.get_rect()
+        self.layer = BALL_LAYER
+        self.visible = 0
+
+    def set_scale(self, scale: float) -> None:
+        """
+        Resizes the ball's image for the camera's scale.
+
+        :param scale: The number of pixels per inch.
+        """
+        diameter = max(1, round(Ball.DIAMETER * scale))
+        if diameter != self.diameter:
+            self.diameter = diameter
+            self.image = load_ball_image(diameter)
+            self.rect = self.image.get_rect(center=self.rect.center)
+            self.dirty = 1
+
+    def update(self, centre: tuple[int, int], is_shown: bool) -> None:
+        """
+        Moves the sprite to a screen position, marking it as dirty if it has moved on the screen.
+
+        :param centre: The screen position to draw the ball at.
+        :param is_shown: Whether the ball is within the camera's view.
+        """
+        if not is_shown:
+            if self.visible:
+                self.visible = 0
+            return
+        if self.rect.center != centre or not self.visible:
+            self.rect.center = centre
+            self.visible = 1
+            self.dirty = 1
+
+
+class PinSprite(pygame.sprite.DirtySprite):
+    """
+    Draws a pin, in a different colour once it has been hit. The sprite is positioned by LaneRenderer, which converts
+    every pin's position to the screen at once.
+
+    :ivar diameter: The diameter the pin is drawn at, in pixels.
+    """
+
+    def __init__(self) -> None:
+        """Initialises the pin sprite, hidden until it is first given a scale and position."""
+        super().__init__()
+        self.diameter = 0
+        self.unhit_image = self.hit_image = self.image = pygame.Surface((0, 0))
+        self.rect = self.image.get_rect()
+        self.layer = PIN_LAYER
+        self.visible = 0
+
+    def set_scale(self, scale: float) -> None:
+        """
+        Resizes the pin's images for the camera's scale.
+
+        :param scale: The number of pixels per inch.
+        """
+        diameter = max(1, round(Pin.DIAMETER * scale))
+        if diameter != self.diameter:
+            self.diameter = diameter
+            self.unhit_image = create_circle_image(diameter, consts.BLACK)
+            self.hit_image = create_circle_image(diameter, consts.RED)
+            self.image = self.unhit_image  # Switched to the hit image in the next update(), if needed
+            self.rect = self.image.get_rect(center=self.rect.center)
+            self.dirty = 1
+
+    def update(self, centre: tuple[int, int], is_hit: bool, is_shown: bool) -> None:
+        """
+        Moves the sprite to a screen position and updates its image, marking it as dirty if anything has changed.
+
+        :param centre: The screen position to draw the pin at.
+        :param is_hit: Whether the pin has been hit.
+        :param is_shown: Whether the pin should be drawn, i.e. it has not been removed and is within the camera's view.
+        """
+        if not is_shown:
+            if self.visible:
+                self.visible = 0
+            return
+        image = self.hit_image if is_hit else self.unhit_image
+        if self.image is not image or self.rect.center != centre or not self.visible:
+            self.image = image
+            self.rect.center = centre
+            self.visible = 1
+            self.dirty = 1
+
+
+class TrajectoryLineSprite(pygame.sprite.DirtySprite):
+    """
+    Draws the path the ball will be thrown along, and rings around the pins it is expected to knock down.
+
+    :ivar camera: The camera the line is drawn through.
+    :ivar path: The game positions the line passes through, in order.
+    :ivar markers: The game positions of the pins expected to be knocked down.
+    :ivar is_stale: Indicates whether the image needs to be rasterised again before the line is next shown.
+    """
+
+    WIDTH = 5  # pixels
+    MARKER_WIDTH = 2  # pixels
+
+    def __init__(self, camera: Camera) -> None:
+        """
+        Initialises the trajectory line sprite, without a line to draw yet.
+
+        :param camera: The camera to draw the line through.
+        """
+        super().__init__()
+        self.camera = camera
+        self.path: list[tuple[float, float]] = []
+        self.markers: list[tuple[float, float]] = []
+        self.is_stale = False
+        self.image = pygame.Surface((0, 0))
+        self.rect = self.image.get_rect()
+        self.layer = TRAJECTORY_LINE_LAYER
+        self.visible = 0
+
+    def set_path(
+            self,
+            path: Sequence[tuple[float, float]],
+            markers: Sequence[tuple[float, float]] = (),
+    ) -> None:
+        """
+        Sets the path to draw and the pins to mark, and rasterises them.
+
+        :param path: The game positions the line passes through, in order.
+        :param markers: The game positions of the pins expected to be knocked down.
+        """
+        self.path = list(path)
+        self.markers = list(markers)
+        self.rasterise()
+
+    def rasterise(self) -> None:
+        """
+        Rasterises the part of the path and markers within the camera's view into the sprite's image. Must be called
+        whenever the camera's view changes. While the line is hidden, it is only rasterised once it is shown again.
+        """
+        if not self.visible:
+            self.is_stale = True
+            return
+        self.is_stale = False
+        if len(self.path) < 2:
+            return
+        padding = self.WIDTH
+        marker_radius = self.camera.length_to_screen(Pin.RADIUS) + self.MARKER_WIDTH * 2
+        path = self.camera.to_screen_many(self.path)
+        markers = self.camera.to_screen_many(self.markers)  # Empty if no pins are expected to be knocked down
+        # Only rasterise the part of the screen the path and markers cover
+        corners = np.vstack((path, markers - marker_radius, markers + marker_radius))
+        left, top = np.floor(corners.min(axis=0)) - padding
+        right, bottom = np.ceil(corners.max(axis=0)) + padding
+        area = pygame.Rect(left, top, right - left, bottom - top).clip(self.camera.screen_rect)
+        image = pygame.Surface(area.size, pygame.SRCALPHA)
+        origin = np.array(area.topleft)
+        if area.width and area.height:
+            pygame.draw.lines(image, consts.RED, False, (path - origin).tolist(), self.WIDTH)
+            for centre in (markers - origin).tolist():
+                pygame.draw.circle(image, consts.RED, centre, marker_radius, self.MARKER_WIDTH)
+        self.image = image.convert_alpha()
+        self.rect = area
+        self.dirty = 1
+
+    def show(self, visible: bool) -> None:
+        """
+        Shows or hides the trajectory line.
+
+        :param visible: Whether the line should be visible.
+        """
+        if bool(self.visible) != visible:
+            self.visible = int(visible)
+            if visible and self.is_stale:
+                self.rasterise()
+
+
+class LaneRenderer:
+    """
+    Renders the moving elements of a bowling lane over a pre-rendered background, as seen through a camera.
+
+    The background is only painted again when the camera's view changes, and sprites outside the view are hidden, so
+    the cost of each frame depends on what is on the screen rather than on everything in the space.
+
+    :ivar screen: The surface the lane is rendered to.
+    :ivar paint_background: Paints the static scene for the camera's view.
+    :ivar background: The static scene the sprites are drawn over.
+    :ivar camera: The view of the lane that is drawn.
+    :ivar sprites: The group containing every sprite in the lane, which tracks which areas need to be redrawn.
+    :ivar trajectory_line: The sprite drawing the trajectory line.
+    :ivar stepper: The stepper whose timesteps body positions are interpolated between, if any.
+    :ivar position_of: Returns the position a body should be drawn at.
+    :ivar ball: The ball being drawn.
+    :ivar pin_set: The set of pins being drawn.
+    :ivar ball_sprite: The sprite drawing the ball.
+    :ivar pin_sprites: The sprite drawing each pin, in PinSet.pins order.
+    """
+
+    def __init__(
+            self,
+            screen: pygame.Surface,
+            paint_background: BackgroundPainter,
+            ball: Ball,
+            pin_set: PinSet,
+            stepper: PhysicsStepper | None = None,
+            camera: Camera | None = None,
+    ) -> None:
+        """
+        Initialises the renderer and creates sprites for the ball, pins and trajectory line.
+
+        :param screen: The surface to render the lane to.
+        :param paint_background: Paints the static scene for a camera's view onto a surface the size of the screen.
+        :param ball: The ball to draw.
+        :param pin_set: The set of pins to draw.
+        :param stepper: The stepper advancing the lane's space. If given, bodies are drawn at positions interpolated
+            between its last two timesteps, otherwise at their current positions.
+        :param camera: The view of the lane to draw. Defaults to the whole lane.
+        """
+        self.screen = screen
+        self.paint_background = paint_background
+        self.background = pygame.Surface(screen.get_size()).convert()
+        self.camera = camera or Camera(*screen.get_size())
+        self.stepper = stepper
+        self.position_of = stepper.interpolated_position if stepper is not None else body_position
+        self.sprites = pygame.sprite.LayeredDirty()
+        self.sprites.clear(screen, self.background)
+        self.trajectory_line = TrajectoryLineSprite(self.camera)
+        self.set_objects(ball, pin_set)
+
+    def set_objects(self, ball: Ball, pin_set: PinSet) -> None:
+        """
+        Replaces the ball and pins being drawn.
+
+        :param ball: The ball to draw.
+        :param pin_set: The set of pins to draw.
+        """
+        self.ball = ball
+        self.pin_set = pin_set
+        self.ball_sprite = BallSprite()
+        self.pin_sprites = [PinSprite() for _ in pin_set.pins]
+        self.sprites.empty()
+        self.sprites.add(self.trajectory_line, self.ball_sprite, *self.pin_sprites)
+        self.camera.update(ball.y)
+        self.refresh_view()
+
+    def refresh_view(self) -> None:
+        """Paints the background and resizes every sprite for the camera's current view."""
+        self.paint_background(self.background, self.camera)
+        self.ball_sprite.set_scale(self.camera.scale)
+        for sprite in self.pin_sprites:
+            sprite.set_scale(self.camera.scale)
+        self.trajectory_line.rasterise()
+        self.repaint()
+
+    def repaint(self) -> None:
+        """Marks the whole screen to be redrawn in the next call to draw(), e.g. after something else drew over it."""
+        self.sprites.repaint_rect(self.screen.get_rect())
+
+    def draw(self) -> list[pygame.Rect]:
+        """
+        Moves the camera with the ball, updates the sprites and redraws the ones that have changed, clearing their
+        previous positions.
+
+        :return: The areas of the screen that have changed and need to be updated on the display.
+        """
+        ball_x, ball_y = self.position_of(self.ball.body)
+        if self.camera.update(ball_y):
+            self.refresh_view()
+        self.update_ball(ball_x, ball_y)
+        self.update_pins()
+        return self.sprites.draw(self.screen)
+
+    def update_ball(self, x: float, y: float) -> None:
+        """
+        Moves the ball sprite to the ball's position, hiding it if it is outside the camera's view.
+
+        :param x: The game x-coordinate the ball should be drawn at.
+        :param y: The game y-coordinate the ball should be drawn at.
+        """
+        screen_x, screen_y = self.camera.to_screen(x, y)
+        is_shown = self.camera.contains(screen_x, screen_y, self.ball_sprite.diameter / 2)
+        self.ball_sprite.update((round(screen_x), round(screen_y)), is_shown)
+
+    def update_pins(self) -> None:
+        """
+        Syncs the pins' array-backed view and moves every pin sprite, converting all pins to the screen at once.
+        Pins that have been removed or are outside the camera's view are hidden.
+        """
+        pin_set = self.pin_set
+        pin_set.sync()
+        positions = pin_set.positions
+        if self.stepper is not None:
+            positions = self.stepper.interpolate_positions(pin_set.body_ids, positions)
+        screen_positions = self.camera.to_screen_many(positions)
+        radius = self.camera.length_to_screen(Pin.RADIUS)
+        is_shown = ~pin_set.removed_flags & self.camera.is_visible(screen_positions, radius)
+        centres = np.rint(screen_positions).astype(int).tolist()
+        for sprite, centre, is_hit, shown in zip(
+                self.pin_sprites, centres, pin_set.hit_flags.tolist(), is_shown.tolist(), strict=True
+        ):
+            sprite.update(tuple(centre), is_hit, shown)
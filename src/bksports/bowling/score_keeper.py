@@ -1,79 +1,106 @@
+import numpy as np
+
+from bksports.bowling.leaves import FULL_RACK
+
+MAX_THROWS_PER_GAME = 21  # 9 open frames of 2 throws, plus 3 throws in the final frame
+
+
 class ScoreKeeper:
     """
     Handles the scoring system for the bowling game.
 
-    :ivar raw_score_data: The list of individual scores for each throw. Contains `None` for incomplete scores.
-    :ivar frame_indexes: Set of indexes marking the start of each frame within the scores list.
-    :ivar frame_throws: List containing sublists, where each one represents the throws of a single frame.
+    Scores are kept incrementally: each throw adds its pins to its own frame and to any earlier strike or spare
+    frames still waiting for bonus throws, and each frame's total is fixed as soon as its bonuses are known. Adding a
+    throw and reading the scores therefore take constant time, however far into the game it is.
+
+    :ivar frame_throws: List containing sublists, where each one represents the throws of a single completed frame.
     :ivar current_frame_throws: The list of throws for the frame that is currently being played.
+    :ivar finished: Indicates whether all 10 frames of the game have been completed.
+    :ivar rack_leave: The leave bitmask of the pins standing for the next throw, when throws are added as leaves.
+    :ivar throw_leaves: The leave bitmask of the pins left standing after each throw, when throws are added as leaves.
     """
 
     def __init__(self) -> None:
         """
         Initialises the scorekeeper object.
         """
-        self.raw_score_data: list[int | None] = []
-        self.frame_indexes: set[int] = set()
         self.frame_throws: list[list[int]] = []
         self.current_frame_throws: list[int] = []
         self.finished: bool = False
+        self.rack_leave: int = FULL_RACK
+        self.throw_leaves: list[int] = []
+        self._rack_pins_down = 0  # Pins knocked down since the pins were last set up
+        self._total_score = 0
+        self._frame_scores: list[int] = []  # Running score of each started frame, including bonuses added so far
+        self._frame_totals: list[int | None] = []
+        self._cumulative_totals: list[int] = []
+        self._pending_bonuses: list[list[int]] = []  # [frame index, bonus throws remaining] for strikes and spares
 
     @property
-    def is_last_frame(self):
+    def is_last_frame(self) -> bool:
         """
-        Checks if the current frame will be the last frame of the game by checking if
-        the number of frames is equal to 10 (the standard number of frames in a bowling
-        game).
+        Checks if the current frame is the last frame of the game by checking if 9 frames have already been
+        completed (10 being the standard number of frames in a bowling game).
 
-        :return: True if the number of frames is equal to 9, otherwise False.
+        :return: True if the current frame is the 10th frame, otherwise False.
         """
-        return len(self.frame_score_data) == 10
+        return len(self.frame_throws) == 9
 
     @property
-    def valid_scores(self) -> list[int]:
+    def needs_new_rack(self) -> bool:
         """
-        Returns the scores list but with any None values filtered out and not included.
-
-        :returns: A list containing all scores from self.scores that are not None.
+        Indicates whether a full rack of pins should be set up for the next throw, which is at the start of every
+        frame, and after every strike or spare in the final frame.
         """
-        return [score for score in self.raw_score_data if score is not None]
+        return self._rack_pins_down == 0
 
     @property
     def total_score(self) -> int:
         """
-        Returns the total score of the game by summing the list of valid scores.
+        Returns the total score of the game so far, including any bonuses that are already known.
 
-        :return: The sum of self.valid_scores.
+        :return: The sum of every throw and every bonus added so far.
         """
-        return sum(self.valid_scores)
+        return self._total_score
 
     @property
-    def frame_score_data(self) -> list[list[int]]:
+    def frame_totals(self) -> list[int | None]:
         """
-        Returns the list of frames, by slicing the scores list, by the starting
-        positions of each frame defined in the frame_starts list.
+        Returns the total score of each completed frame. A frame that is still waiting for the bonus throws of a
+        strike or spare has a value of None.
 
-        :return: A list containing sublists, with each sublist representing a frame.
+        :return: A list containing the total scores (or None values) for each completed frame.
         """
-        result = []
-        sorted_frame_starts = sorted(self.frame_indexes)
-        prev_frame_start = sorted_frame_starts[0]
-        for frame_start in sorted_frame_starts[1:]:
-            result.append(self.raw_score_data[prev_frame_start:frame_start])
-            prev_frame_start = frame_start
-        result.append(self.raw_score_data[prev_frame_start:])
-        return result
+        return self._frame_totals
 
     @property
-    def frame_totals(self) -> list[int | None]:
+    def cumulative_totals(self) -> list[int]:
+        """
+        Returns the running score of the game at the end of each frame whose total is known.
+
+        :return: A list containing the cumulative score after each fully calculated frame.
         """
-        Calculates the total score for each frame. If a frame contains any None values
-        (indicating that it is incomplete), the corresponding score will also have a
-        value of None. Otherwise, the sum of the frame's scores will be calculated.
+        return self._cumulative_totals
 
-        :return: A list containing the total scores (or None values) for each frame.
+    def copy(self) -> ScoreKeeper:
         """
-        return [sum([score for score in frame]) if None not in frame else None for frame in self.frame_score_data]
+        Creates an independent copy of the scorekeeper, at the same point in the game.
+
+        :return: The copy of the scorekeeper.
+        """
+        result = ScoreKeeper()
+        result.frame_throws = [frame.copy() for frame in self.frame_throws]
+        result.current_frame_throws = self.current_frame_throws.copy()
+        result.finished = self.finished
+        result.rack_leave = self.rack_leave
+        result.throw_leaves = self.throw_leaves.copy()
+        result._rack_pins_down = self._rack_pins_down
+        result._total_score = self._total_score
+        result._frame_scores = self._frame_scores.copy()
+        result._frame_totals = self._frame_totals.copy()
+        result._cumulative_totals = self._cumulative_totals.copy()
+        result._pending_bonuses = [pending.copy() for pending in self._pending_bonuses]
+        return result
 
     def add_throw(self, score: int) -> bool:
         """
@@ -84,66 +111,58 @@ class ScoreKeeper:
         :param score: The score of the current throw to be added.
         :return: True if the current frame has been completed, otherwise False.
         """
-        # Get and add the frame's index to the frame_indexes list
-        if len(self.frame_indexes) < 10:
-            frame_index = len(self.raw_score_data)
-            self.frame_indexes.add(frame_index)
-        # Add the throw to the current frame's throws
-        self.current_frame_throws.append(score)
-
-        def check_throw() -> bool:
-            """
-            Helper function for add_throw(). Handles special cases (strike/spare/final frame),
-            adds the throw's score to the current frame, and ends the frame when necessary.
-
-            :return: True if the current frame has been completed, otherwise False.
-            """
-            # If this throw is in the last frame
-            if self.is_last_frame:
-                # If the number of strikes in this frame (including this throw) is 2 or less
-                if score == 10 and len(self.current_frame_throws) <= 2:
-                    self.end_open_frame([10])
-                    return False  # The final frame has not finished at this point
-                # If the current throw is the 2nd throw in the frame
-                # Either a spare or an open frame
-                non_10_throws = [throw for throw in self.current_frame_throws if throw != 10]
-                if len(non_10_throws) == 2:
-                    if sum(non_10_throws) == 10:
-                        self.end_spare_frame(non_10_throws)
-                        return True
-                    else:
-                        self.end_open_frame(non_10_throws)
-                        return True  # The final frame has now finished
-                # If this throw is the 3rd throw in this frame
-                if len(self.current_frame_throws) == 3:
-                    self.end_open_frame([score])  # Add the score of the last (current) throw to the frame
-                    return True  # The final frame has now finished
-            # If this throw is not in the last frame
-            elif self.current_frame_throws == [10]:  # If this throw is a strike
-                self.end_strike_frame()
-                return True  # This frame has now ended
-            elif len(self.current_frame_throws) == 2:  # If this throw leaves a spare or open frame
-                if sum(self.current_frame_throws) == 10:  # If this throw leaves a spare
-                    self.end_spare_frame(self.current_frame_throws)
-                else:  # If the throw leaves an open frame
-                    self.end_open_frame(self.current_frame_throws)
-                return True  # This frame has now ended
-            return False
-
-        frame_complete = check_throw()
+        throws = self.current_frame_throws
+        if not throws:
+            self._frame_scores.append(0)
+        self.apply_bonuses(score)
+        # Add the throw to the current frame
+        self._frame_scores[-1] += score
+        self._total_score += score
+        throws.append(score)
+        self._rack_pins_down += score
+        if self._rack_pins_down == 10:
+            self._rack_pins_down = 0
+        bonus_throws = 0
+        # If this throw is in the last frame, the bonus throws are part of the frame itself
+        if self.is_last_frame:
+            frame_complete = len(throws) == 3 or (len(throws) == 2 and throws[0] + throws[1] < 10)
+        elif throws == [10]:  # If this throw is a strike
+            frame_complete = True
+            bonus_throws = 2
+        elif len(throws) == 2:  # If this throw leaves a spare or open frame
+            frame_complete = True
+            bonus_throws = 1 if throws[0] + throws[1] == 10 else 0
+        else:
+            frame_complete = False
         if frame_complete:
-            self.frame_throws.append(self.current_frame_throws)
+            frame_index = len(self.frame_throws)
+            self.frame_throws.append(throws)
             self.current_frame_throws = []  # Clear current throws if the frame is complete
-            if self.is_last_frame:
-                # Adjust each frame to make sure they don't exceed the limit of 30
-                for frame in self.frame_score_data:
-                    frame_total = sum(frame)
-                    if frame_total > 30:
-                        self.raw_score_data.append(30 - frame_total)
-                # Mark that the game is finished
+            self._frame_totals.append(None)
+            self._rack_pins_down = 0
+            if bonus_throws:
+                self._pending_bonuses.append([frame_index, bonus_throws])
+            else:
+                self.resolve_frame(frame_index)
+            # Mark that the game is finished
+            if frame_index == 9:
                 self.finished = True
         return frame_complete
 
+    def add_leave(self, leave: int) -> bool:
+        """
+        Adds a throw given by the leave bitmask of the pins left standing after it, rather than by its score. The
+        score is the number of pins that were standing before the throw and are not standing after it.
+
+        :param leave: The leave bitmask of the pins left standing after the throw.
+        :return: True if the current frame has been completed, otherwise False.
+        """
+        score = (self.rack_leave & ~leave).bit_count()
+        self.throw_leaves.append(leave)
+        frame_complete = self.add_throw(score)
+        self.rack_leave = FULL_RACK if self.needs_new_rack else leave
+        return frame_complete
+
     def add_throws(self, throws: list[int]) -> bool:
         """
         Adds a list of throws to their respective frames by running add_throw
@@ -157,55 +176,31 @@ class ScoreKeeper:
             status = self.add_throw(throw)
         return status
 
-    def end_open_frame(self, frame: list[int]) -> None:
+    def apply_bonuses(self, score: int) -> None:
         """
-        Ends the provided open frame calculating any uncalculated scores from previous strikes and
-        spares, and saving the frame's scores to the scores list.
+        Adds the score of a throw to every earlier strike or spare frame still waiting for bonus throws, and
+        resolves the frames that no longer need any. At most two frames can be waiting at once.
 
-        :param frame: The list of integers representing the scores for each throw in a frame.
+        :param score: The score of the throw that has just been made.
         """
-        self.calc_strikes_and_spares(frame)
-        self.raw_score_data.extend(frame)
+        for pending in self._pending_bonuses:
+            self._frame_scores[pending[0]] += score
+            self._total_score += score
+            pending[1] -= 1
+        # Frames always finish waiting in the order they were added
+        while self._pending_bonuses and self._pending_bonuses[0][1] == 0:
+            self.resolve_frame(self._pending_bonuses.pop(0)[0])
 
-    def end_spare_frame(self, frame: list[int]) -> None:
+    def resolve_frame(self, frame_index: int) -> None:
         """
-        Ends the provided spare frame, calculating any uncalculated scores from previous strikes and
-        spares, and saving the frame's scores, alongside an extra None value to account for the next
-        throw, to the scores list.
+        Fixes the total score of a frame whose bonuses are all known, and extends the cumulative totals.
 
-        :param frame: The list of integers representing the scores for each throw in a frame.
+        :param frame_index: The index of the frame to resolve.
         """
-        self.calc_strikes_and_spares(frame)
-        self.raw_score_data.extend([*frame, None])
-
-    def end_strike_frame(self) -> None:
-        """
-        Ends a strike frame, calculating any uncalculated scores from previous strikes and spares, and
-        saving a single 10 score, alongside two extra None values to account for the next
-        two throws, to the scores list.
-        """
-        self.calc_strikes_and_spares([10])
-        self.raw_score_data.extend([10, None, None])
-
-    def calc_strikes_and_spares(self, frame: list[int]) -> None:
-        """
-        Calculates and updates any uncalculated scores from strikes and spares, using the
-        current frame. If the frame list does not supply enough values, it uses the value
-        of the last non-None score to fill the missing scores.
-
-        :param frame: The list of integers representing the scores for each throw in a frame.
-        """
-        frame = frame.copy()
-        while None in self.raw_score_data:
-            n_index = len(self.raw_score_data) - 1 - self.raw_score_data[::-1].index(None)
-            if frame:
-                self.raw_score_data[n_index] = frame.pop()
-            else:
-                # TODO: Check that this logic is correct with more examples
-                # print(self.scores[-2])
-                self.raw_score_data[n_index] = self.raw_score_data[-2]
-                break
-        # print(self.scores)
+        frame_score = self._frame_scores[frame_index]
+        self._frame_totals[frame_index] = frame_score
+        previous = self._cumulative_totals[-1] if self._cumulative_totals else 0
+        self._cumulative_totals.append(previous + frame_score)
 
     def __str__(self) -> str:
         """
@@ -215,19 +210,82 @@ class ScoreKeeper:
         :return: A formatted string displaying the details for each frame.
         """
         result = "\n"
-        c_score = 0
-        for i, frame in enumerate(self.frame_score_data):
-            if None not in frame:
-                # TODO: Maybe optimise current score calculation to be more efficient
-                c_score += sum([score for score in frame if score is not None])
-                result += f"Frame {i + 1}:\n{self.frame_throws[i]} {c_score}\n"
+        for i, frame in enumerate(self.frame_throws):
+            if i < len(self._cumulative_totals):
+                result += f"Frame {i + 1}:\n{frame} {self._cumulative_totals[i]}\n"
             else:
-                result += f"Frame {i + 1}:\n{self.frame_throws[i]} Uncalculated, more throws needed to calculate\n"
+                result += f"Frame {i + 1}:\n{frame} Uncalculated, more throws needed to calculate\n"
                 break
-        result += f"\nFinal score: {c_score}" if self.finished else "\nGame not finished"
+        result += f"\nFinal score: {self.total_score}" if self.finished else "\nGame not finished"
         return result
 
 
+def score_games(throws: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Scores many complete games at once using array operations.
+
+    Each row holds one game's throws in order, padded after the last throw (with zeros or negative values) up to
+    MAX_THROWS_PER_GAME columns. The games are walked frame by frame together, so the work done in Python is the same
+    for one game as for a million.
+
+    :param throws: A 2-D integer array of shape (games, throws) with at most MAX_THROWS_PER_GAME columns.
+    :return: A tuple (frame_totals, final_scores), where frame_totals has shape (games, 10) and holds the total
+        score of each frame, and final_scores has shape (games,) and holds the score of each game.
+    """
+    throws = np.asarray(throws)
+    if throws.ndim != 2 or throws.shape[1] > MAX_THROWS_PER_GAME:
+        raise ValueError(f"throws must have shape (games, <= {MAX_THROWS_PER_GAME}), got {throws.shape}")
+    # Pad to the full width (plus 2 columns, so bonus lookups never run off the end) and clear the padding values
+    padded = np.zeros((throws.shape[0], MAX_THROWS_PER_GAME + 2), dtype=np.int16)
+    padded[:, :throws.shape[1]] = np.maximum(throws, 0)
+    rows = np.arange(throws.shape[0])
+    frame_starts = np.zeros(throws.shape[0], dtype=np.intp)
+    frame_totals = np.empty((throws.shape[0], 10), dtype=np.int16)
+    for frame in range(10):
+        first = padded[rows, frame_starts]
+        second = padded[rows, frame_starts + 1]
+        third = padded[rows, frame_starts + 2]
+        is_strike = first == 10
+        # Strikes and spares both score the next three throws from the start of the frame (including their own)
+        is_mark = is_strike | (first + second == 10)
+        frame_totals[:, frame] = np.where(is_mark, first + second + third, first + second)
+        frame_starts += np.where(is_strike, 1, 2)
+    return frame_totals, frame_totals.sum(axis=1, dtype=np.int32)
+
+
+def generate_random_games(count: int, seed: int | None = None) -> np.ndarray:
+    """
+    Generates random but valid complete games, in the padded format accepted by score_games().
+
+    :param count: The number of games to generate.
+    :param seed: The seed for the random number generator.
+    :return: An integer array of shape (count, MAX_THROWS_PER_GAME), padded with -1 after each game's last throw.
+    """
+    rng = np.random.default_rng(seed)
+    games = np.full((count, MAX_THROWS_PER_GAME), -1, dtype=np.int16)
+    rows = np.arange(count)
+    next_throw = np.zeros(count, dtype=np.intp)
+    for frame in range(10):
+        first = rng.integers(0, 11, count)
+        # Pins left standing for the second throw (a full rack again after a strike in the final frame)
+        second = rng.integers(0, np.where(first == 10, 10, 10 - first) + 1)
+        games[rows, next_throw] = first
+        if frame < 9:
+            # A strike ends the frame, so its second throw is never recorded
+            has_second = first != 10
+            games[rows[has_second], next_throw[has_second] + 1] = second[has_second]
+            next_throw += np.where(has_second, 2, 1)
+        else:
+            games[rows, next_throw + 1] = second
+            # A strike or spare in the final frame earns a third throw, from a fresh rack if the last throw cleared it
+            is_strike = first == 10
+            clears_rack = np.where(is_strike, second == 10, first + second == 10)
+            third = rng.integers(0, np.where(~is_strike | clears_rack, 10, 10 - second) + 1)
+            has_third = is_strike | (first + second == 10)
+            games[rows[has_third], next_throw[has_third] + 2] = third[has_third]
+    return games
+
+
 # Example game - https://bowlingforbeginners.com/how-is-bowling-scored/
 if __name__ == '__main__':
     sk = ScoreKeeper()
@@ -241,8 +299,15 @@ if __name__ == '__main__':
     sk.add_throws([9, 0])
     sk.add_throws([3, 2])
     print(sk.add_throws([10, 10, 1]))
-    print(sk.raw_score_data, sk.total_score)
-    print(sk.frame_indexes)
-    print(sk.frame_score_data)
+    print(sk.frame_totals, sk.total_score)
+    print(sk.cumulative_totals)
     print(sk.frame_throws)
     print(sk)
+    # Cross-check the batch scorer against the scorekeeper
+    games = generate_random_games(10_000, seed=0)
+    batch_frame_totals, batch_scores = score_games(games)
+    for game, frame_totals, score in zip(games, batch_frame_totals, batch_scores, strict=True):
+        sk = ScoreKeeper()
+        sk.add_throws([int(throw) for throw in game if throw >= 0])
+        assert sk.finished and sk.total_score == score and sk.frame_totals == frame_totals.tolist()
+    print(f"score_games() matches ScoreKeeper on {len(games)} random games")
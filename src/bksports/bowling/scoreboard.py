@@ -0,0 +1,104 @@
+"""
+On-screen display of the players' scores.
+
+During play, a ScoreLabel shows each player's running total over the lane, and is only rendered again when a total
+changes. Between frames and at the end of the game, draw_scorecards() fills the screen with every player's frames.
+Fonts are loaded once for each size and cached, as the scorecards are drawn every frame.
+"""
+
+import functools
+
+import pygame
+
+import bksports.constants as consts
+from bksports.bowling.score_keeper import ScoreKeeper
+
+type Player = tuple[str, ScoreKeeper]
+
+
+@functools.cache
+def load_font(size: int, bold: bool = False) -> pygame.font.Font:
+    """
+    Loads the monospace system font at the given size.
+
+    :param size: The size of the font, in points.
+    :param bold: Whether the font is bold.
+    :return: The font.
+    """
+    return pygame.font.SysFont("monospace", size, bold=bold)
+
+
+class ScoreLabel:
+    """
+    Shows the running total of each player's score in the top right corner of a lane.
+
+    :ivar players: The name and scorekeeper of each player shown.
+    :ivar font: The font the totals are written in.
+    :ivar text: The text the label was last rendered with.
+    :ivar image: The label as it was last rendered.
+    """
+
+    def __init__(self, players: list[Player], font_size: int = 16) -> None:
+        """
+        Initialises the label.
+
+        :param players: The name and scorekeeper of each player to show.
+        :param font_size: The size of the font, in points.
+        """
+        self.players = players
+        self.font = load_font(font_size, bold=True)
+        self.text = ""
+        self.image: pygame.Surface | None = None
+
+    def draw(self, screen: pygame.Surface) -> pygame.Rect:
+        """
+        Draws the label onto the screen, rendering it again first if any player's total has changed.
+
+        :param screen: The surface to draw onto.
+        :return: The area of the screen drawn over.
+        """
+        text = "  ".join(f"{name} {score_keeper.total_score}" for name, score_keeper in self.players)
+        if self.image is None or text != self.text:
+            self.text = text
+            self.image = self.font.render(f" {text} ", True, consts.WHITE, consts.BLACK)
+        return screen.blit(self.image, self.image.get_rect(topright=(screen.get_width() - 4, 4)))
+
+
+def scorecard_lines(name: str, score_keeper: ScoreKeeper) -> list[str]:
+    """
+    Lays out a player's scorecard as lines of text: a heading, then the throws of each completed frame and the
+    cumulative score after it (blank until its bonus throws have been made), then the total.
+
+    :param name: The name of the player.
+    :param score_keeper: The player's scorekeeper.
+    :return: The lines of the scorecard.
+    """
+    totals = score_keeper.cumulative_totals
+    lines = [name]
+    for i, throws in enumerate(score_keeper.frame_throws):
+        total = str(totals[i]) if i < len(totals) else ""
+        lines.append(f"{i + 1:>2}  {' '.join(map(str, throws)):<8}{total:>4}")
+    lines.append(f"{'Final' if score_keeper.finished else 'Total'} {score_keeper.total_score}")
+    return lines
+
+
+def draw_scorecards(screen: pygame.Surface, players: list[Player], prompt: str, font_size: int = 16) -> None:
+    """
+    Fills the screen with each player's scorecard, side by side, with a prompt underneath.
+
+    :param screen: The surface to draw onto.
+    :param players: The name and scorekeeper of each player to show.
+    :param prompt: The line written underneath the scorecards, e.g. telling the player how to continue.
+    :param font_size: The size of the font, in points.
+    """
+    font = load_font(font_size)
+    line_height = font.get_linesize()
+    column_width = screen.get_width() // len(players)
+    screen.fill(consts.WHITE)
+    bottom = 0
+    for i, (name, score_keeper) in enumerate(players):
+        lines = scorecard_lines(name, score_keeper)
+        for j, line in enumerate(lines):
+            screen.blit(font.render(line, True, consts.BLACK), (i * column_width + 16, 16 + j * line_height))
+        bottom = max(bottom, 16 + len(lines) * line_height)
+    screen.blit(font.render(prompt, True, consts.BLACK), (16, bottom + line_height))
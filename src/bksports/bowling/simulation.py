@@ -0,0 +1,191 @@
+"""
+Headless simulation of bowling throws.
+
+Runs the same pymunk physics as the interactive game (a Ball thrown into a PinSet), but steps the space as fast as
+the CPU allows, without a display, a frame rate cap, or any pygame import.
+"""
+
+from dataclasses import dataclass
+
+import bksports.constants as consts
+from bksports.bowling.ball import Ball, BallState
+from bksports.bowling.leaves import FULL_RACK, NUM_LEAVES, ConversionTable
+from bksports.bowling.physics import PhysicsProfile, SolverProfile, create_space
+from bksports.bowling.pin import PinSet
+from bksports.bowling.snapshot import LaneSnapshot, capture_lane, restore_lane
+from bksports.bowling.stepper import PhysicsStepper
+
+
+@dataclass(frozen=True)
+class ThrowResult:
+    """
+    The outcome of a single simulated throw.
+
+    :ivar pins_knocked: The number of pins knocked over by the throw.
+    :ivar knocked: For each pin in PinSet order, whether it was knocked over by the throw.
+    :ivar leave: The leave bitmask of the pins left standing after the throw.
+    :ivar pin_positions: The final (x, y) position of each pin in PinSet order, in game coordinates.
+    :ivar ball_path: The (x, y) positions of the ball after each timestep of the throw, in game coordinates.
+    :ivar duration: The simulated time the throw took, in seconds.
+    :ivar steps: The number of times the space was stepped during the throw.
+    """
+
+    pins_knocked: int
+    knocked: tuple[bool, ...]
+    leave: int
+    pin_positions: tuple[tuple[float, float], ...]
+    ball_path: tuple[tuple[float, float], ...]
+    duration: float
+    steps: int
+
+
+class ThrowSimulator:
+    """
+    Simulates throws of the ball into a set of pins without rendering anything.
+
+    The simulator owns a single space, ball and set of pins, which are reset in place before every throw.
+
+    :ivar timestep: The simulated time of each fixed timestep, in seconds.
+    :ivar substeps: The number of times the space is stepped in each timestep, when not stepping adaptively.
+    :ivar adaptive: Indicates whether the number of substeps is chosen from the speed of the bodies.
+    :ivar max_duration: The simulated time after which a throw is ended, even if the pins have not settled.
+    :ivar space: The pymunk Space throws are simulated in.
+    :ivar ball: The ball thrown in every throw.
+    :ivar pin_set: The set of pins, set up again before every throw.
+    :ivar stepper: Steps the space through each throw.
+    """
+
+    def __init__(
+            self,
+            timestep: float = consts.PHYSICS_TIMESTEP,
+            substeps: int = consts.PHYSICS_SUBSTEPS,
+            adaptive: bool = True,
+            max_duration: float = 10.0,
+            solver: SolverProfile | None = None,
+    ) -> None:
+        """
+        Initialises the simulator.
+
+        :param timestep: The simulated time of each fixed timestep, in seconds. Defaults to the game's timestep.
+        :param substeps: The number of times the space is stepped in each timestep, when not stepping adaptively.
+        :param adaptive: Whether to choose the number of substeps from the speed of the bodies, as the game does.
+        :param max_duration: The simulated time after which a throw is ended, in seconds.
+        :param solver: The solver settings to create the space with. Defaults to the game's settings.
+        """
+        self.timestep = timestep
+        self.substeps = substeps
+        self.adaptive = adaptive
+        self.max_duration = max_duration
+        self.space = create_space(solver)
+        self.ball = Ball(self.space)
+        self.pin_set = PinSet(self.space)
+        self.stepper = PhysicsStepper(self.space, self.timestep, self.substeps, adaptive=self.adaptive)
+
+    def apply_profile(self, profile: PhysicsProfile) -> None:
+        """
+        Sets the friction and elasticity of the simulator's ball and pins from a physics profile, for every throw
+        simulated afterwards.
+
+        :param profile: The profile to apply.
+        """
+        self.ball.apply_profile(profile)
+        self.pin_set.apply_profile(profile)
+
+    def simulate(self, angle: float, velocity: float, leave: int = FULL_RACK) -> ThrowResult:
+        """
+        Simulates a single throw of the ball.
+
+        :param angle: The angle in degrees the ball is thrown at, relative to the vertical.
+        :param velocity: The velocity of the ball in inches per second.
+        :param leave: The leave bitmask of the pins standing before the throw. Defaults to a full rack.
+        :return: The outcome of the throw.
+        """
+        # Set the ball and pins up again
+        self.ball.reset()
+        self.pin_set.reset(leave)
+        return self.run_throw(angle, velocity)
+
+    def simulate_from(self, snapshot: LaneSnapshot, angle: float, velocity: float) -> ThrowResult:
+        """
+        Simulates a single throw of the ball into the pins as they were when a snapshot was captured, e.g. the pins
+        left standing after a first ball. The ball is thrown from its starting position.
+
+        :param snapshot: The snapshot of the lane to throw into.
+        :param angle: The angle in degrees the ball is thrown at, relative to the vertical.
+        :param velocity: The velocity of the ball in inches per second.
+        :return: The outcome of the throw.
+        """
+        restore_lane(snapshot, self.ball, self.pin_set)
+        self.ball.reset()
+        return self.run_throw(angle, velocity)
+
+    def capture(self) -> LaneSnapshot:
+        """
+        Captures the current state of the simulator's lane, e.g. after a throw and PinSet.clean_up(), so that
+        further throws can be simulated from it with simulate_from().
+
+        :return: The snapshot of the lane.
+        """
+        return capture_lane(self.ball, self.pin_set)
+
+    def run_throw(self, angle: float, velocity: float) -> ThrowResult:
+        """
+        Throws the ball from the lane's current state and steps the space until the throw has ended.
+
+        :param angle: The angle in degrees the ball is thrown at, relative to the vertical.
+        :param velocity: The velocity of the ball in inches per second.
+        :return: The outcome of the throw.
+        """
+        ball = self.ball
+        pin_set = self.pin_set
+        stepper = self.stepper
+        stepper.reset()
+        # Throw the ball and step the space until the ball has finished and the pins have settled
+        ball.throw(angle, velocity)
+        ball_path = [(ball.x, ball.y)]
+        elapsed = 0.0
+        while elapsed < self.max_duration:
+            stepper.step()
+            elapsed += self.timestep
+            ball.update()
+            ball_path.append((ball.x, ball.y))
+            if ball.state == BallState.FINISHED and pin_set.is_settled():
+                break
+        knocked = tuple(pin.hit and not pin.removed for pin in pin_set.pins)
+        return ThrowResult(
+            pins_knocked=sum(knocked),
+            knocked=knocked,
+            leave=pin_set.leave,
+            pin_positions=tuple((pin.x, pin.y) for pin in pin_set.pins),
+            ball_path=tuple(ball_path),
+            duration=elapsed,
+            steps=stepper.steps_taken,
+        )
+
+
+def simulate_conversion_table(
+        leaves: list[int] | None = None,
+        angles: list[float] | None = None,
+        velocities: list[float] | None = None,
+        simulator: ThrowSimulator | None = None,
+) -> ConversionTable:
+    """
+    Builds a table of simulated conversion rates, by throwing every combination of the given angles and velocities
+    at every given leave and recording which throws knock down every standing pin.
+
+    :param leaves: The leaves to simulate. Defaults to every leave with at least one pin standing.
+    :param angles: The throw angles to try, in degrees. Defaults to the game's range, in its 0.5 degree steps.
+    :param velocities: The throw velocities to try, in inches per second. Defaults to the game's throw velocity.
+    :param simulator: The simulator to use. Defaults to a new simulator.
+    :return: The table of simulated conversion attempts.
+    """
+    leaves = leaves if leaves is not None else list(range(1, NUM_LEAVES))
+    angles = angles if angles is not None else [angle / 2 for angle in range(-10, 11)]
+    velocities = velocities if velocities is not None else [consts.THROW_VELOCITY]
+    simulator = simulator or ThrowSimulator()
+    table = ConversionTable()
+    for leave in leaves:
+        for angle in angles:
+            for velocity in velocities:
+                table.record(leave, simulator.simulate(angle, velocity, leave).leave == 0)
+    return table
@@ -0,0 +1,73 @@
+"""
+Snapshots of the full physical and scoring state of a bowling lane.
+
+A snapshot can be restored into the same ball and set of pins any number of times, so that many alternative throws
+can be simulated from one position (e.g. every candidate second ball for a leave) without replaying how the lane got
+there.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from bksports.bowling.ball import Ball, BallState
+from bksports.bowling.pin import PinSet
+from bksports.bowling.score_keeper import ScoreKeeper
+
+
+@dataclass(frozen=True)
+class LaneSnapshot:
+    """
+    The captured state of a bowling lane.
+
+    :ivar bodies: An array with a row for the ball followed by a row for each pin in PinSet order, each holding the
+        body's position, angle, velocity and angular velocity.
+    :ivar ball_state: The state of the ball within the game.
+    :ivar hit_mask: Bitmask of the pins that had been hit.
+    :ivar removed_mask: Bitmask of the pins that had been removed.
+    :ivar pins_hit: The number of pins the ball had hit in the current throw.
+    :ivar score_keeper: A copy of the lane's scorekeeper, if it was captured.
+    """
+
+    bodies: np.ndarray
+    ball_state: BallState
+    hit_mask: int
+    removed_mask: int
+    pins_hit: int
+    score_keeper: ScoreKeeper | None = None
+
+
+def capture_lane(ball: Ball, pin_set: PinSet, score_keeper: ScoreKeeper | None = None) -> LaneSnapshot:
+    """
+    Captures the state of a bowling lane.
+
+    :param ball: The lane's ball.
+    :param pin_set: The lane's set of pins.
+    :param score_keeper: The lane's scorekeeper, if its position in the game should be captured too.
+    :return: The snapshot of the lane.
+    """
+    bodies = np.vstack((ball.capture_state(), pin_set.capture_state()))
+    bodies.flags.writeable = False  # Snapshots are shared between every restore, so must never change
+    return LaneSnapshot(
+        bodies=bodies,
+        ball_state=ball.state,
+        hit_mask=pin_set.hit_mask,
+        removed_mask=pin_set.removed_mask,
+        pins_hit=pin_set.pins_hit,
+        score_keeper=score_keeper.copy() if score_keeper is not None else None,
+    )
+
+
+def restore_lane(snapshot: LaneSnapshot, ball: Ball, pin_set: PinSet) -> ScoreKeeper | None:
+    """
+    Restores a bowling lane to a captured state. Any PhysicsStepper stepping the lane's space must be reset
+    afterwards.
+
+    :param snapshot: The snapshot to restore.
+    :param ball: The lane's ball.
+    :param pin_set: The lane's set of pins.
+    :return: A fresh copy of the captured scorekeeper, or None if it was not captured.
+    """
+    ball.restore_state(snapshot.bodies[0], snapshot.ball_state)
+    pin_set.restore_state(snapshot.bodies[1:], snapshot.hit_mask, snapshot.removed_mask, snapshot.pins_hit)
+    return snapshot.score_keeper.copy() if snapshot.score_keeper is not None else None
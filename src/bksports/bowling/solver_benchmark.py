@@ -0,0 +1,158 @@
+"""
+Benchmarks of pymunk solver settings, for choosing the fastest settings that still give the same pin outcomes.
+
+Every solver profile throws the same standard set of throws (the game's whole range of angles at its throw velocity
+into a full rack) several times. Its throughput is the number of throws and space steps simulated per second, and
+its stability is measured twice over: whether repeated runs of a throw always leave the same pins standing, and how
+many throws leave the same pins standing as with the baseline profile. The fastest profile that is both repeatable
+and in full agreement with the baseline can be saved, to be loaded by the game with --solver.
+"""
+
+import argparse
+import json
+import time
+from dataclasses import asdict, dataclass, replace
+
+import numpy as np
+
+import bksports.constants as consts
+from bksports.bowling.leaves import FULL_RACK
+from bksports.bowling.physics import SolverProfile
+from bksports.bowling.simulation import ThrowSimulator
+from bksports.bowling.sweep import MAX_THROW_ANGLE, MIN_THROW_ANGLE
+
+# The profiles benchmarked by default, each changing one setting from the baseline
+BASELINE = SolverProfile()
+CANDIDATES = {
+    "baseline": BASELINE,
+    "iterations=5": replace(BASELINE, iterations=5),
+    "iterations=20": replace(BASELINE, iterations=20),
+    "collision_slop=0.05": replace(BASELINE, collision_slop=0.05),
+    "collision_slop=0.5": replace(BASELINE, collision_slop=0.5),
+    "spatial_hash": replace(BASELINE, use_spatial_hash=True),
+    "threaded": replace(BASELINE, threaded=True),
+}
+
+
+@dataclass(frozen=True)
+class SolverBenchmark:
+    """
+    The results of benchmarking a solver profile.
+
+    :ivar name: The name of the profile.
+    :ivar profile: The profile benchmarked.
+    :ivar throws_per_second: The number of throws simulated per second.
+    :ivar steps_per_second: The number of times the space was stepped per second.
+    :ivar repeatable: The fraction of throws that left the same pins standing in every repeat.
+    :ivar agreement: The fraction of throws that left the same pins standing as with the baseline profile.
+    :ivar leaves: The leave bitmask left standing by each throw in the first repeat.
+    """
+
+    name: str
+    profile: SolverProfile
+    throws_per_second: float
+    steps_per_second: float
+    repeatable: float
+    agreement: float
+    leaves: tuple[int, ...]
+
+
+def standard_throws() -> list[float]:
+    """Returns the angles of the standard set of throws: every angle the game can aim at, in degrees."""
+    num_angles = round((MAX_THROW_ANGLE - MIN_THROW_ANGLE) / consts.THROW_ANGLE_STEP) + 1
+    return np.linspace(MIN_THROW_ANGLE, MAX_THROW_ANGLE, num_angles).tolist()
+
+
+def run_throws(profile: SolverProfile, angles: list[float], repeats: int) -> tuple[np.ndarray, float, int]:
+    """
+    Simulates the standard throws with a solver profile, in a new simulator so nothing is shared between profiles.
+
+    :param profile: The solver profile to simulate with.
+    :param angles: The angles of the throws, in degrees.
+    :param repeats: The number of times every throw is simulated.
+    :return: A tuple (leaves, elapsed, steps) of the leave left standing by each throw in each repeat (shape repeats x
+        throws), the time taken in seconds and the total number of space steps.
+    """
+    simulator = ThrowSimulator(solver=profile)
+    simulator.simulate(0.0, consts.THROW_VELOCITY, FULL_RACK)  # Warm up before timing
+    leaves = np.zeros((repeats, len(angles)), dtype=np.uint16)
+    steps = 0
+    start = time.perf_counter()
+    for repeat in range(repeats):
+        for i, angle in enumerate(angles):
+            result = simulator.simulate(angle, consts.THROW_VELOCITY, FULL_RACK)
+            leaves[repeat, i] = result.leave
+            steps += result.steps
+    return leaves, time.perf_counter() - start, steps
+
+
+def benchmark_solvers(
+        candidates: dict[str, SolverProfile] | None = None,
+        repeats: int = 3,
+        baseline: SolverProfile = BASELINE,
+) -> list[SolverBenchmark]:
+    """
+    Benchmarks the throughput and outcome stability of solver profiles on the standard set of throws.
+
+    :param candidates: The profiles to benchmark, by name. Defaults to changing each setting from the baseline.
+    :param repeats: The number of times every throw is simulated with each profile.
+    :param baseline: The profile whose pin outcomes every profile is compared against.
+    :return: The results for each profile, in the order given.
+    """
+    candidates = candidates if candidates is not None else CANDIDATES
+    angles = standard_throws()
+    baseline_leaves = run_throws(baseline, angles, 1)[0][0]
+    results = []
+    for name, profile in candidates.items():
+        leaves, elapsed, steps = run_throws(profile, angles, repeats)
+        results.append(SolverBenchmark(
+            name=name,
+            profile=profile,
+            throws_per_second=leaves.size / elapsed,
+            steps_per_second=steps / elapsed,
+            repeatable=float(np.mean(np.all(leaves == leaves[0], axis=0))),
+            agreement=float(np.mean(leaves[0] == baseline_leaves)),
+            leaves=tuple(leaves[0].tolist()),
+        ))
+    return results
+
+
+def fastest_stable(results: list[SolverBenchmark]) -> SolverBenchmark | None:
+    """
+    Picks the fastest profile whose throws were all repeatable and all left the same pins standing as the baseline.
+
+    :param results: The results of benchmark_solvers().
+    :return: The fastest stable profile's results, or None if no profile was stable.
+    """
+    stable = [result for result in results if result.repeatable == 1.0 and result.agreement == 1.0]
+    return max(stable, key=lambda result: result.throws_per_second, default=None)
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Command line entry point for benchmarking solver profiles."""
+    parser = argparse.ArgumentParser(description="Compare the speed and pin outcomes of pymunk solver settings.")
+    parser.add_argument("--repeats", type=int, default=3, help="Times every standard throw is simulated")
+    parser.add_argument("--output", default=None, help="Also save the results as JSON to this file")
+    parser.add_argument("--save-fastest", metavar="PROFILE", help="Save the fastest stable profile, for --solver")
+    args = parser.parse_args(argv)
+    results = benchmark_solvers(repeats=args.repeats)
+    baseline = results[0]
+    print(f"{'profile':<22}{'throws/s':>10}{'steps/s':>12}{'speedup':>9}{'repeatable':>12}{'agreement':>11}")
+    for result in results:
+        print(f"{result.name:<22}{result.throws_per_second:>10.1f}{result.steps_per_second:>12.0f}"
+              f"{result.throws_per_second / baseline.throws_per_second:>8.2f}x"
+              f"{result.repeatable:>12.0%}{result.agreement:>11.0%}")
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump([asdict(result) for result in results], file, indent=4)
+    if args.save_fastest:
+        fastest = fastest_stable(results)
+        if fastest is None:
+            print("No profile gave the same pin outcomes as the baseline every time, so none was saved")
+        else:
+            fastest.profile.save(args.save_fastest)
+            print(f"Saved {fastest.name} to {args.save_fastest}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""
+Fixed timestep stepping of the pymunk Space, decoupled from the rate the game is rendered at.
+"""
+
+import math
+
+import numpy as np
+import pymunk
+import pymunk.batch
+
+import bksports.constants as consts
+from bksports.bowling.physics import read_space_kinematics
+from bksports.bowling.pin import Pin
+
+
+class PhysicsStepper:
+    """
+    Steps a pymunk Space with a fixed timestep, however long each rendered frame takes.
+
+    The time of each rendered frame is added to an accumulator, which is then used up in fixed timesteps, so that the
+    simulation is the same whether the game is rendered at 30, 60 or 144 frames per second. Each timestep is split
+    into substeps to keep fast moving bodies from passing through each other. Positions for rendering are
+    interpolated between the last two timesteps, using the time left over in the accumulator.
+
+    When stepping adaptively, the number of substeps is chosen at the start of each timestep: a single substep while
+    no fast moving body is close to another body (e.g. while the ball rolls down the lane), otherwise enough substeps
+    that no body travels further than MAX_TRAVEL_PER_SUBSTEP in one substep. While the bodies are far apart, the
+    number of timesteps before any of them could meet is worked out once, and single substeps are taken until then
+    without checking again.
+
+    :ivar MAX_TRAVEL_PER_SUBSTEP: The furthest a body may travel in one substep when near another body, in inches.
+    :ivar space: The pymunk Space being stepped.
+    :ivar timestep: The simulated time of each fixed timestep, in seconds.
+    :ivar substeps: The number of times the space is stepped in each timestep, when not stepping adaptively.
+    :ivar adaptive: Indicates whether the number of substeps is chosen from the speed of the bodies.
+    :ivar max_substeps: The most substeps taken in one timestep when stepping adaptively.
+    :ivar steps_taken: The number of times the space has been stepped since the count was last reset.
+    :ivar coarse_timesteps_left: The number of timesteps that can still be taken as single substeps without checking.
+    :ivar bounding_radii: The radius of a circle containing all of each body's shapes, cached as it never changes.
+    :ivar max_frame_time: The longest frame time simulated in one frame, in seconds. Any time above this is dropped,
+        so that a very slow frame cannot cause even slower frames afterwards.
+    :ivar accumulator: The simulated time that has not been stepped through yet, in seconds.
+    :ivar alpha: How far between the previous and current timestep the rendered positions should be (0 to 1).
+    :ivar body_buffer: The buffer the bodies' positions are read into at the start of each timestep.
+    :ivar previous_ids: The ids of the bodies in the space at the start of the last timestep, in ascending order.
+    :ivar previous_positions: The (x, y) position of each body in previous_ids at the start of the last timestep.
+    """
+
+    MAX_TRAVEL_PER_SUBSTEP = Pin.RADIUS / 2  # inches
+
+    def __init__(
+            self,
+            space: pymunk.Space,
+            timestep: float = consts.PHYSICS_TIMESTEP,
+            substeps: int = consts.PHYSICS_SUBSTEPS,
+            max_frame_time: float = 0.25,
+            adaptive: bool = True,
+            max_substeps: int = consts.PHYSICS_MAX_SUBSTEPS,
+    ) -> None:
+        """
+        Initialises the stepper.
+
+        :param space: The pymunk Space to step.
+        :param timestep: The simulated time of each fixed timestep, in seconds.
+        :param substeps: The number of times the space is stepped in each timestep, when not stepping adaptively.
+        :param max_frame_time: The longest frame time simulated in one frame, in seconds.
+        :param adaptive: Whether to choose the number of substeps from the speed of the bodies.
+        :param max_substeps: The most substeps taken in one timestep when stepping adaptively.
+        """
+        self.space = space
+        self.timestep = timestep
+        self.substeps = substeps
+        self.adaptive = adaptive
+        self.max_substeps = max_substeps
+        self.steps_taken = 0
+        self.coarse_timesteps_left = 0
+        self.bounding_radii: dict[pymunk.Body, float] = {}
+        self.max_frame_time = max_frame_time
+        self.accumulator = 0.0
+        self.alpha = 0.0
+        self.body_buffer = pymunk.batch.Buffer()
+        self.previous_ids = np.empty(0, dtype=np.uintp)
+        self.previous_positions = np.empty((0, 2))
+
+    def choose_substeps(self) -> int:
+        """
+        Chooses how many substeps to split the next timestep into.
+
+        Only bodies fast enough to travel further than MAX_TRAVEL_PER_SUBSTEP in a whole timestep are considered
+        fast. They only need extra substeps if the gap between them and another body could close within the
+        timestep, assuming both move straight at each other at full speed.
+
+        :return: The number of substeps to take.
+        """
+        if not self.adaptive:
+            return self.substeps
+        if self.coarse_timesteps_left > 0:
+            self.coarse_timesteps_left -= 1
+            return 1
+        min_fast_speed = self.MAX_TRAVEL_PER_SUBSTEP / self.timestep
+        bodies = [(body.position, body.velocity.length, self.bounding_radius(body)) for body in self.space.bodies]
+        max_speed = max((speed for _, speed, _ in bodies), default=0.0)
+        if max_speed <= min_fast_speed:
+            return 1
+        # Find how many timesteps it would take for the closest fast body to meet another body
+        timesteps_to_contact = math.inf
+        for i, (position, speed, radius) in enumerate(bodies):
+            if speed <= min_fast_speed:
+                continue
+            closing_distance = (speed + max_speed) * self.timestep
+            for j, (other_position, _, other_radius) in enumerate(bodies):
+                if i != j:
+                    gap = position.get_distance(other_position) - radius - other_radius
+                    timesteps_to_contact = min(timesteps_to_contact, gap / closing_distance)
+        if timesteps_to_contact > 1:
+            # Nothing can collide until then, as velocities can only change through collisions
+            self.coarse_timesteps_left = int(min(timesteps_to_contact, 1_000_000)) - 1
+            return 1
+        return min(self.max_substeps, math.ceil(max_speed * self.timestep / self.MAX_TRAVEL_PER_SUBSTEP))
+
+    def bounding_radius(self, body: pymunk.Body) -> float:
+        """
+        Returns the radius of a circle around a body's position that contains all of its shapes.
+
+        :param body: The body to find the bounding radius of.
+        :return: The bounding radius, in inches.
+        """
+        radius = self.bounding_radii.get(body)
+        if radius is None:
+            radius = self.bounding_radii[body] = self.calculate_bounding_radius(body)
+        return radius
+
+    @staticmethod
+    def calculate_bounding_radius(body: pymunk.Body) -> float:
+        """
+        Calculates the radius of a circle around a body's position that contains all of its shapes.
+
+        :param body: The body to find the bounding radius of.
+        :return: The bounding radius, in inches.
+        """
+        position = body.position
+        radius = 0.0
+        for shape in body.shapes:
+            bb = shape.bb
+            radius = max(
+                radius,
+                abs(bb.left - position.x),
+                abs(bb.right - position.x),
+                abs(bb.bottom - position.y),
+                abs(bb.top - position.y),
+            )
+        return radius * math.sqrt(2)  # The box's corners may be further away than its sides
+
+    def step(self) -> None:
+        """Advances the space by one fixed timestep, split into substeps."""
+        substeps = self.choose_substeps()
+        dt = self.timestep / substeps
+        for _ in range(substeps):
+            self.space.step(dt)
+        self.steps_taken += substeps
+
+    def reset(self) -> None:
+        """
+        Forgets any timesteps known to be safe to take as single substeps, and the positions rendering is
+        interpolated from, and resets the count of steps taken. Must be called whenever a body's velocity or position
+        is changed from outside the space (e.g. when the ball is thrown, or the ball and pins are reset).
+        """
+        self.coarse_timesteps_left = 0
+        self.previous_ids = np.empty(0, dtype=np.uintp)
+        self.previous_positions = np.empty((0, 2))
+        self.steps_taken = 0
+
+    def advance(self, frame_time: float) -> int:
+        """
+        Advances the space by as many fixed timesteps as fit into the time accumulated so far.
+
+        :param frame_time: The real time the last rendered frame took, in seconds.
+        :return: The number of fixed timesteps taken.
+        """
+        self.accumulator += min(frame_time, self.max_frame_time)
+        steps = 0
+        while self.accumulator >= self.timestep:
+            self.capture_previous_positions()
+            self.step()
+            self.accumulator -= self.timestep
+            steps += 1
+        self.alpha = self.accumulator / self.timestep
+        return steps
+
+    def capture_previous_positions(self) -> None:
+        """Reads the position of every body in the space in one call, to interpolate rendered positions from."""
+        body_ids, kinematics = read_space_kinematics(self.space, self.body_buffer)
+        order = np.argsort(body_ids)
+        self.previous_ids = body_ids[order]
+        self.previous_positions = kinematics[order, :2]
+
+    def interpolate_positions(self, body_ids: np.ndarray, positions: np.ndarray) -> np.ndarray:
+        """
+        Returns the positions many bodies should be rendered at, between their positions at the last two timesteps.
+
+        :param body_ids: The id of each body.
+        :param positions: An array with the current (x, y) position of each body in a row, in game coordinates.
+        :return: An array with the interpolated (x, y) position of each body in a row. Bodies that were not in the
+            space at the start of the last timestep are left at their current positions.
+        """
+        interpolated = np.array(positions, dtype=np.float64)
+        if not len(self.previous_ids):
+            return interpolated
+        indexes = np.searchsorted(self.previous_ids, body_ids).clip(max=len(self.previous_ids) - 1)
+        known = self.previous_ids[indexes] == body_ids
+        previous = self.previous_positions[indexes[known]]
+        interpolated[known] = previous + (interpolated[known] - previous) * self.alpha
+        return interpolated
+
+    def interpolated_position(self, body: pymunk.Body) -> tuple[float, float]:
+        """
+        Returns the position a body should be rendered at, between its positions at the last two timesteps.
+
+        :param body: The body to find the position of.
+        :return: The interpolated (x, y) position of the body, in game coordinates.
+        """
+        current = body.position
+        index = int(np.searchsorted(self.previous_ids, body.id))
+        if index == len(self.previous_ids) or self.previous_ids[index] != body.id:
+            return current.x, current.y
+        previous_x, previous_y = self.previous_positions[index].tolist()
+        return (
+            previous_x + (current.x - previous_x) * self.alpha,
+            previous_y + (current.y - previous_y) * self.alpha,
+        )
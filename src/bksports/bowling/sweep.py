@@ -0,0 +1,143 @@
+"""
+Batch sweeps of throw parameters using the headless throw simulator.
+
+Spreads the simulations for a grid of throw angles and velocities across a pool of processes, and saves the
+resulting map of pins knocked and strike frequency as a compressed NumPy (.npz) file.
+"""
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import bksports.constants as consts
+from bksports.bowling.leaves import FULL_RACK, NUM_PINS, STANDING_COUNT
+from bksports.bowling.physics import (
+    PhysicsProfile,
+    get_physics_profile,
+    get_solver_profile,
+    set_physics_profile,
+    set_profiles,
+)
+from bksports.bowling.simulation import ThrowSimulator
+
+# Range of throw angles allowed by the game (see BowlingGame.throw_angle)
+MIN_THROW_ANGLE = -5.0
+MAX_THROW_ANGLE = 5.0
+THROW_ANGLE_STEP = consts.THROW_ANGLE_STEP
+
+_simulator: ThrowSimulator | None = None
+
+
+def simulate_cell(task: tuple[float, float, int, float, float, tuple[int, ...], int]) -> np.ndarray:
+    """
+    Simulates every sample of a single (angle, velocity) cell of a sweep at one leave. Runs inside a worker process.
+
+    :param task: A tuple (angle, velocity, samples, angle_spread, velocity_spread, seed, leave), where the seed is
+        unique to the cell and the leave is the pins standing before each throw.
+    :return: An array containing the leave bitmask left standing by each sample.
+    """
+    global _simulator
+    if _simulator is None:
+        _simulator = ThrowSimulator()
+    angle, velocity, samples, angle_spread, velocity_spread, seed, leave = task
+    rng = np.random.default_rng(list(seed))
+    angles = angle + rng.normal(0.0, angle_spread, samples) if angle_spread else np.full(samples, angle)
+    velocities = velocity + rng.normal(0.0, velocity_spread, samples) if velocity_spread else np.full(samples, velocity)
+    return np.array(
+        [_simulator.simulate(float(a), float(v), leave).leave for a, v in zip(angles, velocities, strict=True)],
+        dtype=np.uint16,
+    )
+
+
+def sweep(
+        angles: np.ndarray,
+        velocities: np.ndarray,
+        samples: int = 1,
+        angle_spread: float = 0.0,
+        velocity_spread: float = 0.0,
+        seed: int = 0,
+        workers: int | None = None,
+) -> dict[str, np.ndarray]:
+    """
+    Simulates throws for every combination of the given angles and velocities across a pool of processes, with the
+    current physics and solver profiles.
+
+    Each (angle, velocity) cell is simulated `samples` times, with the angle and velocity of each sample perturbed
+    by normally distributed noise, so that the strike frequency reflects how forgiving a throw is.
+
+    :param angles: The throw angles to sweep, in degrees.
+    :param velocities: The throw velocities to sweep, in inches per second.
+    :param samples: The number of throws simulated for each cell.
+    :param angle_spread: The standard deviation of the noise added to each sample's angle, in degrees.
+    :param velocity_spread: The standard deviation of the noise added to each sample's velocity, in inches per second.
+    :param seed: The seed used to generate the noise. The same seed always produces the same map.
+    :param workers: The number of worker processes. Defaults to the number of CPU cores.
+    :return: A dictionary of arrays: the swept angles and velocities, the pins knocked by every sample (shape
+        angles x velocities x samples), and the mean pins knocked and strike frequency of each cell.
+    """
+    angles = np.asarray(angles, dtype=np.float32)
+    velocities = np.asarray(velocities, dtype=np.float32)
+    workers = workers or os.cpu_count() or 1
+    tasks = [
+        (float(angle), float(velocity), samples, angle_spread, velocity_spread, (seed, i, j), FULL_RACK)
+        for i, angle in enumerate(angles)
+        for j, velocity in enumerate(velocities)
+    ]
+    # Hand each worker several chunks so that the load stays balanced as cells finish at different speeds
+    chunksize = max(1, len(tasks) // (workers * 4))
+    # Simulate with the current profiles, even in workers that do not inherit its memory
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=set_profiles, initargs=(get_physics_profile(), get_solver_profile())
+    ) as executor:
+        results = list(executor.map(simulate_cell, tasks, chunksize=chunksize))
+    leaves = np.stack(results).reshape(len(angles), len(velocities), samples)
+    pins_knocked = NUM_PINS - STANDING_COUNT[leaves]
+    return {
+        "angles": angles,
+        "velocities": velocities,
+        "pins_knocked": pins_knocked,
+        "mean_pins_knocked": pins_knocked.mean(axis=2, dtype=np.float32),
+        "strike_frequency": (pins_knocked == 10).mean(axis=2, dtype=np.float32),
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Command line entry point for sweeping throw parameters and saving the resulting map."""
+    parser = argparse.ArgumentParser(description="Sweep throw angles and velocities into a strike probability map.")
+    parser.add_argument("--angle-min", type=float, default=MIN_THROW_ANGLE)
+    parser.add_argument("--angle-max", type=float, default=MAX_THROW_ANGLE)
+    parser.add_argument("--angle-step", type=float, default=THROW_ANGLE_STEP)
+    parser.add_argument("--velocity-min", type=float, default=200.0)
+    parser.add_argument("--velocity-max", type=float, default=400.0)
+    parser.add_argument("--velocity-step", type=float, default=20.0)
+    parser.add_argument("--samples", type=int, default=1, help="Throws simulated per (angle, velocity) cell")
+    parser.add_argument("--angle-spread", type=float, default=0.0, help="Std. dev. of angle noise (degrees)")
+    parser.add_argument("--velocity-spread", type=float, default=0.0, help="Std. dev. of velocity noise (in/s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (defaults to CPU count)")
+    parser.add_argument("--physics", metavar="PROFILE", help="Ball and pin physics profile file")
+    parser.add_argument("--output", default="sweep.npz")
+    args = parser.parse_args(argv)
+    if args.physics:
+        set_physics_profile(PhysicsProfile.load(args.physics))
+    # Include the end of each range, allowing for floating point error
+    angles = np.arange(args.angle_min, args.angle_max + args.angle_step / 2, args.angle_step)
+    velocities = np.arange(args.velocity_min, args.velocity_max + args.velocity_step / 2, args.velocity_step)
+    result = sweep(
+        angles,
+        velocities,
+        samples=args.samples,
+        angle_spread=args.angle_spread,
+        velocity_spread=args.velocity_spread,
+        seed=args.seed,
+        workers=args.workers,
+    )
+    np.savez_compressed(args.output, **result)
+    print(f"Saved {len(angles)}x{len(velocities)} map ({len(angles) * len(velocities) * args.samples} throws) "
+          f"to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,13 @@ with bowling industry standards. Screen dimensions are in pixels.
 """
 
 FRAMES_PER_SECOND = 60
+PROFILE_CSV_PATH = "frame_profile.csv"  # Where the frame profiler's timings are exported to (F4, with --profile)
+EVENT_LOG_PATH = "events.bklog"  # Where game events are logged to by default (with --event-log)
+
+# Physics is stepped independently of the frame rate, in fixed timesteps that are each split into substeps
+PHYSICS_TIMESTEP = 1 / 120  # seconds
+PHYSICS_SUBSTEPS = 4  # The ball moves under an inch per substep at full speed, less than a pin's radius
+PHYSICS_MAX_SUBSTEPS = 16  # Upper limit on substeps when they are chosen adaptively from the speed of the bodies
 
 ### GENERAL CONSTANTS ###
 
@@ -43,15 +50,27 @@ RIGHT_BOUNDARY = (LANE_WIDTH / 2)
 # Pin positioning
 FOUL_LINE_TO_FRONT_PIN_DISTANCE = 60 * 12  # Distance from the foul line to the first pin at the front (60 feet) TODO: Needs to be checked
 FOUL_LINE_TO_END_DISTANCE = None  # Distance from the foul line to the end of the lane (? feet) TODO: Find correct value and change this
+PIN_DIAMETER = 4.75  # Diameter of a pin (inches)
 PIN_SPACING_H = 12  # Centre to centre distance
 HALF_PIN_SPACING_H = PIN_SPACING_H / 2  # TODO: Change back to PIN_SPACING_H after testing
 PIN_SPACING_V = 20.75 / 2  # Spacing between rows of pins TODO: Change back to 20.75 after testing
 
-# === Bowling Screen Dimensions (pixels) ===
-
-ALLEY_SCREEN_HEIGHT = SCREEN_HEIGHT
-ALLEY_SCREEN_WIDTH = ALLEY_SCREEN_HEIGHT * (LANE_WIDTH / LANE_LENGTH)  # Aspect ratio maintained
+# Throwing
+THROW_VELOCITY = 317.0  # Speed the ball is thrown at (inches per second)
+THROW_ANGLE_STEP = 0.5  # Amount the throw angle changes by with each key press (degrees)
 
 # === Pymunk Constants ===
 BALL_ID = 0
-HIT_PIN_ID = 11
+PIN_ID = 1
+GRAVITY = 386.1  # Acceleration due to gravity (inches per second squared), used for friction against the lane
+PIN_DECK_FRICTION = 0.2  # Coefficient of friction between a sliding pin and the pin deck
+PIN_FRICTION = 1.0  # Coefficient of friction of a pin's surface
+PIN_ELASTICITY = 1.0  # Elasticity of a pin's collisions
+BALL_FRICTION = 0.4  # Coefficient of friction of the ball's surface
+BALL_ELASTICITY = 0.9  # Elasticity of the ball's collisions
+SOLVER_ITERATIONS = 10  # Iterations of the collision solver per step (pymunk's default)
+COLLISION_SLOP = 0.1  # Overlap (inches) allowed between shapes, to keep contacts stable (pymunk's default)
+USE_SPATIAL_HASH = False  # Whether to index shapes with a spatial hash instead of pymunk's bounding box tree
+THREADED_SPACE = False  # Whether to step the space with pymunk's threaded solver, where supported (not Windows)
+IDLE_SPEED_THRESHOLD = 2.0  # Speed (inches per second) below which a body is considered to be at rest
+SLEEP_TIME_THRESHOLD = 0.5  # Time (seconds) a body must stay at rest for before pymunk puts it to sleep
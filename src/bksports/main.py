@@ -1,7 +1,24 @@
+import argparse
+from contextlib import nullcontext
+
 import pygame
 
+from bksports.bowling.ai import MonteCarloBowler
+from bksports.bowling.event_log import EventLog
 from bksports.bowling.game import BowlingGame
-from bksports.constants import SCREEN_HEIGHT, SCREEN_WIDTH
+from bksports.bowling.lanes import LaneManager
+from bksports.bowling.opponent import CpuOpponent
+from bksports.bowling.outcome_index import OutcomeIndex
+from bksports.bowling.physics import (
+    PhysicsProfile,
+    SolverProfile,
+    set_physics_profile,
+    set_solver_profile,
+)
+from bksports.bowling.profiler import FrameProfiler
+from bksports.constants import EVENT_LOG_PATH, SCREEN_HEIGHT, SCREEN_WIDTH
+
+DEFAULT_AI_BUDGET = 500.0  # ms
 
 pygame.init()
 
@@ -9,12 +26,50 @@ screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
 clock = pygame.time.Clock()
 
 
-def main() -> None:
-    running = True
-    while running:
-        bowling_game = BowlingGame(screen, clock)
-        bowling_game.run()
-        running = bowling_game.running
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Play bowling.")
+    parser.add_argument("--opponent", metavar="INDEX", help="Play against the computer, using an outcome index file")
+    parser.add_argument("--ai-budget", type=float, nargs="?", const=DEFAULT_AI_BUDGET, metavar="MS",
+                        help=f"Let the AI bowler throw for you (A) in MS per throw (default: {DEFAULT_AI_BUDGET:g})")
+    parser.add_argument("--physics", metavar="PROFILE", help="Load the ball and pin physics from a profile file")
+    parser.add_argument("--solver", metavar="PROFILE", help="Load the solver settings from a profile file")
+    parser.add_argument("--lanes", type=int, default=1, help="Play several lanes side by side (1-9)")
+    parser.add_argument("--profile", action="store_true", help="Time every frame (F3 shows timings, F4 saves a CSV)")
+    parser.add_argument("--event-log", nargs="?", const=EVENT_LOG_PATH, metavar="PATH",
+                        help=f"Log throws, pin hits and scores to a file (default: {EVENT_LOG_PATH})")
+    args = parser.parse_args(argv)
+    if args.lanes > 1:
+        # The alley has no opponent, AI bowler or profiler, so reject them rather than silently ignoring them
+        for option, given in (
+            ("--opponent", args.opponent is not None),
+            ("--ai-budget", args.ai_budget is not None),
+            ("--profile", args.profile),
+        ):
+            if given:
+                parser.error(f"{option} cannot be used with --lanes")
+    # Replace the default physics and solver settings before any space, ball or pins are created
+    if args.physics:
+        set_physics_profile(PhysicsProfile.load(args.physics))
+    if args.solver:
+        set_solver_profile(SolverProfile.load(args.solver))
+    with (
+        EventLog(args.event_log) if args.event_log else nullcontext() as event_log,
+        # Start the AI bowler's workers with the game, so they are ready by the time it is first asked to throw
+        MonteCarloBowler(args.ai_budget) if args.ai_budget is not None else nullcontext() as ai_bowler,
+    ):
+        if args.lanes > 1:
+            LaneManager(screen, clock, min(args.lanes, 9), event_log=event_log).run()
+            pygame.quit()
+            return
+        # The index is only read from disk once the opponent first throws
+        index = OutcomeIndex(args.opponent) if args.opponent else None
+        running = True
+        while running:
+            opponent = CpuOpponent(index) if index is not None else None
+            profiler = FrameProfiler() if args.profile else None
+            bowling_game = BowlingGame(screen, clock, opponent, ai_bowler, profiler, event_log)
+            bowling_game.run()
+            running = bowling_game.running
     pygame.quit()
 
 if __name__ == "__main__":
@@ -0,0 +1,59 @@
+import unittest
+from collections.abc import Callable, Sequence
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from bksports.bowling.leaves import FULL_RACK
+from bksports.bowling.optimiser import ThrowOptimiser
+
+type Landscape = Callable[[float, float], float]
+
+
+class StubOptimiser(ThrowOptimiser):
+    """Scores throws with a known function rather than by simulating them."""
+
+    def __init__(self, landscape: Landscape) -> None:
+        self.landscape = landscape
+        self.pool = ThreadPoolExecutor(max_workers=1)
+        super().__init__(workers=1, executor=self.pool)
+
+    def close(self) -> None:
+        super().close()
+        self.pool.shutdown()
+
+    def evaluate(self, leave: int, throws: Sequence[tuple[float, float]]) -> np.ndarray:
+        return np.array([self.landscape(angle, velocity) for angle, velocity in throws])
+
+
+def sharp_peak(angle: float, velocity: float) -> float:
+    return 9.5 if angle == 0 and velocity == 300 else 8 - abs(angle) / 10 - abs(velocity - 300) / 1000
+
+
+class TestThrowOptimiser(unittest.TestCase):
+    def test_keeps_sharp_peak_found_by_grid(self) -> None:
+        with StubOptimiser(sharp_peak) as optimiser:
+            result = optimiser.optimise(FULL_RACK, [280, 300, 320])
+        self.assertEqual(result.history[0], 9.5)
+        self.assertEqual((result.angle, result.velocity, result.expected_pins), (0.0, 300.0, 9.5))
+
+    def test_never_worse_than_grid(self) -> None:
+        rng = np.random.default_rng(0)
+        for _ in range(20):
+            peaks = rng.uniform([-5, 250, 0.1], [5, 350, 2], size=(4, 3))
+            heights = rng.uniform(5, 10, size=4)
+
+            def landscape(
+                    angle: float, velocity: float, peaks: np.ndarray = peaks, heights: np.ndarray = heights
+            ) -> float:
+                distances = np.hypot((angle - peaks[:, 0]) / peaks[:, 2], (velocity - peaks[:, 1]) / 20)
+                return float(np.max(heights * np.exp(-distances ** 2)))
+
+            with StubOptimiser(landscape) as optimiser:
+                result = optimiser.optimise(FULL_RACK, [260, 300, 340])
+            self.assertGreaterEqual(result.expected_pins, result.history[0])
+            self.assertEqual(result.expected_pins, landscape(result.angle, result.velocity))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import os
+import unittest
+
+import pygame
+
+import bksports.constants as consts
+from bksports.bowling.camera import Camera, CameraMode
+from bksports.bowling.renderer import TrajectoryLineSprite
+
+PATH = [(0.0, 0.0), (2.0, consts.LANE_LENGTH / 2), (4.0, consts.LANE_LENGTH)]
+
+
+def setUpModule() -> None:
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.init()
+    pygame.display.set_mode((consts.SCREEN_WIDTH, consts.SCREEN_HEIGHT))
+
+
+def tearDownModule() -> None:
+    pygame.quit()
+
+
+class TestCamera(unittest.TestCase):
+    def test_to_screen_many_without_positions(self) -> None:
+        camera = Camera()
+        self.assertEqual(camera.to_screen_many([]).shape, (0, 2))
+
+    def test_to_screen_many_matches_to_screen(self) -> None:
+        camera = Camera(mode=CameraMode.FOLLOW)
+        screen_positions = camera.to_screen_many(PATH)
+        for game_position, screen_position in zip(PATH, screen_positions.tolist(), strict=True):
+            self.assertEqual(tuple(screen_position), camera.to_screen(*game_position))
+
+
+class TestTrajectoryLineSprite(unittest.TestCase):
+    def setUp(self) -> None:
+        self.sprite = TrajectoryLineSprite(Camera())
+        self.sprite.show(True)
+
+    def test_set_path_without_markers(self) -> None:
+        self.sprite.set_path(PATH, [])
+        self.assertFalse(self.sprite.is_stale)
+        self.assertGreater(self.sprite.rect.height, 0)
+
+    def test_set_path_with_markers(self) -> None:
+        self.sprite.set_path(PATH, [(0.0, consts.LANE_LENGTH)])
+        self.assertGreater(self.sprite.rect.height, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()